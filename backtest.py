@@ -0,0 +1,206 @@
+# backtest.py
+# Version 1.0.2 - Sharpe só sobre as datas reais; retorno, máximo e drawdown face ao capital inicial 1.0
+# 2026-10-18
+#
+# Entrada: a matriz de preços diários alinhada (dias × ativos) e um lote de pesos (carteiras × ativos).
+# Entre rebalanceamentos o valor de todas as carteiras é um único produto de matrizes
+# pesos @ (preços / preço no último rebalanceamento); em cada rebalanceamento paga-se a comissão
+# sobre o turnover (Σ|peso alvo - peso derivado|). Resultado: matriz (carteiras × dias) de valores e
+# as mesmas métricas do compare_returns. Retorno, retorno máximo e drawdown são medidos face ao capital
+# inicial 1.0 (a comissão da compra inicial entra no resultado); o Sharpe usa só os retornos diários reais.
+
+import os
+import sys
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrument import traced
+from metrics_engine import compute_metrics
+
+SCHEDULES = {"none": None, "daily": "D", "weekly": "W", "monthly": "M", "quarterly": "Q"}
+DEFAULT_FEE_BPS = 10
+CHUNK = 4096  # carteiras por bloco/processo (a matriz de valores de um bloco é CHUNK × dias float64)
+
+
+# ──────────── PESOS ────────────
+def weight_grid(n_assets, step=0.05):
+    # Todas as combinações de pesos múltiplos de "step" que somam 1 (estrelas e barras)
+    units = int(round(1 / step))
+    slots = units + n_assets - 1
+    bars = np.array(list(itertools.combinations(range(slots), n_assets - 1)), dtype=np.int64)
+    edges = np.column_stack([np.full(len(bars), -1), bars, np.full(len(bars), slots)])
+    return (np.diff(edges, axis=1) - 1) / units
+
+
+def random_weights(n_portfolios, n_assets, seed=0):
+    # Amostragem uniforme no simplex (Dirichlet(1, ..., 1))
+    return np.random.default_rng(seed).dirichlet(np.ones(n_assets), n_portfolios)
+
+
+# ──────────── CALENDÁRIO ────────────
+def rebalance_points(dates, schedule="monthly"):
+    # Índices (na grelha diária) onde se rebalanceia; o dia 0 é sempre a compra inicial.
+    # schedule: none | daily | weekly | monthly | quarterly | N (de N em N dias)
+    n = len(dates)
+    if str(schedule).isdigit():
+        return np.arange(0, n, int(schedule))
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Calendário inválido: {schedule} (opções: {', '.join(SCHEDULES)} ou n.º de dias)")
+    if SCHEDULES[schedule] is None:
+        return np.array([0])
+    keys = pd.DatetimeIndex(dates).to_period(SCHEDULES[schedule]).asi8
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+# ──────────── SIMULAÇÃO ────────────
+@traced("backtest.simulate")
+def simulate(prices, weights, points, fee_bps=DEFAULT_FEE_BPS):
+    # prices: (dias × ativos) sem NaN; weights: (carteiras × ativos); devolve (valores, turnover total)
+    prices = np.asarray(prices, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    fee = fee_bps / 10_000
+    n_days = len(prices)
+    values = np.empty((len(weights), n_days))
+    turnover = np.ones(len(weights))                  # compra inicial: 100% do capital
+    value = 1 - fee * turnover
+
+    bounds = list(points) + [n_days]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        end = min(hi, n_days - 1)
+        relative = prices[lo:end + 1] / prices[lo]    # (dias do segmento (+1) × ativos)
+        growth = weights @ relative.T                 # (carteiras × dias do segmento)
+        values[:, lo:hi] = value[:, None] * growth[:, :hi - lo]
+        if hi < n_days:
+            drifted = weights * relative[-1] / growth[:, -1:]
+            traded = np.abs(weights - drifted).sum(axis=1)
+            turnover += traded
+            value = value * growth[:, -1] * (1 - fee * traded)
+    return values, turnover
+
+
+def _run_block(args):
+    prices, dates, weights, points, fee_bps = args
+    values, turnover = simulate(prices, weights, points, fee_bps)
+    # Sharpe sobre os retornos diários reais (só as datas da grelha); retorno, máximo e drawdown
+    # face ao capital inicial 1.0, para que a comissão da compra inicial entre no resultado
+    sharpe = compute_metrics(pd.DataFrame(values.T, index=dates))["sharpe"].to_numpy()
+    peak = np.maximum.accumulate(np.maximum(values, 1.0), axis=1)
+    return pd.DataFrame({
+        "final_value": values[:, -1],
+        "return_pct": (values[:, -1] - 1) * 100,
+        "max_ret": (np.maximum(values.max(axis=1), 1.0) - 1) * 100,
+        "drawdown": ((values - peak) / peak).min(axis=1) * 100,
+        "sharpe": sharpe,
+        "turnover": turnover,
+    })
+
+
+def usable_range(prices):
+    # Só os dias em que todos os ativos escolhidos já têm preço
+    complete = prices.notna().all(axis=1).to_numpy()
+    if not complete.any():
+        raise ValueError("Nenhum dia com preço para todos os ativos escolhidos")
+    first = int(complete.argmax())
+    trimmed = prices.iloc[first:]
+    if trimmed.isna().to_numpy().any():
+        raise ValueError("Preços em falta a meio do período")
+    return trimmed
+
+
+@traced("backtest.run")
+def backtest(prices, weights, schedule="monthly", fee_bps=DEFAULT_FEE_BPS, workers=None, chunk=CHUNK):
+    # prices: DataFrame (dias × ativos) alinhado; weights: (carteiras × ativos), mesma ordem de colunas.
+    # Devolve um DataFrame com os pesos e as métricas de cada carteira.
+    prices = usable_range(prices)
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape[1] != prices.shape[1]:
+        raise ValueError(f"Pesos com {weights.shape[1]} ativos, preços com {prices.shape[1]}")
+    weights = weights / weights.sum(axis=1, keepdims=True)
+    points = rebalance_points(prices.index, schedule)
+    matrix, dates = prices.to_numpy(dtype=np.float64), prices.index
+    blocks = [(matrix, dates, weights[i:i + chunk], points, fee_bps) for i in range(0, len(weights), chunk)]
+
+    if workers and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_block, blocks))
+    else:
+        results = [_run_block(block) for block in blocks]
+
+    report = pd.concat(results, ignore_index=True)
+    report.insert(0, "rebalances", len(points) - 1)
+    for j, name in enumerate(prices.columns):
+        report.insert(j, f"w_{name}", weights[:, j])
+    report.index.name = "portfolio"
+    return report
+
+
+def select_assets(series_by_name, names):
+    # Aceita o nome de apresentação ("Quantum Flow") ou o do ficheiro ("qflow"), sem distinguir maiúsculas
+    if not names:
+        return series_by_name
+    lookup = {name.lower(): name for name in series_by_name}
+    lookup["qflow"] = "Quantum Flow"
+    selected = {}
+    for raw in names:
+        name = lookup.get(raw.strip().lower())
+        if name not in series_by_name:
+            raise ValueError(f"Ativo desconhecido: {raw}")
+        selected[name] = series_by_name[name]
+    return selected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest de carteiras com rebalanceamento periódico")
+    parser.add_argument("--assets", help="Lista separada por vírgulas (por omissão todos)")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD), por omissão o início dos dados")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD), por omissão hoje")
+    parser.add_argument("--rebalance", default="monthly", help="none | daily | weekly | monthly | quarterly | N dias")
+    parser.add_argument("--fee-bps", type=float, default=DEFAULT_FEE_BPS, help="Comissão por unidade transacionada")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--step", type=float, default=0.05, help="Grelha de pesos (múltiplos de step)")
+    group.add_argument("--random", type=int, help="N carteiras aleatórias (Dirichlet) em vez da grelha")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Processos (blocos de carteiras)")
+    parser.add_argument("--sort", default="sharpe", choices=["sharpe", "return_pct", "drawdown", "final_value"])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output-dir", default="reports")
+    args = parser.parse_args()
+
+    from compare_returns import load_price_series, price_cache
+    from price_panel import PricePanel
+
+    try:
+        series_by_name = select_assets(load_price_series(), args.assets.split(",") if args.assets else None)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not series_by_name:
+        print("❌ Sem dados em price_data.")
+        sys.exit(1)
+    start = pd.Timestamp(args.start) if args.start else price_cache().earliest_date().normalize()
+    end = pd.Timestamp(args.end) if args.end else pd.Timestamp.now().normalize()
+    prices = PricePanel.from_series(series_by_name, start, end).to_frame()
+
+    n_assets = len(series_by_name)
+    weights = random_weights(args.random, n_assets, args.seed) if args.random else weight_grid(n_assets, args.step)
+    t0 = time.perf_counter()
+    try:
+        report = backtest(prices, weights, args.rebalance, args.fee_bps, args.workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    seconds = time.perf_counter() - t0
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    filename = os.path.join(args.output_dir, f"backtest_{args.rebalance}.csv")
+    report.to_csv(filename)
+    best = report.sort_values(args.sort, ascending=False).head(args.top)   # drawdown: mais perto de 0 primeiro
+    print(f"\n💼 {len(report)} carteiras, {n_assets} ativos, rebalanceamento {args.rebalance}, "
+          f"comissão {args.fee_bps:g} bps ({seconds:.2f}s, {len(report) / seconds:,.0f} carteiras/s)\n")
+    print(best.to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"\n✅ Resultado guardado em: {filename}")
@@ -0,0 +1,106 @@
+# bench_startup.py
+# Version 1.0.0 - Benchmark do arranque a frio (python -X importtime) dos scripts de análise
+# 2026-10-18
+#
+# Cada medição corre num processo novo. Para cada alvo mostra o tempo total, o tempo gasto em
+# imports (árvore do -X importtime) e os módulos mais pesados; assinala se o matplotlib foi
+# importado num caminho que não desenha nada.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+# nome → (argumentos do python, o matplotlib pode ser importado?)
+TARGETS = {
+    "compare_returns (menu)": (["-c", "import compare_returns"], False),
+    "compare_returns --summary-only": (["compare_returns.py", "--batch", "--summary-only",
+                                        "--output-dir", "{tmp}"], False),
+    "drawdown --batch": (["check_tedency_and_drawdown.py", "--batch"], False),
+}
+
+
+def parse_importtime(stderr):
+    # Linhas "import time: self [us] | cumulative | imported package" → [(self_us, cum_us, nível, nome)]
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cum_us), depth, name.strip()))
+    return rows
+
+
+def measure(args, tmp):
+    argv = [sys.executable, "-X", "importtime"] + [a.format(tmp=tmp) for a in args]
+    t0 = time.perf_counter()
+    proc = subprocess.run(argv, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(proc.stderr)
+    return {
+        "wall_s": wall,
+        "import_s": sum(cum for _, cum, depth, _ in rows if depth == 0) / 1e6,
+        "modules": len(rows),
+        "matplotlib": any(name.split(".")[0] == "matplotlib" for *_, name in rows),
+        "top": sorted(((cum, name) for _, cum, depth, name in rows if depth == 0), reverse=True),
+        "returncode": proc.returncode,
+    }
+
+
+def run(targets=TARGETS, repeat=3, top=5):
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        for name, (args, mpl_allowed) in targets.items():
+            # Melhor de N: as restantes medições incluem ruído do sistema
+            runs = [measure(args, tmp) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["wall_s"])
+            best["top"] = [{"module": mod, "cumulative_ms": round(cum / 1000, 1)} for cum, mod in best["top"][:top]]
+            best["matplotlib_unexpected"] = best["matplotlib"] and not mpl_allowed
+            results[name] = best
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def print_results(results):
+    print(f"{'Alvo':<34} | {'Total':>8} | {'Imports':>8} | {'Módulos':>7} | matplotlib")
+    print("-" * 78)
+    for name, r in results.items():
+        mpl = "⚠️ sim" if r["matplotlib_unexpected"] else ("sim" if r["matplotlib"] else "não")
+        status = "" if r["returncode"] == 0 else f"  (saída {r['returncode']})"
+        print(f"{name:<34} | {r['wall_s']:>7.3f}s | {r['import_s']:>7.3f}s | {r['modules']:>7} | {mpl}{status}")
+        for item in r["top"]:
+            print(f"{'':<36}{item['cumulative_ms']:>8.1f} ms  {item['module']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo de arranque dos scripts de análise")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Módulos mais pesados a mostrar por alvo")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Falhar (saída 1) se algum alvo demorar mais do que N segundos")
+    args = parser.parse_args()
+
+    if not os.path.isdir("price_data"):
+        print("❌ Pasta price_data não encontrada. Corre a partir da raiz do projeto.")
+        sys.exit(1)
+    results = run(repeat=args.repeat, top=args.top)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    slow = [n for n, r in results.items() if args.budget is not None and r["wall_s"] > args.budget]
+    bad = [n for n, r in results.items() if r["matplotlib_unexpected"] or r["returncode"] != 0]
+    if slow:
+        print(f"❌ Acima de {args.budget}s: {', '.join(slow)}")
+    if bad:
+        print(f"❌ Caminho sem gráfico importou o matplotlib ou falhou: {', '.join(bad)}")
+    sys.exit(1 if slow or bad else 0)
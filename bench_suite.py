@@ -0,0 +1,268 @@
+# bench_suite.py
+# Version 1.0.1 - Métricas e gráfico medidos na grelha da granularidade do cenário (não só na diária)
+# 2026-10-18
+#
+# Para cada cenário (n.º de ativos × n.º de pontos × granularidade) gera séries GBM numa pasta
+# temporária e mede cada etapa: escrita, leitura/parse, alinhamento (reindex/ffill), métricas
+# (motor vetorizado e as funções antigas calculate_drawdown/calculate_sharpe), gráfico e
+# append incremental. Resultado em JSON (tempo, linhas/s, pico de memória) e comparação com uma
+# execução anterior para apanhar regressões.
+#
+# Memória: por omissão o pico de RSS do processo em cada etapa (VmHWM, reposto antes de cada etapa
+# em Linux). --tracemalloc mede também o pico das alocações Python, mas abranda bastante as etapas.
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from metrics_engine import align_prices, compute_metrics
+from price_store import STORE_FORMAT, write_prices, read_prices, append_prices
+from resample import resample_close
+from rolling_index import update_index
+
+FREQS = {"day": "D", "hour": "h", "minute": "min"}
+
+# (ativos, pontos por ativo, granularidade)
+DEFAULT_SCENARIOS = [
+    (1, 365, "day"),
+    (10, 1825, "day"),
+    (100, 1825, "day"),
+    (10, 24 * 90, "hour"),
+    (4, 60 * 24 * 7, "minute"),
+]
+
+CHART_MAX_ASSETS = 10  # acima disto o gráfico deixa de ser legível (e a etapa é ignorada)
+APPEND_POINTS = 48     # pontos novos por ativo na etapa de append (uma atualização típica)
+
+
+# ──────────── DADOS SINTÉTICOS ────────────
+def synthetic_gbm(n_assets, n_points, freq="day", seed=0, mu=0.3, sigma=0.8, start="2020-01-01"):
+    # Matriz (pontos × ativos) de preços GBM; mu/sigma anualizados, tudo vetorizado
+    rng = np.random.default_rng(seed)
+    step = pd.Timedelta(1, unit=FREQS[freq])
+    dt = step / pd.Timedelta(days=365)
+    shocks = rng.standard_normal((n_points, n_assets))
+    log_ret = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shocks
+    start_prices = rng.uniform(0.01, 50_000, n_assets)
+    prices = start_prices * np.exp(np.cumsum(log_ret, axis=0))
+    dates = pd.date_range(start, periods=n_points, freq=FREQS[freq])
+    return dates, prices
+
+
+def asset_names(n_assets):
+    return [f"gbm{i:05d}" for i in range(n_assets)]
+
+
+# ──────────── MEDIÇÃO ────────────
+TRACE_ALLOCATIONS = False
+
+
+def _reset_peak_rss():
+    # Linux: escrever "5" em clear_refs repõe o VmHWM (pico de RSS) no valor atual
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        # Sem /proc: pico do processo inteiro (não é reposto entre etapas)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(fn, rows):
+    _reset_peak_rss()
+    if TRACE_ALLOCATIONS:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    stats = {
+        "seconds": round(seconds, 6),
+        "rows": rows,
+        "rows_per_s": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_mb": round(_peak_rss_mb(), 3),
+    }
+    if TRACE_ALLOCATIONS:
+        stats["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 3)
+        tracemalloc.stop()
+    return result, stats
+
+
+def run_scenario(n_assets, n_points, freq, data_dir, fmt=STORE_FORMAT, seed=0, charts=True):
+    dates, matrix = synthetic_gbm(n_assets, n_points, freq, seed)
+    names = asset_names(n_assets)
+    rows = n_assets * n_points
+    stages = {}
+
+    def write_all():
+        for j, name in enumerate(names):
+            write_prices(name, pd.DataFrame({"date": dates, "price": matrix[:, j]}), data_dir, fmt=fmt)
+    _, stages["write"] = timed(write_all, rows)
+
+    def parse_all():
+        return {name: read_prices(name, data_dir).set_index("date")["price"] for name in names}
+    series, stages["parse"] = timed(parse_all, rows)
+
+    # Grelha na granularidade do cenário: nos cenários hour/minute as etapas seguintes medem todas as linhas
+    start, end = dates[0], dates[-1]
+    panel, stages["align_ffill"] = timed(lambda: align_prices(series, start, end, FREQS[freq]), rows)
+    grid_rows = panel.size
+
+    _, stages["metrics"] = timed(lambda: compute_metrics(panel), grid_rows)
+
+    # As funções antigas vivem no compare_returns.py, que só importa a partir da raiz do projeto
+    has_app = os.path.isdir("price_data")
+    if has_app:
+        def legacy_metrics():
+            from compare_returns import calculate_drawdown, calculate_sharpe
+            return [(calculate_drawdown(panel[name]), calculate_sharpe(panel[name])) for name in panel.columns]
+        _, stages["metrics_legacy"] = timed(legacy_metrics, grid_rows)
+
+    if has_app and charts and n_assets <= CHART_MAX_ASSETS:
+        def render():
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+            from chart_render import render_returns_chart
+            from compare_returns import summarize_period
+            summary_data, returns_df = summarize_period(panel.rename(columns=str.capitalize), verbose=False)
+            filename, _ = render_returns_chart(returns_df, summary_data, start.date(), end.date(),
+                                               "Benchmark", data_dir, preset="preview")
+            plt.close("all")
+            return filename
+        _, stages["chart_render"] = timed(render, grid_rows)
+
+    # Atualização incremental: novos pontos → fecho diário → append → índice de janelas
+    new_dates, new_matrix = synthetic_gbm(n_assets, APPEND_POINTS, freq, seed + 1,
+                                          start=dates[-1] + pd.Timedelta(1, unit=FREQS[freq]))
+    new_matrix = new_matrix * (matrix[-1] / new_matrix[0])
+    for name in names:
+        update_index(name, data_dir)  # índice inicial fora da medição (o refresh só o estende)
+
+    def merge_and_write():
+        for j, name in enumerate(names):
+            raw = pd.DataFrame({"date": new_dates, "price": new_matrix[:, j]})
+            append_prices(name, resample_close(raw, "day") if freq != "day" else raw, data_dir, fmt=fmt)
+            update_index(name, data_dir)
+    _, stages["merge_write"] = timed(merge_and_write, n_assets * APPEND_POINTS)
+
+    return {
+        "assets": n_assets,
+        "points": n_points,
+        "freq": freq,
+        "format": fmt,
+        "stages": stages,
+        "total_s": round(sum(s["seconds"] for s in stages.values()), 6),
+    }
+
+
+def run(scenarios=DEFAULT_SCENARIOS, fmt=STORE_FORMAT, charts=True, seed=0):
+    results = []
+    for n_assets, n_points, freq in scenarios:
+        data_dir = tempfile.mkdtemp(prefix="bench_suite_")
+        try:
+            result = run_scenario(n_assets, n_points, freq, data_dir, fmt, seed, charts)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+        print_scenario(result)
+        results.append(result)
+    return {
+        "generated": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "tracemalloc": TRACE_ALLOCATIONS,
+        "scenarios": results,
+    }
+
+
+def scenario_key(result):
+    return f"{result['assets']}x{result['points']}@{result['freq']}/{result['format']}"
+
+
+def print_scenario(result):
+    print(f"\n📊 {scenario_key(result)} — {result['total_s']:.3f}s")
+    for stage, s in result["stages"].items():
+        rate = f"{s['rows_per_s']:>14,.0f} linhas/s" if s["rows_per_s"] else ""
+        alloc = f" | alocações {s['peak_alloc_mb']:>8.2f} MB" if "peak_alloc_mb" in s else ""
+        print(f"   {stage:<15} {s['seconds']:>9.4f}s {rate} | RSS {s['peak_mb']:>9.2f} MB{alloc}")
+
+
+# ──────────── REGRESSÕES ────────────
+def compare(current, baseline, tolerance=0.25, min_seconds=0.01):
+    # Etapas que ficaram mais de "tolerance" mais lentas (ignora etapas abaixo de min_seconds: ruído)
+    previous = {scenario_key(r): r for r in baseline["scenarios"]}
+    regressions = []
+    for result in current["scenarios"]:
+        old = previous.get(scenario_key(result))
+        if old is None:
+            continue
+        for stage, s in result["stages"].items():
+            before = old["stages"].get(stage)
+            if before is None or before["seconds"] < min_seconds:
+                continue
+            ratio = s["seconds"] / before["seconds"]
+            if ratio > 1 + tolerance:
+                regressions.append((scenario_key(result), stage, before["seconds"], s["seconds"], ratio))
+    return regressions
+
+
+def parse_scenario(text):
+    # "ativos:pontos:granularidade", ex.: 100:1825:day
+    n_assets, n_points, freq = text.split(":")
+    if freq not in FREQS:
+        raise argparse.ArgumentTypeError(f"granularidade inválida: {freq}")
+    return int(n_assets), int(n_points), freq
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark com históricos sintéticos (GBM)")
+    parser.add_argument("--scenario", type=parse_scenario, action="append",
+                        help="ativos:pontos:granularidade (repetível), ex.: 10000:365:day")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=STORE_FORMAT)
+    parser.add_argument("--no-charts", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Medir também o pico de alocações (mais lento)")
+    parser.add_argument("--json", help="Gravar o resultado neste ficheiro")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Abrandamento aceite (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    TRACE_ALLOCATIONS = args.tracemalloc
+    if not os.path.isdir("price_data"):
+        print("⚠️ Sem price_data/: etapas metrics_legacy e chart_render ignoradas (correr na raiz do projeto)")
+    report = run(args.scenario or DEFAULT_SCENARIOS, args.format, not args.no_charts, args.seed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Resultado guardado em: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("tracemalloc", False) != report["tracemalloc"]:
+            print("⚠️ A referência foi medida com outro modo de --tracemalloc: tempos não comparáveis")
+        regressions = compare(report, baseline, args.tolerance)
+        for key, stage, before, after, ratio in regressions:
+            print(f"❌ {key} {stage}: {before:.4f}s → {after:.4f}s ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Sem regressões acima de {args.tolerance:.0%}")
@@ -0,0 +1,218 @@
+# bootstrap.py
+# Version 1.0.0 - Intervalos de confiança do Sharpe e do drawdown máximo (bootstrap por blocos / Monte Carlo GBM)
+# 2026-10-18
+#
+# Em janelas curtas (7 ou 15 dias) o Sharpe e o drawdown são quase só ruído. Para cada ativo
+# geram-se caminhos com o mesmo n.º de dias do período a partir dos retornos diários observados:
+#   block  bootstrap circular por blocos (mantém a autocorrelação de curto prazo)
+#   gbm    movimento browniano geométrico com a média/volatilidade dos retornos logarítmicos
+# Os caminhos são gerados em blocos vetorizados (limite de memória PRICE_MC_MB por bloco) e
+# distribuídos por um pool de processos. Cada bloco tem a sua semente derivada (SeedSequence), por
+# isso o resultado é o mesmo para a mesma semente, com qualquer n.º de processos.
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrument import traced
+from metrics_engine import ANNUALIZATION
+
+METHODS = ("block", "gbm")
+CONFIDENCE = 0.95
+MAX_MB = float(os.environ.get("PRICE_MC_MB", 256))
+ARRAYS_PER_PATH = 4   # arrays (caminhos × dias) vivos ao mesmo tempo num bloco (caminho, riqueza, pico, temporários)
+MIN_RETURNS = 3
+PATH_DTYPE = np.float32  # caminhos em float32 (metade da memória/largura de banda); somas em float64
+
+
+def block_length(n_days):
+    # Regra habitual n^(1/3): blocos de 2 dias para uma semana, ~8 para um ano
+    return max(1, int(round(n_days ** (1 / 3))))
+
+
+def paths_per_chunk(n_days, max_mb=MAX_MB):
+    return max(1, int(max_mb * 1024 * 1024 // (n_days * np.dtype(PATH_DTYPE).itemsize * ARRAYS_PER_PATH)))
+
+
+# ──────────── GERAÇÃO DE CAMINHOS ────────────
+def _circular_windows(values, block):
+    # (n × block): a linha i são os "block" valores a partir de i, com wrap-around (view, sem cópia)
+    extended = np.concatenate([values, values[:block - 1]])
+    return np.lib.stride_tricks.sliding_window_view(extended, block)
+
+
+def _sharpe(sum1, sum2, n_days, annualization):
+    mean = sum1 / n_days
+    var = np.maximum(sum2 - sum1 * mean, 0.0) / (n_days - 1)
+    std = np.sqrt(var)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Retornos constantes (ex.: preço parado) → desvio nulo a menos de arredondamentos → Sharpe 0
+        return np.where(var <= 1e-12 * sum2 / n_days, 0.0, mean / std * np.sqrt(annualization))
+
+
+def _max_drawdown(log_paths):
+    # Drawdown máximo (%) a partir dos retornos logarítmicos: riqueza e pico em escala log, sem divisões
+    log_wealth = np.cumsum(log_paths, axis=1)
+    peak = np.maximum.accumulate(log_wealth, axis=1)
+    np.maximum(peak, 0.0, out=peak)                     # o dia inicial (riqueza 1) também conta
+    np.subtract(log_wealth, peak, out=log_wealth)
+    return np.expm1(log_wealth.min(axis=1)) * 100
+
+
+def block_metrics(rng, returns, n_paths, block, annualization=ANNUALIZATION):
+    # Bootstrap circular: blocos de "block" dias a começar em posições uniformes. O Sharpe sai das
+    # somas por bloco (pré-calculadas); só o drawdown precisa do caminho completo.
+    n_days = len(returns)
+    n_blocks = -(-n_days // block)
+    tail = n_days - (n_blocks - 1) * block              # dias usados do último bloco
+    starts = rng.integers(0, n_days, (n_paths, n_blocks))
+
+    windows = _circular_windows(returns, block)
+    squares = windows ** 2
+    full1, full2 = windows.sum(axis=1), squares.sum(axis=1)
+    tail1, tail2 = windows[:, :tail].sum(axis=1), squares[:, :tail].sum(axis=1)
+    sum1 = full1[starts[:, :-1]].sum(axis=1) + tail1[starts[:, -1]]
+    sum2 = full2[starts[:, :-1]].sum(axis=1) + tail2[starts[:, -1]]
+
+    log_returns = np.log1p(returns).astype(PATH_DTYPE)
+    log_paths = _circular_windows(log_returns, block)[starts].reshape(n_paths, -1)[:, :n_days]
+    return _sharpe(sum1, sum2, n_days, annualization), _max_drawdown(log_paths)
+
+
+def gbm_metrics(rng, returns, n_paths, annualization=ANNUALIZATION):
+    # Retornos logarítmicos normais com a média/volatilidade observadas
+    log_returns = np.log1p(returns)
+    log_paths = rng.standard_normal((n_paths, len(returns)), dtype=PATH_DTYPE)
+    log_paths *= PATH_DTYPE(log_returns.std(ddof=1))
+    log_paths += PATH_DTYPE(log_returns.mean())
+    simple = np.expm1(log_paths)
+    sum1 = simple.sum(axis=1, dtype=np.float64)
+    sum2 = np.einsum("ij,ij->i", simple, simple, dtype=np.float64)
+    return _sharpe(sum1, sum2, len(returns), annualization), _max_drawdown(log_paths)
+
+
+def path_metrics(paths, annualization=ANNUALIZATION):
+    # paths: (caminhos × dias) de retornos simples → (Sharpe anualizado, drawdown máximo %)
+    sum1, sum2 = paths.sum(axis=1), np.einsum("ij,ij->i", paths, paths)
+    return _sharpe(sum1, sum2, paths.shape[1], annualization), _max_drawdown(np.log1p(paths))
+
+
+def _simulate_chunk(args):
+    returns, method, n_paths, block, seed, annualization = args
+    rng = np.random.default_rng(seed)
+    if method == "block":
+        return block_metrics(rng, returns, n_paths, block, annualization)
+    return gbm_metrics(rng, returns, n_paths, annualization)
+
+
+# ──────────── INTERVALOS ────────────
+def asset_returns(prices):
+    # Retornos diários de cada ativo, só entre dias com preço (como pct_change().dropna())
+    result = {}
+    for name in prices.columns:
+        values = prices[name].dropna().to_numpy(dtype=np.float64)
+        result[name] = values[1:] / values[:-1] - 1
+    return result
+
+
+@traced("bootstrap.intervals")
+def confidence_intervals(prices, n_paths=10_000, method="block", confidence=CONFIDENCE, seed=0,
+                         workers=None, max_mb=MAX_MB, annualization=ANNUALIZATION):
+    # prices: matriz (datas × ativos) do período. Devolve um DataFrame por ativo com a estimativa
+    # pontual e os limites do intervalo do Sharpe e do drawdown máximo.
+    if method not in METHODS:
+        raise ValueError(f"Método inválido: {method} (opções: {', '.join(METHODS)})")
+    returns_by_name = {name: r for name, r in asset_returns(prices).items() if len(r) >= MIN_RETURNS}
+    seeds = np.random.SeedSequence(seed).spawn(len(returns_by_name))
+
+    jobs, owners = [], []
+    for (name, returns), asset_seed in zip(returns_by_name.items(), seeds):
+        chunk = paths_per_chunk(len(returns), max_mb)
+        sizes = [min(chunk, n_paths - i) for i in range(0, n_paths, chunk)]
+        for size, chunk_seed in zip(sizes, asset_seed.spawn(len(sizes))):
+            jobs.append((returns, method, size, block_length(len(returns)), chunk_seed, annualization))
+            owners.append(name)
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, jobs))
+    else:
+        results = [_simulate_chunk(job) for job in jobs]
+
+    lo_q, hi_q = (1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100
+    rows = {}
+    for name, returns in returns_by_name.items():
+        sharpe = np.concatenate([r[0] for r, owner in zip(results, owners) if owner == name])
+        drawdown = np.concatenate([r[1] for r, owner in zip(results, owners) if owner == name])
+        point_sharpe, point_dd = path_metrics(returns[None, :], annualization)
+        rows[name] = {
+            "sharpe": point_sharpe[0],
+            "sharpe_lo": np.percentile(sharpe, lo_q),
+            "sharpe_hi": np.percentile(sharpe, hi_q),
+            "drawdown": point_dd[0],
+            "drawdown_lo": np.percentile(drawdown, lo_q),
+            "drawdown_hi": np.percentile(drawdown, hi_q),
+            "days": len(returns),
+            "block": block_length(len(returns)) if method == "block" else None,
+        }
+    result = pd.DataFrame.from_dict(rows, orient="index")
+    result.index.name = "name"
+    result.attrs.update({"paths": n_paths, "method": method, "confidence": confidence, "seed": seed})
+    return result
+
+
+def print_intervals(intervals):
+    attrs = intervals.attrs
+    method = "bootstrap por blocos" if attrs["method"] == "block" else "Monte Carlo GBM"
+    print(f"\n🎲 Intervalos de confiança {attrs['confidence']:.0%} ({method}, {attrs['paths']:,} caminhos):\n")
+    print(f"{'Asset':<12} | {'Sharpe':>7} | {'IC Sharpe':>17} | {'Max DD':>9} | {'IC Max DD':>21}")
+    print("-" * 78)
+    for name, row in intervals.iterrows():
+        print(
+            f"{name:<12} | "
+            f"{row['sharpe']:>7.2f} | "
+            f"[{row['sharpe_lo']:>6.2f}, {row['sharpe_hi']:>6.2f}] | "
+            f"{row['drawdown']:>8.2f}% | "
+            f"[{row['drawdown_lo']:>7.2f}%, {row['drawdown_hi']:>7.2f}%]"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intervalos de confiança do Sharpe e do drawdown por reamostragem")
+    parser.add_argument("--days", type=int, default=30, help="Período: últimos N dias (ignorado com --start)")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD), por omissão hoje")
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--method", choices=METHODS, default="block")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Processos (por omissão todos os núcleos)")
+    parser.add_argument("--output", help="Gravar o resultado em CSV")
+    args = parser.parse_args()
+
+    from compare_returns import load_price_series
+    from price_panel import PricePanel
+
+    series_by_name = load_price_series()
+    if not series_by_name:
+        print("❌ Sem dados em price_data.")
+        sys.exit(1)
+    end = pd.Timestamp(args.end) if args.end else pd.Timestamp.now().normalize()
+    start = pd.Timestamp(args.start) if args.start else end - pd.Timedelta(days=args.days)
+    prices = PricePanel.from_series(series_by_name, start, end).to_frame()
+
+    t0 = time.perf_counter()
+    intervals = confidence_intervals(prices, args.paths, args.method, args.confidence, args.seed, args.workers)
+    seconds = time.perf_counter() - t0
+    print(f"📅 {start.date()} → {end.date()}")
+    print_intervals(intervals)
+    print(f"\n⏱️ {args.paths:,} caminhos × {len(intervals)} ativos em {seconds:.2f}s")
+    if args.output:
+        intervals.to_csv(args.output)
+        print(f"✅ Resultado guardado em: {args.output}")
@@ -0,0 +1,540 @@
+# chart_render.py
+# Version 1.4.0 - Figura persistente (PersistentChart): atualiza só os dados, com blit; fig.savefig no render completo
+# 2026-10-18
+
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from instrument import span, traced
+from label_layout import label_spacing, layout_labels
+
+# ──────────── PRESETS DE QUALIDADE ────────────
+# preview: rascunho rápido (sem glow/gradiente, dpi baixo, sem bbox tight)
+# publication: o aspeto original (glow, gradiente, dpi 300)
+PRESETS = {
+    "preview": {"dpi": 80, "glow": False, "gradient": False, "tight": False},
+    "standard": {"dpi": 150, "glow": True, "gradient": True, "tight": True},
+    "publication": {"dpi": 300, "glow": True, "gradient": True, "tight": True},
+}
+DEFAULT_PRESET = "publication"
+
+GLOW_WIDTHS = [8, 5, 3]
+
+# Cores gradientes profissionais - TROCADAS Ethereum e Solana
+CUSTOM_COLORS = {
+    "Bitcoin": "#FF6B35",      # Laranja vibrante
+    "Ethereum": "#10B981",     # Verde menta (trocado com Solana)
+    "Solana": "#3B82F6",       # Azul moderno (trocado com Ethereum)
+    "Quantum Flow": "#8B5CF6"  # Roxo premium
+}
+
+# ──────────── ELEMENTOS ESTÁTICOS (calculados uma vez por processo) ────────────
+_STATIC = {}
+
+def _static_elements():
+    if not _STATIC:
+        import numpy as np
+        import matplotlib.pyplot as plt
+        # Configuração do estilo profissional
+        plt.style.use('seaborn-v0_8-darkgrid')
+        _STATIC["style"] = True
+        _STATIC["gradient"] = np.linspace(0, 1, 100).reshape(1, -1)
+    return _STATIC
+
+def safe_name(period_name):
+    return period_name.replace(" ", "_").replace("/", "-")
+
+def _glow_segments(returns_df, x_num, colors):
+    # Efeito glow: todas as linhas e larguras numa única LineCollection
+    import numpy as np
+    segments, seg_colors, seg_widths = [], [], []
+    for i, col in enumerate(returns_df.columns):
+        y = returns_df[col].to_numpy()
+        valid = ~np.isnan(y)
+        points = np.column_stack([x_num[valid], y[valid]])
+        for glow_width in GLOW_WIDTHS:
+            segments.append(points)
+            seg_colors.append(colors[i])
+            seg_widths.append(glow_width)
+    return segments, seg_colors, seg_widths
+
+def _trend(returns_df):
+    # Linha de tendência suave (polinómio de grau 2) do melhor performer
+    import numpy as np
+    best_performer = returns_df.iloc[-1].idxmax()
+    # Ativos que começam depois do início do período têm NaN nos primeiros dias
+    trend_mask = returns_df[best_performer].notna().to_numpy()
+    with warnings.catch_warnings():
+        # O numpy regista RankWarning como "always" ao ser importado (depois do filtro do compare_returns)
+        warnings.simplefilter("ignore")
+        z = np.polyfit(np.arange(len(returns_df))[trend_mask], returns_df[best_performer][trend_mask], 2)
+    return best_performer, np.poly1d(z)(range(len(returns_df)))
+
+def _table_rows(summary_data):
+    rows = []
+    for data in sorted(summary_data, key=lambda x: x['return_pct'], reverse=True):
+        status = "↑" if data['return_pct'] > 50 else "+" if data['return_pct'] > 0 else "↓"
+        rows.append([
+            data['name'],
+            f"{data['return_pct']:+.2f}%",
+            f"{data['drawdown']:.2f}%",
+            f"{data['sharpe']:.2f}",
+            status
+        ])
+    return rows
+
+def _row_color(table_data, i):
+    # Highlight para Quantum Flow sempre
+    if table_data[i-1][0] == "Quantum Flow":
+        return '#3B1E6B'  # Roxo escuro para Quantum Flow
+    if i == 1 and table_data[0][0] != "Quantum Flow":  # Melhor performer (se não for Quantum Flow)
+        return '#1B4332'
+    return '#1A1A1A'
+
+def _footer_text(returns_df, start_date, end_date, best_performer):
+    day_count = (end_date - start_date).days + 1
+    return (f"Period: {start_date} to {end_date} ({day_count} days) | "
+            f"Best: {best_performer} ({returns_df[best_performer].iloc[-1]:+.1f}%) | "
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+def _padded_limits(ax_main):
+    x_min, x_max = ax_main.get_xlim()
+    y_min, y_max = ax_main.get_ylim()
+    data = ax_main.dataLim
+    if data.height < 1e-9:
+        # Período sem variação (todos os retornos 0): escala degenerada atiraria as labels para o infinito
+        y_min, y_max = data.y0 - 1, data.y1 + 1
+    # Expandir limite direito para acomodar as labels (15%) e os verticais (5%)
+    x_padding = (x_max - x_min) * 0.15
+    y_padding = (y_max - y_min) * 0.05
+    return (x_min, x_max + x_padding), (y_min - y_padding, y_max + y_padding)
+
+def _build_chart(returns_df, summary_data, start_date, end_date, period_name, options, dpi=None):
+    # Cria a figura completa e devolve os artistas que mudam com os dados (para o PersistentChart)
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    from matplotlib.collections import LineCollection
+    static = _static_elements()
+    artists = {"assets": tuple(returns_df.columns), "lines": {}, "markers": {}, "labels": {}}
+    
+    # Criar figura com layout profissional
+    fig = plt.figure(figsize=(18, 10), dpi=dpi)  # Aumentado de 16 para 18 de largura
+    gs = fig.add_gridspec(3, 2, height_ratios=[2.5, 0.8, 0.5], width_ratios=[3, 1], hspace=0.3, wspace=0.2)
+    artists["fig"] = fig
+    
+    # Gráfico principal
+    ax_main = fig.add_subplot(gs[0, :])
+    ax_main.set_facecolor('#0F0F0F')
+    artists["ax_main"] = ax_main
+    
+    # Adicionar gradiente de fundo
+    artists["gradient"] = None
+    if options["gradient"]:
+        artists["gradient"] = ax_main.imshow(
+            static["gradient"], extent=[returns_df.index[0], returns_df.index[-1],
+                                        returns_df.min().min() - 10, returns_df.max().max() + 10],
+            aspect='auto', cmap='gray', alpha=0.1, zorder=0)
+    
+    colors = [CUSTOM_COLORS.get(col, f"C{i}") for i, col in enumerate(returns_df.columns)]
+    
+    artists["glow"] = None
+    if options["glow"]:
+        segments, seg_colors, seg_widths = _glow_segments(returns_df, mdates.date2num(returns_df.index), colors)
+        glow = LineCollection(segments, colors=seg_colors, linewidths=seg_widths,
+                              alpha=0.1, zorder=1, capstyle='round', joinstyle='round')
+        ax_main.add_collection(glow, autolim=False)
+        artists["glow"] = glow
+    
+    # Posições das labels: ordenar uma vez e resolver sobreposições numa só passagem
+    final_values = returns_df.iloc[-1]
+    spacing = label_spacing(returns_df.min().min(), returns_df.max().max())
+    label_y = layout_labels(final_values.to_dict(), spacing)
+    # Ajustar horizontalmente para evitar corte
+    x_offset = pd.Timedelta(hours=6)
+    
+    # Plotar linhas
+    for i, col in enumerate(returns_df.columns):
+        color = colors[i]
+        y = returns_df[col]
+        is_quantum = col == "Quantum Flow"
+        
+        # Linha principal
+        artists["lines"][col] = ax_main.plot(
+            returns_df.index, y,
+            label=col,
+            color=color,
+            linewidth=3.5 if is_quantum else 2.5,
+            alpha=0.95,
+            zorder=2
+        )[0]
+        
+        # Marcador no último ponto
+        artists["markers"][col] = ax_main.scatter(
+            returns_df.index[-1], y.iloc[-1],
+            color=color, s=150 if is_quantum else 100,
+            zorder=3, edgecolors='white', linewidth=2)
+        
+        # Posição calculada antes do ciclo para todas as labels
+        x_pos = returns_df.index[-1]
+        y_pos = label_y.get(col, final_values[col])
+        
+        # Label do valor final com caixa estilizada - posição corrigida
+        bbox_props = dict(boxstyle="round,pad=0.3", 
+                        facecolor=color, alpha=0.8, 
+                        edgecolor='white', linewidth=1)
+        
+        artists["labels"][col] = ax_main.text(
+            x_pos + x_offset,  # Posição X ajustada
+            y_pos,             # Posição Y ajustada
+            f"{col}: {final_values[col]:+.1f}%",
+            color='white',
+            fontsize=11 if is_quantum else 10,
+            fontweight='bold',
+            va='center',
+            ha='left',  # Adicionado alinhamento horizontal
+            bbox=bbox_props,
+            clip_on=False  # Importante: permite que o texto apareça fora da área do plot
+        )
+    
+    # Configuração do gráfico principal
+    artists["title"] = ax_main.set_title(f"PERFORMANCE COMPARISON - {period_name.upper()}",
+                                         fontsize=20, fontweight='bold', color='white', pad=20)
+    ax_main.set_xlabel("Date", fontsize=14, color='#CCCCCC')
+    ax_main.set_ylabel("Cumulative Return (%)", fontsize=14, color='#CCCCCC')
+    
+    # Mudar cor dos valores dos eixos para branco
+    ax_main.tick_params(axis='x', colors='white')
+    ax_main.tick_params(axis='y', colors='white')
+    
+    # Grid estilizado
+    ax_main.grid(True, linestyle='--', alpha=0.2, color='#444444')
+    ax_main.axhline(y=0, color='#666666', linestyle='-', linewidth=1, alpha=0.5)
+    
+    # Legenda estilizada
+    legend = ax_main.legend(loc='upper left', frameon=True, fancybox=True, 
+                           shadow=True, fontsize=12)
+    legend.get_frame().set_facecolor('#1A1A1A')
+    legend.get_frame().set_alpha(0.9)
+    legend.get_frame().set_edgecolor('#444444')
+    
+    # Mudar cor do texto da legenda para branco
+    for text in legend.get_texts():
+        text.set_color('white')
+    
+    # Adicionar linha de tendência suave para o melhor performer
+    best_performer, trend = _trend(returns_df)
+    artists["trend"] = ax_main.plot(returns_df.index, trend,
+                                    '--', alpha=0.3, color='yellow', linewidth=1,
+                                    label='Trend')[0]
+    
+    # Tabela de métricas
+    ax_table = fig.add_subplot(gs[1, :])
+    ax_table.axis('tight')
+    ax_table.axis('off')
+    
+    # Preparar dados da tabela
+    table_data = _table_rows(summary_data)
+    headers = ['Asset', 'Return', 'Max DD', 'Sharpe', 'Status']
+    
+    table = ax_table.table(cellText=table_data, colLabels=headers,
+                          cellLoc='center', loc='center',
+                          colWidths=[0.2, 0.2, 0.2, 0.2, 0.1])
+    
+    table.auto_set_font_size(False)
+    table.set_fontsize(11)
+    table.scale(1, 2)
+    artists["table"] = table
+    artists["table_rows"] = len(table_data)
+    
+    # Estilizar tabela
+    for i in range(len(headers)):
+        table[(0, i)].set_facecolor('#2E2E2E')
+        table[(0, i)].set_text_props(weight='bold', color='white')
+    
+    for i in range(1, len(table_data) + 1):
+        for j in range(len(headers)):
+            table[(i, j)].set_facecolor(_row_color(table_data, i))
+            table[(i, j)].set_text_props(color='white')
+    
+    # Rodapé com informações
+    ax_footer = fig.add_subplot(gs[2, :])
+    ax_footer.axis('off')
+    
+    artists["footer"] = ax_footer.text(0.5, 0.5, _footer_text(returns_df, start_date, end_date, best_performer),
+                                       ha='center', va='center',
+                                       fontsize=12, color='#888888', style='italic',
+                                       bbox=dict(boxstyle="round,pad=0.5", facecolor='#1A1A1A',
+                                                 edgecolor='#444444', alpha=0.8))
+    
+    x_lim, y_lim = _padded_limits(ax_main)
+    ax_main.set_xlim(*x_lim)
+    ax_main.set_ylim(*y_lim)
+    
+    # Configuração geral da figura
+    fig.patch.set_facecolor('#0A0A0A')
+    fig.suptitle("CRYPTO RETURNS ANALYSIS", fontsize=24, fontweight='bold', 
+                 color='white', y=0.98)
+    return artists
+
+def _chart_filename(output_dir, period_name):
+    return os.path.join(output_dir, f"crypto_returns_{safe_name(period_name)}_{datetime.now().strftime('%Y%m%d_%H%M')}.png")
+
+def _save_kwargs(options):
+    save_kwargs = dict(dpi=options["dpi"], facecolor='#0A0A0A', edgecolor='none')
+    if options["tight"]:
+        save_kwargs.update(bbox_inches='tight', pad_inches=0.3)
+    return save_kwargs
+
+@traced("chart.render")
+def render_returns_chart(returns_df, summary_data, start_date, end_date, period_name,
+                         output_dir=".", preset=DEFAULT_PRESET):
+    # Devolve (ficheiro, segundos de renderização)
+    t0 = time.perf_counter()
+    options = PRESETS[preset]
+    artists = _build_chart(returns_df, summary_data, start_date, end_date, period_name, options)
+    
+    # Salvar com a qualidade do preset (fig.savefig: o plt.savefig desenharia a figura uma segunda vez)
+    filename = _chart_filename(output_dir, period_name)
+    with span("chart.savefig", dpi=options["dpi"], file=filename):
+        artists["fig"].savefig(filename, **_save_kwargs(options))
+    
+    return filename, time.perf_counter() - t0
+
+
+# ──────────── FIGURA PERSISTENTE (atualizações incrementais) ────────────
+class PersistentChart:
+    # Mantém a figura e os artistas vivos entre renderizações: uma nova chamada só troca os dados
+    # (set_data/set_offsets/set_text) em vez de refazer gridspec, gradiente, glow, tabela e rodapé.
+    # Com blit, o fundo (eixos, ticks, grelha, legenda) é guardado depois do desenho completo e só os
+    # artistas de dados são redesenhados enquanto os limites servirem; o PNG sai do buffer do Agg
+    # (recortado à bbox tight nos presets que a usam). Figura nova quando o conjunto de ativos muda.
+    TIGHT_PAD = 0.3   # polegadas, como o pad_inches do render completo
+    PNG_COMPRESS = 1  # zlib rápido: numa atualização por minuto o PNG maior compensa (default do PIL: 6)
+    
+    def __init__(self, preset=DEFAULT_PRESET, blit=True):
+        self.preset = preset
+        self.options = PRESETS[preset]
+        self.blit = blit
+        self.artists = None
+        self.background = None
+        self.crop = None           # (x0, y0, x1, y1) em píxeis do buffer; None = figura inteira
+        self.stats = {"builds": 0, "full_draws": 0, "blits": 0}
+
+    def _dynamic(self):
+        a = self.artists
+        items = [a["gradient"], a["glow"], *a["lines"].values(), a["trend"],
+                 *a["markers"].values(), *a["labels"].values(), a["table"], a["footer"]]
+        return [artist for artist in items if artist is not None]
+
+    def _update(self, returns_df, summary_data, start_date, end_date, period_name):
+        # Troca os dados nos artistas existentes; devolve True se o fundo tem de ser redesenhado
+        import numpy as np
+        import pandas as pd
+        import matplotlib.dates as mdates
+        a = self.artists
+        ax_main = a["ax_main"]
+        x_num = mdates.date2num(returns_df.index)
+        low, high = returns_df.min().min(), returns_df.max().max()
+        
+        if a["gradient"] is not None:
+            a["gradient"].set_extent([x_num[0], x_num[-1], low - 10, high + 10])
+        if a["glow"] is not None:
+            colors = [CUSTOM_COLORS.get(col, f"C{i}") for i, col in enumerate(returns_df.columns)]
+            a["glow"].set_segments(_glow_segments(returns_df, x_num, colors)[0])
+        
+        final_values = returns_df.iloc[-1]
+        label_y = layout_labels(final_values.to_dict(), label_spacing(low, high))
+        x_label = returns_df.index[-1] + pd.Timedelta(hours=6)
+        for col in returns_df.columns:
+            y = returns_df[col].to_numpy()
+            a["lines"][col].set_data(returns_df.index, y)
+            a["markers"][col].set_offsets([[x_num[-1], y[-1]]])
+            a["labels"][col].set_position((x_label, label_y.get(col, final_values[col])))
+            a["labels"][col].set_text(f"{col}: {final_values[col]:+.1f}%")
+        best_performer, trend = _trend(returns_df)
+        a["trend"].set_data(returns_df.index, trend)
+        
+        table_data = _table_rows(summary_data)
+        for i, row in enumerate(table_data, start=1):
+            for j, value in enumerate(row):
+                cell = a["table"][(i, j)]
+                cell.get_text().set_text(value)
+                cell.set_facecolor(_row_color(table_data, i))
+        a["footer"].set_text(_footer_text(returns_df, start_date, end_date, best_performer))
+        
+        title = f"PERFORMANCE COMPARISON - {period_name.upper()}"
+        relayout = title != a["title"].get_text()
+        a["title"].set_text(title)
+        
+        # Limites como no render completo. Com blit mantêm-se (e o fundo guardado serve) enquanto os
+        # dados couberem nos atuais, com folga à direita para as labels, e ocuparem pelo menos 70%
+        # deles (ex.: mais um dia acrescentado ao mesmo período), ou se o render completo desse os mesmos
+        current = ax_main.get_xlim() + ax_main.get_ylim()
+        x0, x1, y0, y1 = current
+        ax_main.set_autoscale_on(True)
+        ax_main.relim(visible_only=True)
+        data = ax_main.dataLim
+        ax_main.autoscale_view()
+        x_lim, y_lim = _padded_limits(ax_main)
+        keep = self.blit and (np.allclose(x_lim + y_lim, current) or (
+            x0 <= data.x0 and data.x1 + 0.1 * (x1 - x0) <= x1 and y0 <= data.y0 and data.y1 <= y1
+            and data.width >= 0.7 * (x1 - x0) and data.height >= 0.7 * (y1 - y0)))
+        if keep:
+            ax_main.set_xlim(x0, x1)
+            ax_main.set_ylim(y0, y1)
+            return relayout
+        ax_main.set_xlim(*x_lim)
+        ax_main.set_ylim(*y_lim)
+        return True
+
+    def _full_draw(self):
+        # Desenha tudo; com blit guarda primeiro o fundo sem os artistas de dados
+        canvas = self.artists["fig"].canvas
+        if self.blit:
+            dynamic = self._dynamic()
+            for artist in dynamic:
+                artist.set_visible(False)
+            canvas.draw()
+            self.background = canvas.copy_from_bbox(self.artists["fig"].bbox)
+            for artist in dynamic:
+                artist.set_visible(True)
+            self._draw_dynamic()
+            self.crop = self._tight_crop() if self.options["tight"] else None
+        else:
+            canvas.draw()
+        self.stats["full_draws"] += 1
+
+    def _tight_crop(self):
+        # A mesma região que o savefig(bbox_inches='tight') gravaria, em píxeis do buffer
+        # (pode sair do buffer só pela margem, que é preenchida com a cor de fundo)
+        fig = self.artists["fig"]
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer())
+        width, height = fig.get_size_inches()
+        if bbox.x0 < 0 or bbox.y0 < 0 or bbox.x1 > width or bbox.y1 > height:
+            return "savefig"   # há conteúdo fora da figura: gravar pelo caminho normal
+        bbox = bbox.padded(self.TIGHT_PAD)
+        dpi = fig.dpi
+        x0, y0 = round(bbox.x0 * dpi), round((height - bbox.y1) * dpi)
+        # Largura/altura truncadas como no canvas do Agg
+        return x0, y0, x0 + int(bbox.width * dpi), y0 + int(bbox.height * dpi)
+
+    def _draw_dynamic(self):
+        fig = self.artists["fig"]
+        for artist in self._dynamic():
+            fig.draw_artist(artist)
+
+    def _blit_draw(self):
+        canvas = self.artists["fig"].canvas
+        canvas.restore_region(self.background)
+        self._draw_dynamic()
+        self.stats["blits"] += 1
+
+    def update(self, returns_df, summary_data, start_date, end_date, period_name):
+        # Atualiza a figura (criando-a se preciso) e deixa o buffer pronto a mostrar/gravar
+        import matplotlib.pyplot as plt
+        same_assets = self.artists is not None and self.artists["assets"] == tuple(returns_df.columns) \
+            and self.artists["table_rows"] == len(summary_data) \
+            and plt.fignum_exists(self.artists["fig"].number)   # janela fechada pelo utilizador → nova figura
+        if not same_assets:
+            self.close()
+            dpi = self.options["dpi"] if self.blit else None
+            self.artists = _build_chart(returns_df, summary_data, start_date, end_date, period_name,
+                                        self.options, dpi)
+            self.stats["builds"] += 1
+            relayout = True
+        else:
+            relayout = self._update(returns_df, summary_data, start_date, end_date, period_name)
+        
+        if not self.blit:
+            return
+        if relayout or self.background is None:
+            self._full_draw()
+        else:
+            self._blit_draw()
+
+    def save(self, filename):
+        fig = self.artists["fig"]
+        with span("chart.savefig", dpi=self.options["dpi"], file=filename):
+            if self.blit and self.crop != "savefig":
+                # O buffer do Agg já tem a imagem final (dpi da figura = dpi do preset)
+                import numpy as np
+                from PIL import Image
+                from matplotlib.colors import to_rgba
+                pixels = np.asarray(fig.canvas.buffer_rgba())
+                if self.crop is not None:
+                    x0, y0, x1, y1 = self.crop
+                    height, width = pixels.shape[:2]
+                    out = np.empty((y1 - y0, x1 - x0, 4), dtype=np.uint8)
+                    out[:] = np.round(np.array(to_rgba(fig.get_facecolor())) * 255).astype(np.uint8)
+                    sx0, sy0, sx1, sy1 = max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+                    out[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = pixels[sy0:sy1, sx0:sx1]
+                    pixels = out
+                Image.fromarray(pixels).save(filename, dpi=(self.options["dpi"], self.options["dpi"]),
+                                             compress_level=self.PNG_COMPRESS)
+            else:
+                fig.savefig(filename, **_save_kwargs(self.options))
+        return filename
+
+    @traced("chart.render_persistent")
+    def render(self, returns_df, summary_data, start_date, end_date, period_name,
+               output_dir=".", filename=None):
+        # Mesma interface e ficheiro do render_returns_chart; devolve (ficheiro, segundos)
+        t0 = time.perf_counter()
+        self.update(returns_df, summary_data, start_date, end_date, period_name)
+        filename = self.save(filename or _chart_filename(output_dir, period_name))
+        return filename, time.perf_counter() - t0
+
+    def show(self):
+        # Janela interativa sem bloquear (o menu continua); com blit só copia a região alterada
+        import matplotlib.pyplot as plt
+        canvas = self.artists["fig"].canvas
+        plt.ion()   # a janela continua a responder enquanto o menu espera pelo input
+        plt.show(block=False)
+        if self.blit:
+            canvas.blit(self.artists["fig"].bbox)
+        else:
+            canvas.draw_idle()
+        canvas.flush_events()
+
+    def close(self):
+        if self.artists is not None:
+            import matplotlib.pyplot as plt
+            plt.close(self.artists["fig"])
+        self.artists = None
+        self.background = None
+
+
+# ──────────── VÁRIOS GRÁFICOS EM PARALELO ────────────
+def _render_job(job):
+    # Corre num processo separado: só recebe os dados já calculados do período
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+    returns_df, summary_data, start_date, end_date, period_name, output_dir, preset = job
+    result = render_returns_chart(returns_df, summary_data, start_date, end_date,
+                                  period_name, output_dir, preset)
+    plt.close("all")
+    return result
+
+def render_many(jobs, workers=1, preset=DEFAULT_PRESET):
+    # jobs: (returns_df, summary_data, start_date, end_date, period_name, output_dir)
+    # Devolve [(ficheiro, segundos)] pela ordem dos jobs
+    if workers and workers > 1 and len(jobs) > 1:
+        jobs = [tuple(job) + (preset,) for job in jobs]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_render_job, jobs))
+    # Em série a mesma figura é reutilizada entre períodos (só os dados mudam)
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+    chart = PersistentChart(preset)
+    try:
+        return [chart.render(*job) for job in jobs]
+    finally:
+        chart.close()
+
+def render_report(results, preset):
+    total = sum(seconds for _, seconds in results)
+    return f"⏱️ Preset '{preset}': {len(results)} gráfico(s), {total:.2f}s de renderização ({total / max(1, len(results)):.2f}s/gráfico)"
@@ -1,28 +1,35 @@
 # check_tedency_and_drawdown.py
-# Version 1.0.1 - Changed price files location to "price_data" folder
-# 2025-08-24
+# Version 1.3.1 - Sem o import de os (listagem e leitura vivem no price_store)
+# 2026-10-18
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import os
+import sys
+
+from price_store import list_assets, read_prices
 
 DATA_DIR = "price_data"
 
+# ──────────── Modo batch (sem menu nem gráfico) ────────────
+if "--batch" in sys.argv:
+    from drawdown_stream import analyze_all, print_batch
+    print_batch(analyze_all(DATA_DIR))
+    exit()
+
 # ──────────── Selecionar ficheiro ────────────
 print("Ficheiros disponíveis:")
-files = [f for f in os.listdir(DATA_DIR) if f.endswith("_price_history.csv")]
-for i, file in enumerate(files):
-    print(f"{i + 1}: {file}")
+assets = list_assets(DATA_DIR)
+for i, asset in enumerate(assets):
+    print(f"{i + 1}: {asset}")
 
 choice = input("Escolhe um número: ")
 try:
-    selected_file = os.path.join(DATA_DIR, files[int(choice) - 1])
+    selected_asset = assets[int(choice) - 1]
 except:
     print("❌ Escolha inválida.")
     exit()
 
 # ──────────── Carregar dados ────────────
-df = pd.read_csv(selected_file, parse_dates=["date"])
+df = read_prices(selected_asset, DATA_DIR)
 df = df.set_index("date").sort_index()
 
 if df["price"].isnull().all():
@@ -66,11 +73,13 @@ trendline = pd.Series(
 trend_return_pct = ((end_val / start_val) - 1) * 100
 
 # ──────────── Criar gráfico com subplots ────────────
+import matplotlib.pyplot as plt
+
 plt.style.use('dark_background')
 fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), sharex=True, gridspec_kw={'height_ratios': [2, 1]})
 
 # ──────────── Gráfico 1: Preço + linha tendência ────────────
-asset_name = selected_file.replace("_price_history.csv", "").capitalize()
+asset_name = selected_asset.capitalize()
 ax1.plot(df.index, df["price"], label="Price", color='white', linewidth=2)
 ax1.plot(df.index, trendline, color='red', linestyle='--', linewidth=1.5, label=f"Trend to ATH (${end_val:.4f})")
 
@@ -0,0 +1,125 @@
+# coingecko.py
+# Version 1.3.2 - Pedidos levam a vela e o fim da última vela (a cache calcula o TTL na leitura)
+# 2026-10-18
+
+import os
+
+import pandas as pd
+
+from geckoterminal import OHLCV_DIR, ohlcv_asset
+from http_cache import candle_freshness
+from instrument import span
+from price_store import DATA_DIR, last_timestamp, append_prices, write_prices
+from resample import bucket_floor, normalize_asset, resample_close, resample_ohlc
+from rolling_index import update_index
+
+# Permite apontar para um servidor local (testes / mirror)
+COINGECKO_BASE = os.environ.get("COINGECKO_BASE", "https://api.coingecko.com/api/v3")
+
+# nome do ficheiro em price_data → id na API
+COINS = {
+    "bitcoin": "bitcoin",
+    "ethereum": "ethereum",
+    "solana": "solana"
+}
+
+INITIAL_DAYS = 120  # histórico pedido no primeiro download
+
+
+def granularity_seconds(days):
+    # Granularidade automática do market_chart: 5 min até 1 dia, horária até 90 dias, diária acima
+    if float(days) <= 1:
+        return 300
+    return 3600 if float(days) <= 90 else 86400
+
+
+def _prices_frame(data):
+    with span("coingecko.parse") as s:
+        df = pd.DataFrame(data['prices'], columns=['timestamp', 'price'])
+        # Manter como datetime, não converter para date aqui
+        df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df = df[['date', 'price']].drop_duplicates(subset='date')
+        s.set(rows=len(df))
+    return df
+
+
+def get_hist_coingecko(coin_id, days, engine):
+    url = f"{COINGECKO_BASE}/coins/{coin_id}/market_chart"
+    params = {"vs_currency": "usd", "days": days}
+    with span("coingecko.market_chart", coin=coin_id, days=days):
+        r = engine.get(url, params=params, freshness=candle_freshness(granularity_seconds(days)))
+    if r is None or r.status_code != 200:
+        print(f"Erro ao obter dados para {coin_id}: {r.status_code if r is not None else 'sem resposta'}")
+        return None
+    return _prices_frame(r.json())
+
+
+def get_range_coingecko(coin_id, start, end, engine):
+    # Intervalo fechado [start, end]; a API devolve pontos diários para intervalos > 90 dias
+    url = f"{COINGECKO_BASE}/coins/{coin_id}/market_chart/range"
+    params = {"vs_currency": "usd",
+              "from": int(pd.Timestamp(start).timestamp()),
+              "to": int(pd.Timestamp(end).timestamp())}
+    step = granularity_seconds((params["to"] - params["from"]) / 86400)
+    with span("coingecko.market_chart_range", coin=coin_id):
+        # A última vela acaba em "to" + step: se já tinha fechado ao gravar, a resposta não muda
+        r = engine.get(url, params=params, freshness=candle_freshness(step, params["to"] + step))
+    if r is None or r.status_code != 200:
+        print(f"Erro ao obter dados para {coin_id}: {r.status_code if r is not None else 'sem resposta'}")
+        return None
+    return _prices_frame(r.json())
+
+
+# ──────────── ATUALIZAÇÃO INCREMENTAL ────────────
+def prepare_asset(nome, data_dir=DATA_DIR):
+    # Última data guardada (índice lateral / fim do ficheiro, sem ler o histórico).
+    # Históricos antigos com pontos horários são convertidos uma vez para um ponto por dia.
+    last_date = last_timestamp(nome, data_dir)
+    if last_date is not None and bucket_floor([last_date])[0] != last_date.value:
+        before, after = normalize_asset(nome, data_dir)
+        print(f"🧹 {nome}: normalizado para fecho diário ({before} → {after} linhas)")
+        last_date = last_timestamp(nome, data_dir)
+    return last_date
+
+
+def days_to_fetch(last_date, now=None):
+    if last_date is None:
+        return INITIAL_DAYS
+    now = now or pd.Timestamp.now(tz='UTC').tz_localize(None)
+    return (now - last_date).days + 2
+
+
+def store_update(nome, raw, last_date, hourly=False, data_dir=DATA_DIR, index=None):
+    # Grava a resposta da API: fecho diário (o dia da última linha é regravado) e, opcionalmente,
+    # velas OHLC horárias. index: RollingIndex já carregado (daemon), senão é lido do disco.
+    # Devolve {"days": dias novos, "rows": linhas escritas, "last": (data, preço)}
+    if hourly and len(raw) > 1 and raw["date"].diff().median() <= pd.Timedelta(hours=1):
+        # Só faz sentido com pontos intradiários (pedidos até 90 dias)
+        ohlcv_dir = os.path.join(data_dir, os.path.basename(OHLCV_DIR))
+        candles = resample_ohlc(raw, "hour")
+        hourly_asset = ohlcv_asset(nome, "hour")
+        last_hour = last_timestamp(hourly_asset, ohlcv_dir)
+        if last_hour is not None:
+            candles = candles[candles["date"] >= last_hour]
+        append_prices(hourly_asset, candles, ohlcv_dir, only_newer=False)
+
+    # Um ponto por dia UTC, etiquetado no fim do dia (00:00 seguinte), como os pontos diários antigos;
+    # o dia em curso fica com a etiqueta de amanhã e o preço mais recente até fechar
+    df_new = resample_close(raw, "day")
+    if df_new.empty:
+        return {"days": 0, "rows": 0, "last": None}
+    last = (df_new["date"].iloc[-1], float(df_new["price"].iloc[-1]))
+    if last_date is None:
+        write_prices(nome, df_new, data_dir)
+        return {"days": len(df_new), "rows": len(df_new), "last": last}
+
+    # O dia da última linha é regravado (pode ter sido guardado ainda incompleto)
+    df_new = df_new[df_new["date"] >= last_date]
+    if df_new.empty:
+        return {"days": 0, "rows": 0, "last": None}
+    rows = append_prices(nome, df_new, data_dir, only_newer=False)
+    if index is not None:
+        index.update(nome, refresh_last=True)
+    else:
+        update_index(nome, data_dir)
+    return {"days": int((df_new["date"] > last_date).sum()), "rows": rows, "last": last}
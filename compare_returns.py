@@ -1,24 +1,56 @@
 # compare_returns.py
-# Version 2.0.1 - Some visual issues fixed.
-# 2025-08-24
+# Version 2.12.0 - Métricas dos períodos (menu e batch) a partir do rolling_index; recálculo só sem índice válido
+# 2026-10-18
+#
+# O menu e o argparse só usam a biblioteca standard. pandas/numpy (e o pyarrow, via price_store)
+# carregam-se no primeiro cálculo; o matplotlib só quando há gráfico (--summary-only nunca o importa).
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-from matplotlib.patches import FancyBboxPatch
-import numpy as np
-import glob
 import os
+import sys
+import json
+import argparse
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from chart_render import PRESETS, DEFAULT_PRESET, safe_name
+from instrument import span, traced
+
 # ──────────── Diretório dos dados ────────────
 DATA_DIR = "price_data"
 if not os.path.exists(DATA_DIR):
     print(f"❌ Pasta {DATA_DIR} não encontrada. Corre primeiro os scripts de download.")
     exit()
 
+# Séries carregadas uma vez por sessão; só voltam a ser lidas se o ficheiro mudar
+PRICE_CACHE = None
+
+def price_cache():
+    global PRICE_CACHE
+    if PRICE_CACHE is None:
+        from price_cache import PriceCache
+        PRICE_CACHE = PriceCache(DATA_DIR)
+    return PRICE_CACHE
+
+# Índice pré-calculado (rolling_index.py), também partilhado pela sessão
+ROLLING_INDEX = None
+
+def rolling_index():
+    global ROLLING_INDEX
+    if ROLLING_INDEX is None:
+        from rolling_index import RollingIndex
+        ROLLING_INDEX = RollingIndex(DATA_DIR)
+    return ROLLING_INDEX
+
+def display_name(asset):
+    # Nome de apresentação: Capitalizado, com Qflow renomeado para Quantum Flow
+    name = asset.capitalize()
+    return "Quantum Flow" if name.lower() == "qflow" else name
+
+def _parse_date(text):
+    import pandas as pd
+    return pd.to_datetime(text).date()
+
 # ──────────── 📅 MENU DE PERÍODOS ────────────
 def show_period_menu():
     print("\n" + "="*60)
@@ -85,19 +117,10 @@ def get_date_range():
                 period_name = "1 Year"
                 break
             elif choice == "8":
-                files = glob.glob(os.path.join(DATA_DIR, "*_price_history.csv"))
-                earliest_date = None
+                earliest_date = price_cache().earliest_date()
                 
-                for file in files:
-                    try:
-                        df = pd.read_csv(file, parse_dates=["date"])
-                        file_earliest = df["date"].min().date()
-                        if earliest_date is None or file_earliest < earliest_date:
-                            earliest_date = file_earliest
-                    except:
-                        continue
-                
-                if earliest_date:
+                if earliest_date is not None:
+                    earliest_date = earliest_date.date()
                     start_date = earliest_date
                     end_date = today
                     period_name = "All Time"
@@ -111,8 +134,8 @@ def get_date_range():
                 end_input = input("Data de fim (YYYY-MM-DD): ")
                 
                 try:
-                    start_date = pd.to_datetime(start_input).date()
-                    end_date = pd.to_datetime(end_input).date()
+                    start_date = _parse_date(start_input)
+                    end_date = _parse_date(end_input)
                     
                     if start_date >= end_date:
                         print("❌ A data de início deve ser anterior à data de fim")
@@ -146,71 +169,85 @@ def calculate_drawdown(series):
     return drawdown.min() * 100
 
 def calculate_sharpe(series):
+    import numpy as np
     daily_ret = series.pct_change().dropna()
     if daily_ret.std() == 0:
         return 0
     sharpe = (daily_ret.mean() / daily_ret.std()) * np.sqrt(365)
     return sharpe
 
-def process_and_plot_data(start_date, end_date, period_name):
+@traced("compare.load_series")
+def load_price_series():
     # ──────────── 📁 LER DADOS ────────────
-    files = glob.glob(os.path.join(DATA_DIR, "*_price_history.csv"))
-    if not files:
-        print("❌ No CSV files found in", DATA_DIR)
-        return
+    series_by_name = {}
+    cache = price_cache()
     
-    all_returns = {}
-    all_prices = {}
-    summary_data = []
-    
-    # ──────────── PROCESSAR ATIVOS ────────────
-    for file in files:
+    for asset in cache.assets():
         try:
-            df = pd.read_csv(file, parse_dates=["date"])
-            df = df.set_index("date").sort_index()
-            
-            name = os.path.basename(file).replace("_price_history.csv", "").capitalize()
-            # Renomear Qflow para Quantum Flow
-            if name.lower() == "qflow":
-                name = "Quantum Flow"
-            
-            full_range = pd.date_range(start=start_date, end=end_date, freq='D')
-            df = df.reindex(full_range, method='ffill')
-            df = df.loc[start_date:end_date]
-            
-            if df.empty or df["price"].isnull().all():
-                print(f"⚠️ No valid data for {name}")
-                continue
-            
-            start_price = df["price"].iloc[0]
-            end_price = df["price"].iloc[-1]
-            return_pct = ((end_price / start_price) - 1) * 100
-            max_price = df["price"].max()
-            max_ret = ((max_price / start_price) - 1) * 100
-            drawdown = calculate_drawdown(df["price"])
-            sharpe = calculate_sharpe(df["price"])
-            
-            df["return"] = (df["price"] / start_price - 1) * 100
-            all_returns[name] = df["return"]
-            all_prices[name] = df["price"]
-            
-            summary_data.append({
-                'name': name,
-                'start_price': start_price,
-                'end_price': end_price,
-                'return_pct': return_pct,
-                'max_ret': max_ret,
-                'drawdown': drawdown,
-                'sharpe': sharpe
-            })
+            series_by_name[display_name(asset)] = cache.get(asset)["price"]
             
         except Exception as e:
-            print(f"Erro ao processar {file}: {e}")
+            print(f"Erro ao processar {asset}: {e}")
     
+    return series_by_name
+
+@traced("compare.index_metrics")
+def index_metrics(start_date, end_date):
+    # Retorno, retorno máximo, drawdown e Sharpe do período a partir do rolling_index (atualizado
+    # primeiro com os dias acrescentados). Devolve (métricas por nome, nomes sem índice válido).
+    import pandas as pd
+    from metrics_engine import METRIC_COLUMNS
+    from price_store import last_timestamp
+    index = rolling_index()
+    rows, stale = {}, set()
+    for asset in price_cache().assets():
+        name = display_name(asset)
+        try:
+            index.update(asset, refresh_last=True)
+            asset_index = index.assets[asset]
+            if asset_index.last_obs != last_timestamp(asset, DATA_DIR):
+                stale.add(name)          # ficheiro reescrito/truncado: o índice já não corresponde
+                continue
+            metrics = asset_index.window(start_date, end_date)
+        except Exception:
+            stale.add(name)
+            continue
+        if metrics is not None:
+            rows[name] = {column: metrics[column] for column in METRIC_COLUMNS}
+    result = pd.DataFrame.from_dict(rows, orient="index", columns=METRIC_COLUMNS)
+    result.index.name = "name"
+    return result, stale
+
+@traced("compare.summarize")
+def summarize_period(prices, verbose=True, indexed=None):
+    # prices: matriz (datas × ativos) já alinhada e cortada ao período.
+    # indexed: resultado de index_metrics; só os ativos sem índice válido são recalculados da matriz
+    import pandas as pd
+    from metrics_engine import compute_metrics, cumulative_returns
+    from cross_asset import cross_asset_summary
+    for name in prices.columns[prices.isna().all()]:
+        if verbose:
+            print(f"⚠️ No valid data for {name}")
+    prices = prices.loc[:, prices.notna().any()]
+    if indexed is None:
+        metrics = compute_metrics(prices)
+    else:
+        from_index, stale = indexed
+        fallback = [name for name in prices.columns if name in stale or name not in from_index.index]
+        metrics = pd.concat([from_index.loc[[n for n in prices.columns if n not in fallback]],
+                             compute_metrics(prices[fallback])])
+        metrics = metrics.loc[[n for n in prices.columns if n in metrics.index]]
+    metrics = metrics.join(cross_asset_summary(prices))
+    summary_data = [{'name': name, **row} for name, row in metrics.to_dict('index').items()]
+    returns_df = cumulative_returns(prices)
+    returns_df.index.name = "Date"
+    return summary_data, returns_df
+
+def print_summary(summary_data, period_name):
     # ──────────── RESUMO NO TERMINAL ────────────
     print(f"\n📈 Performance Summary - {period_name}:\n")
-    print(f"{'Asset':<10} | {'Start Price':>12} | {'End Price':>12} | {'Return':>8} | {'Max Return':>11} | {'Max DD':>9} | {'Sharpe':>7}")
-    print("-" * 95)
+    print(f"{'Asset':<10} | {'Start Price':>12} | {'End Price':>12} | {'Return':>8} | {'Max Return':>11} | {'Max DD':>9} | {'Sharpe':>7} | {'Beta':>6} | {'ρ BTC':>6}")
+    print("-" * 113)
     
     for data in summary_data:
         print(
@@ -220,234 +257,183 @@ def process_and_plot_data(start_date, end_date, period_name):
             f"{data['return_pct']:>7.2f}% | "
             f"{data['max_ret']:>10.2f}% | "
             f"{data['drawdown']:>8.2f}% | "
-            f"{data['sharpe']:>6.2f}"
+            f"{data['sharpe']:>6.2f} | "
+            f"{data['beta']:>6.2f} | "
+            f"{data['corr_btc']:>6.2f}"
         )
+
+@traced("compare.process_and_plot")
+def process_and_plot_data(start_date, end_date, period_name, preset=DEFAULT_PRESET, plot=True,
+                          ci_paths=0, ci_method="block", chart=None):
+    from price_panel import PricePanel
+    series_by_name = load_price_series()
+    if not series_by_name:
+        print("❌ No price files found in", DATA_DIR)
+        return
+    
+    # Matriz comum (datas × ativos) e métricas de todos os ativos numa só passagem
+    prices = PricePanel.from_series(series_by_name, start_date, end_date).to_frame()
+    summary_data, returns_df = summarize_period(prices, indexed=index_metrics(start_date, end_date))
+    print_summary(summary_data, period_name)
+    if ci_paths:
+        from bootstrap import confidence_intervals, print_intervals
+        print_intervals(confidence_intervals(prices, ci_paths, ci_method))
+    if not plot:
+        return True
     
     # ──────────── GRÁFICO MELHORADO ────────────
-    if not all_returns:
+    if returns_df.empty or not len(returns_df.columns):
         print("❌ No valid data to plot.")
         return
     
-    returns_df = pd.DataFrame(all_returns)
-    returns_df.index.name = "Date"
-    
-    # Configuração do estilo profissional
-    plt.style.use('seaborn-v0_8-darkgrid')
-    
-    # Cores gradientes profissionais - TROCADAS Ethereum e Solana
-    custom_colors = {
-        "Bitcoin": "#FF6B35",      # Laranja vibrante
-        "Ethereum": "#10B981",     # Verde menta (trocado com Solana)
-        "Solana": "#3B82F6",       # Azul moderno (trocado com Ethereum)
-        "Quantum Flow": "#8B5CF6"  # Roxo premium
-    }
-    
-    # Criar figura com layout profissional
-    fig = plt.figure(figsize=(18, 10))  # Aumentado de 16 para 18 de largura
-    gs = fig.add_gridspec(3, 2, height_ratios=[2.5, 0.8, 0.5], width_ratios=[3, 1], hspace=0.3, wspace=0.2)
-    
-    # Gráfico principal
-    ax_main = fig.add_subplot(gs[0, :])
-    ax_main.set_facecolor('#0F0F0F')
+    if chart is not None:
+        # Figura persistente: só os dados mudam; a janela fica aberta e o menu não bloqueia
+        filename, seconds = chart.render(returns_df, summary_data, start_date, end_date, period_name)
+        print(f"\n✅ Gráfico guardado como: {filename} ({seconds:.2f}s, preset '{preset}', figura reutilizada)")
+        with span("chart.show"):
+            chart.show()
+        return True
+    
+    import matplotlib.pyplot as plt
+    from chart_render import render_returns_chart
+    filename, seconds = render_returns_chart(returns_df, summary_data, start_date, end_date,
+                                             period_name, preset=preset)
+    print(f"\n✅ Gráfico guardado como: {filename} ({seconds:.2f}s, preset '{preset}')")
+    with span("chart.show"):
+        plt.show()
     
-    # Adicionar gradiente de fundo
-    gradient = np.linspace(0, 1, 100).reshape(1, -1)
-    ax_main.imshow(gradient, extent=[returns_df.index[0], returns_df.index[-1], 
-                                     returns_df.min().min() - 10, returns_df.max().max() + 10],
-                   aspect='auto', cmap='gray', alpha=0.1, zorder=0)
-    
-    # Plotar linhas com efeito glow
-    for i, col in enumerate(returns_df.columns):
-        color = custom_colors.get(col, f"C{i}")
-        y = returns_df[col]
-        is_quantum = col == "Quantum Flow"
-        
-        # Efeito glow
-        for glow_width in [8, 5, 3]:
-            ax_main.plot(returns_df.index, y, color=color, alpha=0.1, 
-                        linewidth=glow_width, zorder=1)
-        
-        # Linha principal
-        line = ax_main.plot(
-            returns_df.index, y,
-            label=col,
-            color=color,
-            linewidth=3.5 if is_quantum else 2.5,
-            alpha=0.95,
-            zorder=2
-        )[0]
-        
-        # Marcador no último ponto
-        ax_main.scatter(returns_df.index[-1], y.iloc[-1], 
-                        color=color, s=150 if is_quantum else 100, 
-                        zorder=3, edgecolors='white', linewidth=2)
-        
-        # Calcular posição mais inteligente para as labels
-        x_pos = returns_df.index[-1]
-        y_pos = y.iloc[-1]
-        
-        # Ajustar horizontalmente para evitar corte
-        # Em vez de adicionar dias, usar coordenadas de dados mais precisas
-        x_offset = pd.Timedelta(hours=6)  # Offset menor
-        
-        # Ajustar verticalmente para evitar sobreposição
-        label_spacing = 2.5  # Espaçamento vertical entre labels
-        sorted_final_values = sorted([(col, returns_df[col].iloc[-1]) for col in returns_df.columns], 
-                                    key=lambda x: x[1], reverse=True)
-        
-        # Encontrar a posição desta crypto na lista ordenada
-        position_index = next(i for i, (name, _) in enumerate(sorted_final_values) if name == col)
-        
-        # Se as labels estão muito próximas, ajustar verticalmente
-        if len(returns_df.columns) > 1:
-            y_range = returns_df.iloc[-1].max() - returns_df.iloc[-1].min()
-            if y_range < 10:  # Se a diferença entre valores finais é pequena
-                # Distribuir labels verticalmente
-                base_y = returns_df.iloc[-1].mean()
-                y_pos = base_y + (position_index - len(returns_df.columns)/2 + 0.5) * label_spacing
-        
-        # Label do valor final com caixa estilizada - posição corrigida
-        bbox_props = dict(boxstyle="round,pad=0.3", 
-                        facecolor=color, alpha=0.8, 
-                        edgecolor='white', linewidth=1)
-        
-        label_text = ax_main.text(
-            x_pos + x_offset,  # Posição X ajustada
-            y_pos,             # Posição Y ajustada
-            f"{col}: {returns_df[col].iloc[-1]:+.1f}%",
-            color='white',
-            fontsize=11 if is_quantum else 10,
-            fontweight='bold',
-            va='center',
-            ha='left',  # Adicionado alinhamento horizontal
-            bbox=bbox_props,
-            clip_on=False  # Importante: permite que o texto apareça fora da área do plot
-        )
-    
-    # Configuração do gráfico principal
-    ax_main.set_title(f"PERFORMANCE COMPARISON - {period_name.upper()}", 
-                     fontsize=20, fontweight='bold', color='white', pad=20)
-    ax_main.set_xlabel("Date", fontsize=14, color='#CCCCCC')
-    ax_main.set_ylabel("Cumulative Return (%)", fontsize=14, color='#CCCCCC')
-    
-    # Mudar cor dos valores dos eixos para branco
-    ax_main.tick_params(axis='x', colors='white')
-    ax_main.tick_params(axis='y', colors='white')
-    
-    # Grid estilizado
-    ax_main.grid(True, linestyle='--', alpha=0.2, color='#444444')
-    ax_main.axhline(y=0, color='#666666', linestyle='-', linewidth=1, alpha=0.5)
-    
-    # Legenda estilizada
-    legend = ax_main.legend(loc='upper left', frameon=True, fancybox=True, 
-                           shadow=True, fontsize=12)
-    legend.get_frame().set_facecolor('#1A1A1A')
-    legend.get_frame().set_alpha(0.9)
-    legend.get_frame().set_edgecolor('#444444')
-    
-    # Mudar cor do texto da legenda para branco
-    for text in legend.get_texts():
-        text.set_color('white')
-    
-    # Adicionar linha de tendência suave para o melhor performer
-    best_performer = returns_df.iloc[-1].idxmax()
-    z = np.polyfit(range(len(returns_df)), returns_df[best_performer], 2)
-    p = np.poly1d(z)
-    ax_main.plot(returns_df.index, p(range(len(returns_df))), 
-                '--', alpha=0.3, color='yellow', linewidth=1, 
-                label='Trend')
-    
-    # Tabela de métricas
-    ax_table = fig.add_subplot(gs[1, :])
-    ax_table.axis('tight')
-    ax_table.axis('off')
-    
-    # Preparar dados da tabela
-    table_data = []
-    headers = ['Asset', 'Return', 'Max DD', 'Sharpe', 'Status']
-    
-    for data in sorted(summary_data, key=lambda x: x['return_pct'], reverse=True):
-        status = "↑" if data['return_pct'] > 50 else "+" if data['return_pct'] > 0 else "↓"
-        table_data.append([
-            data['name'],
-            f"{data['return_pct']:+.2f}%",
-            f"{data['drawdown']:.2f}%",
-            f"{data['sharpe']:.2f}",
-            status
-        ])
-    
-    table = ax_table.table(cellText=table_data, colLabels=headers,
-                          cellLoc='center', loc='center',
-                          colWidths=[0.2, 0.2, 0.2, 0.2, 0.1])
-    
-    table.auto_set_font_size(False)
-    table.set_fontsize(11)
-    table.scale(1, 2)
-    
-    # Estilizar tabela
-    for i in range(len(headers)):
-        table[(0, i)].set_facecolor('#2E2E2E')
-        table[(0, i)].set_text_props(weight='bold', color='white')
-    
-    for i in range(1, len(table_data) + 1):
-        for j in range(len(headers)):
-            # Highlight para Quantum Flow sempre
-            if table_data[i-1][0] == "Quantum Flow":
-                table[(i, j)].set_facecolor('#3B1E6B')  # Roxo escuro para Quantum Flow
-            elif i == 1 and table_data[0][0] != "Quantum Flow":  # Melhor performer (se não for Quantum Flow)
-                table[(i, j)].set_facecolor('#1B4332')
-            else:
-                table[(i, j)].set_facecolor('#1A1A1A')
-            table[(i, j)].set_text_props(color='white')
-    
-    # Rodapé com informações
-    ax_footer = fig.add_subplot(gs[2, :])
-    ax_footer.axis('off')
-    
-    day_count = (end_date - start_date).days + 1
-    footer_text = (f"Period: {start_date} to {end_date} ({day_count} days) | "
-                  f"Best: {best_performer} ({returns_df[best_performer].iloc[-1]:+.1f}%) | "
-                  f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    
-    ax_footer.text(0.5, 0.5, footer_text, ha='center', va='center',
-                  fontsize=12, color='#888888', style='italic',
-                  bbox=dict(boxstyle="round,pad=0.5", facecolor='#1A1A1A', 
-                           edgecolor='#444444', alpha=0.8))
-    
-    x_min, x_max = ax_main.get_xlim()
-    y_min, y_max = ax_main.get_ylim()
+    return True
 
-    # Expandir limite direito para acomodar as labels
-    x_padding = (x_max - x_min) * 0.15  # 15% de padding à direita
-    ax_main.set_xlim(x_min, x_max + x_padding)
+# ──────────── MODO BATCH (SEM INTERAÇÃO) ────────────
+def batch_periods(end_date, earliest_date, custom=None):
+    # Os mesmos períodos do menu: janelas standard, desde o início e (opcional) personalizado
+    from rolling_index import STANDARD_WINDOWS
+    periods = [(end_date - timedelta(days=days), end_date, name) for name, days in STANDARD_WINDOWS.items()]
+    if earliest_date is not None:
+        periods.append((earliest_date, end_date, "All Time"))
+    if custom:
+        start, end = (_parse_date(d) for d in custom)
+        periods.append((start, end, f"{start} to {end}"))
+    return periods
 
-    # Expandir limites verticais se necessário
-    y_padding = (y_max - y_min) * 0.05  # 5% de padding vertical
-    ax_main.set_ylim(y_min - y_padding, y_max + y_padding)
-    
-    # Configuração geral da figura
-    fig.patch.set_facecolor('#0A0A0A')
-    plt.suptitle("CRYPTO RETURNS ANALYSIS", fontsize=24, fontweight='bold', 
-                color='white', y=0.98)
-    
-    # Salvar com alta qualidade
-    safe_period_name = period_name.replace(" ", "_").replace("/", "-")
-    filename = f"crypto_returns_{safe_period_name}_{datetime.now().strftime('%Y%m%d_%H%M')}.png"
-    plt.savefig(filename, dpi=300, facecolor='#0A0A0A', edgecolor='none', 
-               bbox_inches='tight', pad_inches=0.3)
-    
-    print(f"\n✅ Gráfico guardado como: {filename}")
-    plt.show()
+def _json_value(value):
+    import numpy as np
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
 
-    
-    return True
+def run_batch_report(output_dir="reports", end_date=None, charts=True, workers=None, custom=None,
+                     preset=DEFAULT_PRESET, ci_paths=0, ci_method="block"):
+    import pandas as pd
+    from price_panel import PricePanel
+    from cross_asset import correlation_matrix, daily_returns
+    os.makedirs(output_dir, exist_ok=True)
+    end_date = end_date or datetime.now().date()
+    series_by_name = load_price_series()
+    if not series_by_name:
+        print("❌ No price files found in", DATA_DIR)
+        return None
+    
+    # Uma só matriz alinhada do primeiro dia disponível até end_date; cada período é um corte dela
+    earliest = price_cache().earliest_date()
+    earliest_date = earliest.date() if earliest is not None else None
+    periods = batch_periods(end_date, earliest_date, custom)
+    first_day = min(start for start, _, _ in periods)
+    last_day = max(end for _, end, _ in periods)
+    panel = PricePanel.from_series(series_by_name, first_day, last_day)
+    
+    rows = []
+    report = {"generated": datetime.now().isoformat(timespec="seconds"), "periods": []}
+    chart_jobs = []
+    for start_date, period_end, period_name in periods:
+        prices = panel.slice(start_date, period_end).to_frame()
+        summary_data, returns_df = summarize_period(prices, verbose=False,
+                                                    indexed=index_metrics(start_date, period_end))
+        print_summary(summary_data, period_name)
+        
+        summary_df = pd.DataFrame(summary_data)
+        summary_df.to_csv(os.path.join(output_dir, f"summary_{safe_name(period_name)}.csv"), index=False)
+        correlation_matrix(daily_returns(prices)).to_csv(
+            os.path.join(output_dir, f"correlation_{safe_name(period_name)}.csv"))
+        if ci_paths:
+            from bootstrap import confidence_intervals, print_intervals
+            intervals = confidence_intervals(prices, ci_paths, ci_method)
+            print_intervals(intervals)
+            intervals.to_csv(os.path.join(output_dir, f"ci_{safe_name(period_name)}.csv"))
+        for data in summary_data:
+            rows.append({'period': period_name, 'start_date': str(start_date), 'end_date': str(period_end), **data})
+        report["periods"].append({
+            "period": period_name,
+            "start_date": str(start_date),
+            "end_date": str(period_end),
+            "assets": [{k: _json_value(v) for k, v in data.items()} for data in summary_data],
+        })
+        if charts and len(returns_df.columns):
+            chart_jobs.append((returns_df, summary_data, start_date, period_end, period_name, output_dir))
+    
+    pd.DataFrame(rows).to_csv(os.path.join(output_dir, "summary_all_periods.csv"), index=False)
+    with open(os.path.join(output_dir, "summary_all_periods.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    
+    # ──────────── GRÁFICOS (Agg, opcionalmente num pool de processos) ────────────
+    if chart_jobs:
+        from chart_render import render_many, render_report
+        charts_done = render_many(chart_jobs, workers, preset)
+        for filename, seconds in charts_done:
+            print(f"✅ Gráfico guardado como: {filename} ({seconds:.2f}s)")
+        print(render_report(charts_done, preset))
+    
+    print(f"\n✅ Relatórios guardados em: {output_dir}")
+    return report
+
+# ──────────── DASHBOARD (PNG FIXO ATUALIZADO PERIODICAMENTE) ────────────
+def run_dashboard(interval, days=30, output_dir="reports", preset=DEFAULT_PRESET, runs=0):
+    # Últimos N dias re-renderizados a cada "interval" segundos para o mesmo ficheiro. O PriceCache só
+    # relê os ficheiros que mudaram e a PersistentChart só troca os dados (blit se os limites servirem).
+    import time
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    from chart_render import PersistentChart
+    from price_panel import PricePanel
+    plt.switch_backend("Agg")
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, "dashboard.png")
+    chart = PersistentChart(preset)
+    done = 0
+    try:
+        while not runs or done < runs:
+            t0 = time.perf_counter()
+            end_date = pd.Timestamp.now().normalize()
+            start_date = end_date - pd.Timedelta(days=days)
+            series_by_name = load_price_series()
+            prices = PricePanel.from_series(series_by_name, start_date, end_date).to_frame()
+            summary_data, returns_df = summarize_period(prices, verbose=False)
+            if returns_df.empty:
+                print("❌ No valid data to plot.")
+            else:
+                _, seconds = chart.render(returns_df, summary_data, start_date, end_date,
+                                          f"Last {days} Days", filename=filename)
+                print(f"🔄 {datetime.now():%H:%M:%S} {filename} (gráfico {seconds:.2f}s, "
+                      f"total {time.perf_counter() - t0:.2f}s, {chart.stats})")
+            done += 1
+            if not runs or done < runs:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Dashboard parado.")
+    finally:
+        chart.close()
 
 # ──────────── LOOP PRINCIPAL ────────────
-def main():
+def main(preset=DEFAULT_PRESET, plot=True, ci_paths=0, ci_method="block", live=False):
     print("\n" + "="*60)
     print("🚀 BEM-VINDO AO ANALISADOR DE RETORNOS CRYPTO")
     print("="*60)
     
+    chart = None
+    if live and plot:
+        from chart_render import PersistentChart
+        chart = PersistentChart(preset)
+    
     while True:
         start_date, end_date, period_name = get_date_range()
         
@@ -459,7 +445,7 @@ def main():
             break
         
         try:
-            process_and_plot_data(start_date, end_date, period_name)
+            process_and_plot_data(start_date, end_date, period_name, preset, plot, ci_paths, ci_method, chart)
             
             print("\n" + "-"*60)
             input("📊 Prima ENTER para voltar ao menu principal...")
@@ -469,4 +455,36 @@ def main():
             input("Prima ENTER para continuar...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Análise de retornos crypto")
+    parser.add_argument("--batch", action="store_true", help="Gerar todos os períodos sem menu (cron/CI)")
+    parser.add_argument("--output-dir", default="reports", help="Pasta dos relatórios do modo batch")
+    parser.add_argument("--end-date", help="Data final dos períodos (YYYY-MM-DD), por omissão hoje")
+    parser.add_argument("--custom", nargs=2, metavar=("START", "END"), help="Período personalizado adicional")
+    parser.add_argument("--no-charts", action="store_true", help="Só JSON/CSV, sem gráficos")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Só a tabela de resumo, sem gráficos (não importa o matplotlib)")
+    parser.add_argument("--workers", type=int, default=1, help="Processos para renderizar os gráficos")
+    parser.add_argument("--quality", choices=sorted(PRESETS), default=DEFAULT_PRESET,
+                        help="Preset de renderização (preview = rápido, publication = dpi 300)")
+    parser.add_argument("--ci", type=int, default=0, metavar="PATHS",
+                        help="Intervalos de confiança do Sharpe/drawdown com N caminhos reamostrados")
+    parser.add_argument("--ci-method", choices=["block", "gbm"], default="block",
+                        help="Bootstrap por blocos ou Monte Carlo GBM")
+    parser.add_argument("--live", action="store_true",
+                        help="Reutilizar a mesma figura/janela entre períodos do menu (só os dados mudam)")
+    parser.add_argument("--dashboard", type=float, metavar="SECONDS",
+                        help="Re-renderizar os últimos --days dias para <output-dir>/dashboard.png a cada N segundos")
+    parser.add_argument("--days", type=int, default=30, help="Janela do --dashboard em dias")
+    parser.add_argument("--runs", type=int, default=0, help="N.º de atualizações do --dashboard (0 = sem fim)")
+    args = parser.parse_args()
+    
+    if args.dashboard:
+        run_dashboard(args.dashboard, args.days, args.output_dir, args.quality, args.runs)
+        sys.exit(0)
+    if args.batch:
+        end_date = _parse_date(args.end_date) if args.end_date else None
+        charts = not (args.no_charts or args.summary_only)
+        result = run_batch_report(args.output_dir, end_date, charts, args.workers, args.custom, args.quality,
+                                  args.ci, args.ci_method)
+        sys.exit(0 if result is not None else 1)
+    main(args.quality, plot=not args.summary_only, ci_paths=args.ci, ci_method=args.ci_method, live=args.live)
\ No newline at end of file
@@ -0,0 +1,267 @@
+# cross_asset.py
+# Version 1.0.0 - Risco entre ativos: covariância, correlação e beta (completos e em janela móvel)
+# 2026-10-18
+#
+# Trabalha sobre a matriz alinhada (datas × ativos) do metrics_engine.align_prices.
+# Ativos com histórico mais curto têm NaN: cada par usa só os dias em que ambos têm retorno
+# (igual ao df.cov()/df.corr() do pandas), mas todos os pares são calculados de uma vez com
+# produtos de matrizes sobre somas mascaradas:
+#   n_ij   = Σ m_i m_j          sx_ij  = Σ x_i m_j        sxx_ij = Σ x_i² m_j       sxy_ij = Σ x_i x_j
+# Na janela móvel estas somas são atualizadas por cada dia que entra/sai (duas atualizações de
+# posto 1, O(N²) por passo em vez de O(janela × N²) de um df.corr() por janela).
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from metrics_engine import ANNUALIZATION
+
+BENCHMARK = "Bitcoin"
+REFRESH_EVERY = 256   # passos entre recálculos exatos das somas móveis (limita o erro acumulado)
+
+
+def daily_returns(prices):
+    # Retornos simples diários; NaN onde falta o preço de hoje ou de ontem
+    values = prices.to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = values[1:] / values[:-1] - 1
+    return pd.DataFrame(returns, index=prices.index[1:], columns=prices.columns)
+
+
+# ──────────── SOMAS MASCARADAS ────────────
+class PairSums:
+    # Somas pareadas de um bloco de retornos (linhas × ativos); suportam somar/retirar linhas
+    def __init__(self, n_assets):
+        shape = (n_assets, n_assets)
+        self.n = np.zeros(shape)
+        self.sx = np.zeros(shape)
+        self.sxx = np.zeros(shape)
+        self.sxy = np.zeros(shape)
+
+    @staticmethod
+    def _parts(block):
+        block = np.atleast_2d(block)
+        mask = (~np.isnan(block)).astype(np.float64)
+        x = np.where(mask > 0, block, 0.0)
+        return mask, x
+
+    @classmethod
+    def from_block(cls, block):
+        sums = cls(np.atleast_2d(block).shape[1])
+        sums.add(block)
+        return sums
+
+    def add(self, block, sign=1.0):
+        mask, x = self._parts(block)
+        self.n += sign * (mask.T @ mask)
+        self.sx += sign * (x.T @ mask)
+        self.sxx += sign * ((x * x).T @ mask)
+        self.sxy += sign * (x.T @ x)
+
+    def remove(self, block):
+        self.add(block, sign=-1.0)
+
+    def cov(self, min_periods=2):
+        n, sx, sy = self.n, self.sx, self.sx.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (self.sxy - sx * sy / n) / (n - 1)
+        cov[n < max(min_periods, 2)] = np.nan
+        return cov
+
+    def corr(self, min_periods=2):
+        n, sx, sy = self.n, self.sx, self.sx.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            num = n * self.sxy - sx * sy
+            var_x = n * self.sxx - sx * sx
+            var_y = n * self.sxx.T - sy * sy
+            corr = num / np.sqrt(var_x * var_y)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))  # evita 0.9999999
+        corr[n < max(min_periods, 2)] = np.nan
+        return corr
+
+    def beta(self, min_periods=2):
+        # beta[i, j] = cov(i, j) / var(j), ambos nos dias em que i e j têm retorno
+        n, sx, sy = self.n, self.sx, self.sx.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            beta = (n * self.sxy - sx * sy) / (n * self.sxx.T - sy * sy)
+        beta[n < max(min_periods, 2)] = np.nan
+        return beta
+
+
+# ──────────── MATRIZES COMPLETAS ────────────
+def _frame(matrix, names):
+    return pd.DataFrame(matrix, index=pd.Index(names, name="asset"), columns=names)
+
+
+def covariance_matrix(returns, min_periods=2, annualize=False):
+    cov = PairSums.from_block(returns.to_numpy(dtype=np.float64)).cov(min_periods)
+    return _frame(cov * ANNUALIZATION if annualize else cov, returns.columns)
+
+
+def correlation_matrix(returns, min_periods=2):
+    return _frame(PairSums.from_block(returns.to_numpy(dtype=np.float64)).corr(min_periods), returns.columns)
+
+
+def betas(returns, benchmark=BENCHMARK, min_periods=2):
+    # Beta de cada ativo face ao benchmark (NaN se o benchmark não estiver no painel)
+    if benchmark not in returns.columns:
+        return pd.Series(np.nan, index=returns.columns, name="beta")
+    values = returns.to_numpy(dtype=np.float64)
+    j = returns.columns.get_loc(benchmark)
+    sums = PairSums.from_block(values)
+    return pd.Series(sums.beta(min_periods)[:, j], index=returns.columns, name="beta")
+
+
+def cross_asset_summary(prices, benchmark=BENCHMARK):
+    # Colunas extra para a tabela de resumo: beta e correlação com o benchmark
+    returns = daily_returns(prices)
+    if benchmark not in returns.columns or returns.empty:
+        nan = pd.Series(np.nan, index=returns.columns)
+        return pd.DataFrame({"beta": nan, "corr_btc": nan})
+    sums = PairSums.from_block(returns.to_numpy(dtype=np.float64))
+    j = returns.columns.get_loc(benchmark)
+    return pd.DataFrame({"beta": sums.beta()[:, j], "corr_btc": sums.corr()[:, j]}, index=returns.columns)
+
+
+# ──────────── JANELA MÓVEL ────────────
+def iter_rolling(returns, window, refresh_every=REFRESH_EVERY):
+    # Gera (data, PairSums) para cada janela [t-window+1, t]; cada passo só soma o dia que entra
+    # e retira o que sai. As somas são recalculadas de raiz a cada refresh_every passos.
+    values = returns.to_numpy(dtype=np.float64)
+    if len(values) < window:
+        return
+    sums = PairSums.from_block(values[:window])
+    yield returns.index[window - 1], sums
+    for step, t in enumerate(range(window, len(values)), start=1):
+        if step % refresh_every == 0:
+            sums = PairSums.from_block(values[t - window + 1:t + 1])
+        else:
+            sums.add(values[t])
+            sums.remove(values[t - window])
+        yield returns.index[t], sums
+
+
+def rolling_correlation(returns, window, min_periods=None):
+    # Array (janelas × ativos × ativos) e as datas de fim de cada janela
+    min_periods = min_periods or window // 2
+    dates, mats = [], []
+    for date, sums in iter_rolling(returns, window):
+        dates.append(date)
+        mats.append(sums.corr(min_periods))
+    n = len(returns.columns)
+    return pd.DatetimeIndex(dates), np.array(mats) if mats else np.empty((0, n, n))
+
+
+def rolling_pairs(returns, window, min_periods=None):
+    # Formato longo (date, asset_a, asset_b, corr) só com o triângulo superior
+    dates, mats = rolling_correlation(returns, window, min_periods)
+    names = np.asarray(returns.columns)
+    i, j = np.triu_indices(len(names), k=1)
+    return pd.DataFrame({
+        "date": np.repeat(dates.values, len(i)),
+        "asset_a": np.tile(names[i], len(dates)),
+        "asset_b": np.tile(names[j], len(dates)),
+        "corr": mats[:, i, j].ravel(),
+    })
+
+
+def rolling_beta(returns, window, benchmark=BENCHMARK, min_periods=None):
+    # Beta/correlação móvel de todos os ativos face ao benchmark com somas prefixas: O(T × N)
+    min_periods = min_periods or window // 2
+    values = returns.to_numpy(dtype=np.float64)
+    bench = values[:, returns.columns.get_loc(benchmark)][:, None]
+    both = ~np.isnan(values) & ~np.isnan(bench)
+    x = np.where(both, values, 0.0)
+    y = np.where(both, bench, 0.0)
+
+    def window_sum(a):
+        c = np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+        return c[window:] - c[:-window]
+
+    n = window_sum(both.astype(np.float64))
+    sx, sy = window_sum(x), window_sum(y)
+    sxy, syy, sxx = window_sum(x * y), window_sum(y * y), window_sum(x * x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        beta = cov / (n * syy - sy * sy)
+        corr = cov / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+    beta[n < min_periods] = np.nan
+    corr[n < min_periods] = np.nan
+    index = returns.index[window - 1:]
+    return (pd.DataFrame(beta, index=index, columns=returns.columns),
+            pd.DataFrame(corr, index=index, columns=returns.columns))
+
+
+# ──────────── EXPORTAÇÃO ────────────
+def save_heatmap(matrix, title, filename):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    n = len(matrix)
+    size = min(4 + 0.35 * n, 40)
+    fig, ax = plt.subplots(figsize=(size, size * 0.85))
+    image = ax.imshow(matrix.to_numpy(), cmap="RdYlGn", vmin=-1, vmax=1)
+    fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+    if n <= 60:
+        ax.set_xticks(range(n), matrix.columns, rotation=90)
+        ax.set_yticks(range(n), matrix.index)
+        if n <= 15:
+            for (i, j), value in np.ndenumerate(matrix.to_numpy()):
+                if not np.isnan(value):
+                    ax.text(j, i, f"{value:.2f}", ha="center", va="center", fontsize=9)
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(filename, dpi=120)
+    plt.close(fig)
+    return filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Covariância, correlação e beta entre ativos")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD), por omissão o início dos dados")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD), por omissão hoje")
+    parser.add_argument("--window", type=int, default=30, help="Janela móvel em dias")
+    parser.add_argument("--benchmark", default=BENCHMARK)
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--rolling-pairs", action="store_true",
+                        help="Exportar também a correlação móvel de todos os pares (formato longo)")
+    parser.add_argument("--no-heatmap", action="store_true")
+    args = parser.parse_args()
+
+    from compare_returns import load_price_series, price_cache
+    from metrics_engine import align_prices
+
+    series_by_name = load_price_series()
+    if not series_by_name:
+        print("❌ Sem dados em price_data.")
+        sys.exit(1)
+    start = pd.Timestamp(args.start) if args.start else price_cache().earliest_date().normalize()
+    end = pd.Timestamp(args.end) if args.end else pd.Timestamp.now().normalize()
+    returns = daily_returns(align_prices(series_by_name, start, end))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    corr = correlation_matrix(returns)
+    corr.to_csv(os.path.join(args.output_dir, "correlation.csv"))
+    covariance_matrix(returns, annualize=True).to_csv(os.path.join(args.output_dir, "covariance_annualized.csv"))
+    print(f"\n🔗 Correlação diária ({start.date()} → {end.date()}, {len(returns)} dias):\n")
+    print(corr.to_string(float_format=lambda v: f"{v:.3f}"))
+
+    if args.benchmark in returns.columns:
+        beta, corr_bench = rolling_beta(returns, args.window, args.benchmark)
+        beta.to_csv(os.path.join(args.output_dir, f"rolling_beta_{args.window}d.csv"))
+        corr_bench.to_csv(os.path.join(args.output_dir, f"rolling_corr_{args.window}d.csv"))
+        print(f"\n📐 Beta face a {args.benchmark}:\n")
+        print(betas(returns, args.benchmark).to_string(float_format=lambda v: f"{v:.3f}"))
+    if args.rolling_pairs:
+        rolling_pairs(returns, args.window).to_csv(
+            os.path.join(args.output_dir, f"rolling_pairs_{args.window}d.csv"), index=False)
+    if not args.no_heatmap:
+        filename = save_heatmap(corr, f"Correlation {start.date()} → {end.date()}",
+                                os.path.join(args.output_dir, "correlation_heatmap.png"))
+        print(f"\n✅ Heatmap guardado como: {filename}")
+    print(f"✅ CSVs guardados em: {args.output_dir}")
@@ -0,0 +1,166 @@
+# dex_tracker.py
+# Version 1.3.0 - Fecho diário etiquetado no fim da vela; históricos antigos (início da vela) migrados uma vez
+# 2026-10-18
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fetch_engine import engine_from_env
+from geckoterminal import (TIMEFRAMES, OHLCV_DIR, RETENTION_DAYS, iter_ohlcv_pages,
+                           ohlcv_asset, ohlcv_to_prices)
+from price_store import last_timestamp, append_prices, read_prices, read_prices_since, write_prices, compact, parquet_parts
+from rolling_index import reset_index, update_index
+
+REGISTRY_FILE = "dex_pools.json"
+
+
+def load_registry(path=REGISTRY_FILE):
+    with open(path) as f:
+        pools = json.load(f)["pools"]
+    for entry in pools:
+        entry.setdefault("network", "solana")
+        entry.setdefault("timeframe", "day")
+        entry.setdefault("aggregate", 1)
+        if entry["timeframe"] not in TIMEFRAMES:
+            raise ValueError(f"timeframe inválido em {entry['symbol']}: {entry['timeframe']}")
+    return pools
+
+
+def is_up_to_date(entry, now=None):
+    # Já existe a última vela possível? (a próxima só fecha daqui a um intervalo)
+    last = last_timestamp(ohlcv_asset(entry["symbol"], entry["timeframe"], entry["aggregate"]), OHLCV_DIR)
+    if last is None:
+        return False, None
+    now = now or pd.Timestamp.now(tz="UTC").tz_localize(None)
+    step = pd.Timedelta(seconds=TIMEFRAMES[entry["timeframe"]] * entry["aggregate"])
+    return last + step > now, last
+
+
+def retention_cutoff(timeframe):
+    # Velas anteriores a esta data (UTC) são descartadas; None = guardar tudo
+    retention = RETENTION_DAYS[timeframe]
+    if not retention:
+        return None
+    return pd.Timestamp.now(tz="UTC").tz_localize(None) - pd.Timedelta(days=retention)
+
+
+def close_labels(symbol, candles, lookback=10):
+    # Convenção da série diária já guardada: "start" (histórico antigo, fecho no início da vela),
+    # "end" (fecho no fim da vela, como a CoinGecko) ou None (sem dados suficientes para decidir).
+    # Compara os últimos preços com as velas diárias fechadas guardadas em OHLCV_DIR.
+    last = last_timestamp(symbol)
+    if last is None or last_timestamp(candles, OHLCV_DIR) is None:
+        return None
+    since = last - pd.Timedelta(days=lookback + 1)
+    stored = read_prices_since(candles, since, OHLCV_DIR)
+    closes = stored.set_index("date")["close"].astype(np.float64).iloc[:-1]  # a última vela pode estar aberta
+    prices = read_prices_since(symbol, since).set_index("date")["price"]
+    votes = {}
+    for label, shift in (("start", pd.Timedelta(0)), ("end", pd.Timedelta(days=1))):
+        common = prices.index.intersection(closes.index + shift)
+        votes[label] = int(np.isclose(prices[common], closes.set_axis(closes.index + shift)[common], rtol=1e-6).sum())
+    if votes["start"] == votes["end"]:
+        return None
+    return max(votes, key=votes.get)
+
+
+def relabel_closes(symbol):
+    # Migração única: fecho diário antigo (início da vela) → fim da vela (+1 dia)
+    df = read_prices(symbol)
+    df["date"] = df["date"] + pd.Timedelta(days=1)
+    write_prices(symbol, df, fmt="parquet" if parquet_parts(symbol) else "csv")
+    reset_index(symbol)
+    return len(df)
+
+
+def update_pool(engine, entry, max_pages=None):
+    symbol, timeframe, aggregate = entry["symbol"], entry["timeframe"], entry["aggregate"]
+    candles = ohlcv_asset(symbol, timeframe, aggregate)
+    keep_after = retention_cutoff(timeframe)
+    since = last_timestamp(candles, OHLCV_DIR)
+    if since is None:
+        since = keep_after
+    else:
+        since -= pd.Timedelta(1, "ns")  # incluir a última vela guardada: pode ter sido gravada ainda aberta
+
+    rows = 0
+    closes = []
+    for page in iter_ohlcv_pages(engine, entry["pool"], entry["network"], timeframe, aggregate,
+                                 since=since, max_pages=max_pages):
+        rows += append_prices(candles, page, OHLCV_DIR, only_newer=False)
+        if timeframe == "day" and aggregate == 1:
+            closes.append(ohlcv_to_prices(page))
+    # Dados intradiários: a retenção corre sempre (os parts de 1 minuto não crescem sem limite)
+    if rows and keep_after is not None:
+        compact(candles, OHLCV_DIR, keep_after)
+
+    # Série diária de fecho em price_data/ (usada pelo compare_returns.py)
+    prices_added = 0
+    if closes and close_labels(symbol, candles) == "start":
+        print(f"🧹 {symbol}: fecho diário reetiquetado para o fim da vela ({relabel_closes(symbol)} linhas)")
+    if closes:
+        df_new = pd.concat(closes, ignore_index=True).sort_values("date")
+        last_price = last_timestamp(symbol)
+        if last_price is None:
+            write_prices(symbol, df_new)
+            prices_added = len(df_new)
+        else:
+            prices_added = append_prices(symbol, df_new[df_new["date"] >= last_price], only_newer=False)
+        if prices_added:
+            update_index(symbol)
+    return {"candles": rows, "prices": prices_added}
+
+
+def run(registry=REGISTRY_FILE, only=None, force=False, max_pages=None, compact_after=False):
+    pools = load_registry(registry)
+    if only:
+        pools = [p for p in pools if p["symbol"] in only]
+
+    pending = []
+    for entry in pools:
+        fresh, last = is_up_to_date(entry)
+        if fresh and not force:
+            print(f"⏭️ {entry['symbol']}: atualizado ({last})")
+        else:
+            pending.append(entry)
+
+    # GeckoTerminal (plano gratuito): ~30 pedidos/min partilhados por todos os pools
+    engine = engine_from_env()
+    by_symbol = {entry["symbol"]: entry for entry in pending}
+    results = engine.map(lambda symbol: update_pool(engine, by_symbol[symbol], max_pages), list(by_symbol))
+
+    for symbol, result in results.items():
+        if result is None:
+            print(f"❌ {symbol}: falhou")
+        elif result["candles"] == 0:
+            print(f"⚠️ {symbol}: nenhuma vela nova")
+        else:
+            print(f"✅ {symbol}: {result['candles']} velas, {result['prices']} preços diários")
+        if compact_after:
+            entry = by_symbol[symbol]
+            compact(ohlcv_asset(symbol, entry["timeframe"], entry["aggregate"]), OHLCV_DIR,
+                    retention_cutoff(entry["timeframe"]))
+
+    print(engine.report())
+    engine.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualizar todos os pools DEX do registo")
+    parser.add_argument("--registry", default=REGISTRY_FILE)
+    parser.add_argument("--only", nargs="*", help="Só estes símbolos")
+    parser.add_argument("--force", action="store_true", help="Consultar mesmo os pools já atualizados")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.registry):
+        print(f"❌ Registo {args.registry} não encontrado.")
+        sys.exit(1)
+    run(args.registry, args.only, args.force, args.max_pages, args.compact)
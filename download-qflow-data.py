@@ -1,57 +1,60 @@
 # download-qflow-data.py
-# Version 1.0.2 - Changed price files location to "price_data" folder
-# 2025-08-24
+# Version 2.2.1 - Span "qflow.history" à volta da atualização real (páginas, append e retenção)
+# 2026-10-18
 
-import requests
-import pandas as pd
-import os
-from datetime import datetime
+import argparse
+
+from dex_tracker import REGISTRY_FILE, load_registry, retention_cutoff, update_pool
+from fetch_engine import engine_from_env
+from geckoterminal import TIMEFRAMES, OHLCV_DIR, ohlcv_asset
+from instrument import span
+from price_store import asset_source, compact
 
-BASE = "https://api.geckoterminal.com/api/v2"
 POOL = "2utzyuC6hzPXyzMAW9dNhr3oB11H2GLkrfCsdMfKMp6r"
-CSV_FILE = os.path.join("price_data", "qflow_price_history.csv")
-
-def get_qflow_history(pool_address, network="solana", timeframe="day"):
-    url = f"{BASE}/networks/{network}/pools/{pool_address}/ohlcv/{timeframe}"
-    print("A consultar:", url)
-    r = requests.get(url)
-    if r.status_code != 200:
-        print("Erro HTTP", r.status_code, r.text)
-        return None
-    
-    resp = r.json().get("data", {})
-    ohlcv = resp.get("attributes", {}).get("ohlcv_list", [])
-    if not ohlcv:
-        print("Sem dados OHLCV.")
-        return None
-    
-    df = pd.DataFrame(ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
-    # Correção: Manter como datetime completo, não converter para date
-    df["date"] = pd.to_datetime(df["timestamp"], unit="s")
-    df = df[["date", "close"]].rename(columns={"close": "price"})
-    return df
-
-# Obter novos dados
-df_new = get_qflow_history(POOL)
-if df_new is None:
-    print("❌ Falhou ao obter novos dados.")
-    exit()
-
-# Verificar se ficheiro já existe
-if os.path.exists(CSV_FILE):
-    df_old = pd.read_csv(CSV_FILE, parse_dates=["date"])
-    last_date = df_old["date"].max()
-    
-    # Correção: Comparar datetime com datetime
-    df_new = df_new[df_new["date"] > last_date]
-    
-    if df_new.empty:
-        print("⚠️ Nenhum dado novo a adicionar.")
-    else:
-        df_updated = pd.concat([df_old, df_new], ignore_index=True)
-        df_updated = df_updated.drop_duplicates(subset="date").sort_values("date")
-        df_updated.to_csv(CSV_FILE, index=False)
-        print(f"✅ Adicionados {len(df_new)} novos registos. Atualizado {CSV_FILE}.")
+ASSET = "qflow"
+
+
+def qflow_entry(timeframe="day", aggregate=1, registry=REGISTRY_FILE):
+    # Entrada do registo de pools (dex_pools.json) ou, sem registo, o pool por omissão
+    try:
+        entry = next((e for e in load_registry(registry) if e["symbol"] == ASSET), None)
+    except FileNotFoundError:
+        entry = None
+    entry = dict(entry or {"symbol": ASSET, "network": "solana", "pool": POOL})
+    entry.update(timeframe=timeframe, aggregate=aggregate)
+    return entry
+
+
+parser = argparse.ArgumentParser(description="Atualizar histórico QFLOW (GeckoTerminal)")
+parser.add_argument("--timeframe", choices=list(TIMEFRAMES), default="day", help="Granularidade das velas")
+parser.add_argument("--aggregate", type=int, default=1, help="Agregação (ex.: 5 = velas de 5 minutos)")
+parser.add_argument("--max-pages", type=int, default=None, help="Limite de páginas (1000 velas cada) por execução")
+parser.add_argument("--compact", action="store_true", help="Ordenar/deduplicar os ficheiros no fim")
+args = parser.parse_args()
+
+engine = engine_from_env()
+entry = qflow_entry(args.timeframe, args.aggregate)
+candles = ohlcv_asset(ASSET, args.timeframe, args.aggregate)
+print(f"A consultar: {ASSET} {args.timeframe} (aggregate={args.aggregate})")
+
+# A última vela guardada é pedida de novo (pode ter sido gravada ainda aberta) e, no intradiário,
+# a retenção é aplicada em cada execução
+with span("qflow.history", timeframe=args.timeframe, aggregate=args.aggregate) as s:
+    result = update_pool(engine, entry, args.max_pages)
+    s.set(**result)
+
+if result["candles"] == 0:
+    print("⚠️ Nenhuma vela nova.")
 else:
-    df_new.to_csv(CSV_FILE, index=False)
-    print("✅ Ficheiro criado com dados iniciais:", CSV_FILE)
\ No newline at end of file
+    print(f"✅ {result['candles']} velas OHLCV guardadas em {asset_source(candles, OHLCV_DIR)}")
+if result["prices"]:
+    print(f"✅ {result['prices']} registos diários. Atualizado {asset_source(ASSET)}.")
+
+if args.compact:
+    before, after = compact(candles, OHLCV_DIR, retention_cutoff(args.timeframe))
+    print(f"🧹 Compactado {candles}: {before} → {after} ficheiro(s)")
+    before, after = compact(ASSET)
+    print(f"🧹 Compactado {ASSET}: {before} → {after} ficheiro(s)")
+
+print(engine.report())
+engine.close()
@@ -0,0 +1,160 @@
+# drawdown_stream.py
+# Version 1.0.0 - Análise de drawdown/ATH em streaming (estado O(1), leitura por blocos) e modo batch
+# 2026-10-18
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from price_store import DATA_DIR, list_assets, iter_price_chunks
+
+
+class DrawdownState:
+    # Estado acumulado: não guarda a série, só os extremos e as datas relevantes
+    def __init__(self):
+        self.rows = 0
+        self.first_date = None
+        self.first_price = None
+        self.last_date = None
+        self.last_price = None
+        self.peak = -np.inf          # ATH até ao momento
+        self.peak_date = None
+        self.max_drawdown = 0.0      # fração negativa (ex.: -0.25)
+        self.max_dd_date = None
+        self.max_dd_peak_date = None
+        self.longest_underwater = pd.Timedelta(0)
+
+    def update(self, dates, prices):
+        # dates/prices de um bloco por ordem cronológica (sem NaN)
+        if len(prices) == 0:
+            return
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.first_date is None:
+            self.first_date, self.first_price = pd.Timestamp(dates[0]), prices[0]
+
+        # Pico acumulado continuando o do bloco anterior
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], prices]))[1:]
+        drawdown = prices / peaks - 1
+        i = int(np.argmin(drawdown))
+        if drawdown[i] < self.max_drawdown:
+            self.max_drawdown = float(drawdown[i])
+            self.max_dd_date = pd.Timestamp(dates[i])
+            # Data do pico que originou este drawdown: último dia em que o preço esteve no pico
+            at_peak = np.flatnonzero(prices[:i + 1] >= peaks[:i + 1])
+            self.max_dd_peak_date = pd.Timestamp(dates[at_peak[-1]]) if len(at_peak) else self.peak_date
+
+        # Duração debaixo de água: maior intervalo entre dois momentos no pico
+        at_peak = prices >= peaks
+        peak_dates = dates[at_peak]
+        if self.peak_date is not None:
+            peak_dates = np.concatenate([[self.peak_date.to_datetime64()], peak_dates])
+        if len(peak_dates) > 1:
+            gap = pd.Timedelta(np.diff(peak_dates).max())
+            self.longest_underwater = max(self.longest_underwater, gap)
+        if len(peak_dates):
+            self.peak_date = pd.Timestamp(peak_dates[-1])
+        self.peak = float(peaks[-1])
+
+        self.last_date, self.last_price = pd.Timestamp(dates[-1]), prices[-1]
+        self.rows += len(prices)
+
+    def report(self):
+        if self.rows == 0:
+            return None
+        current_underwater = self.last_date - self.peak_date
+        trend_days = (self.peak_date - self.first_date).days
+        return {
+            "rows": self.rows,
+            "start": self.first_date,
+            "end": self.last_date,
+            "start_price": self.first_price,
+            "end_price": self.last_price,
+            "ath": self.peak,
+            "ath_date": self.peak_date,
+            "current_drawdown_pct": (self.last_price / self.peak - 1) * 100,
+            "max_drawdown_pct": self.max_drawdown * 100,
+            "max_drawdown_date": self.max_dd_date,
+            "max_drawdown_peak_date": self.max_dd_peak_date,
+            "longest_underwater_days": max(self.longest_underwater, current_underwater).total_seconds() / 86400,
+            "current_underwater_days": current_underwater.total_seconds() / 86400,
+            # Linha de tendência até ao ATH (a mesma do gráfico): retorno total e declive diário
+            "trend_return_pct": (self.peak / self.first_price - 1) * 100,
+            "trend_slope_per_day": (self.peak - self.first_price) / trend_days if trend_days > 0 else np.nan,
+        }
+
+
+def analyze_asset(asset, data_dir=DATA_DIR, start=None, end=None, chunksize=100_000):
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) + pd.Timedelta(days=1) if end is not None else None
+    state = DrawdownState()
+    for chunk in iter_price_chunks(asset, data_dir, chunksize):
+        chunk = chunk.dropna(subset=["price"])
+        if start is not None:
+            chunk = chunk[chunk["date"] >= start]
+        if end is not None:
+            chunk = chunk[chunk["date"] < end]
+        state.update(chunk["date"].to_numpy(), chunk["price"].to_numpy())
+    return state.report()
+
+
+def analyze_all(data_dir=DATA_DIR, start=None, end=None, chunksize=100_000):
+    results = {}
+    for asset in list_assets(data_dir):
+        try:
+            results[asset] = analyze_asset(asset, data_dir, start, end, chunksize)
+        except Exception as e:
+            print(f"Erro ao processar {asset}: {e}")
+    return results
+
+
+def print_batch(results):
+    print(f"\n{'Asset':<10} | {'ATH':>12} | {'ATH Date':>10} | {'Current DD':>10} | {'Max DD':>8} | {'Longest UW':>10} | {'To ATH':>9}")
+    print("-" * 90)
+    for asset, r in results.items():
+        if r is None:
+            print(f"{asset:<10} | sem dados")
+            continue
+        print(
+            f"{asset:<10} | "
+            f"${r['ath']:>11.4f} | "
+            f"{r['ath_date'].date()!s:>10} | "
+            f"{r['current_drawdown_pct']:>9.2f}% | "
+            f"{r['max_drawdown_pct']:>7.2f}% | "
+            f"{r['longest_underwater_days']:>8.1f} d | "
+            f"{r['trend_return_pct']:>8.2f}%"
+        )
+
+
+def _json_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drawdown/ATH em streaming para todos os ficheiros de price_data")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD)")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--json", help="Guardar o relatório em JSON")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_dir):
+        print(f"❌ Pasta {args.data_dir} não encontrada.")
+        sys.exit(1)
+    results = analyze_all(args.data_dir, args.start, args.end, args.chunksize)
+    print_batch(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({a: r and {k: _json_value(v) for k, v in r.items()} for a, r in results.items()}, f, indent=2)
+        print(f"\n✅ Relatório guardado em: {args.json}")
@@ -0,0 +1,269 @@
+# fetch_engine.py
+# Version 1.3.3 - get(freshness=...): a cache calcula o TTL na leitura em vez de o gravar
+# 2026-10-18
+
+import os
+import re
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrument import span
+
+# Códigos que justificam nova tentativa (rate limit e erros temporários do servidor)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def fixture_name(url, params=None):
+    # Nome de ficheiro estável para um pedido (caminho + parâmetros ordenados)
+    parts = urlsplit(url)
+    query = urlencode(sorted((params or {}).items())) if params else parts.query
+    key = parts.path.strip("/") + ("?" + query if query else "")
+    return re.sub(r"[^A-Za-z0-9._=-]+", "_", key) + ".json"
+
+
+# ──────────── RATE LIMIT (TOKEN BUCKET) ────────────
+class TokenBucket:
+    # rate = tokens por segundo, capacity = rajada máxima permitida
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0   # fim da pausa pedida por um 429 (monotonic); até lá nada é libertado
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        # Durante a pausa o balde não enche: recomeça a contar a partir do fim da pausa
+        now = time.monotonic()
+        start = max(self.updated, self.resume_at)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = now
+        return now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self._refill()
+                if now < self.resume_at:
+                    wait = self.resume_at - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # Após um 429 todos os workers param até ao mesmo prazo; pausas sobrepostas não se somam
+        with self.lock:
+            now = self._refill()
+            self.tokens = min(self.tokens, 0)
+            self.resume_at = max(self.resume_at, now + seconds)
+
+
+# ──────────── ESTATÍSTICAS ────────────
+class FetchStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes = 0
+        self.items = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def as_dict(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            "items": self.items,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "cache_hits": self.cache_hits,
+            "not_modified": self.not_modified,
+            "elapsed_s": round(elapsed, 3),
+            "items_per_s": round(self.items / elapsed, 3) if elapsed > 0 else 0.0,
+            "kb_per_s": round(self.bytes / 1024 / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        s = self.as_dict()
+        items = f"{s['items']} ativos | " if s['items'] else ""
+        rate = f"{s['items_per_s']:.2f} ativos/s" if s['items'] else f"{s['kb_per_s']:.1f} KB/s"
+        cache = f"{s['cache_hits']} da cache | {s['not_modified']} não modificados (304) | " \
+            if s['cache_hits'] or s['not_modified'] else ""
+        return (f"📊 {items}{s['requests']} pedidos | {cache}{s['retries']} retries | "
+                f"{s['errors']} erros | {s['bytes'] / 1024:.1f} KB em {s['elapsed_s']:.2f}s ({rate})")
+
+
+# ──────────── MOTOR DE PEDIDOS ────────────
+class FetchEngine:
+    def __init__(self, max_workers=8, rate=0.5, burst=3, max_retries=5,
+                 backoff=1.0, max_backoff=60.0, timeout=30, session=None, record_dir=None, cache=None):
+        self.max_workers = max_workers
+        self.record_dir = record_dir
+        self.cache = cache            # http_cache.ResponseCache (None = sem cache)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.stats = FetchStats()
+        self.session = session or self._make_session(max_workers)
+
+    @staticmethod
+    def _make_session(pool_size):
+        # Uma só sessão partilhada: ligações keep-alive reutilizadas por todos os workers
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept": "application/json"})
+        return session
+
+    def _retry_delay(self, attempt, response=None):
+        # Respeitar Retry-After quando o servidor o indica (segundos ou data HTTP)
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(self.max_backoff, float(retry_after))
+                except ValueError:
+                    try:
+                        when = parsedate_to_datetime(retry_after).timestamp()
+                        return min(self.max_backoff, max(0.0, when - time.time()))
+                    except (TypeError, ValueError):
+                        pass
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)  # jitter
+
+    def get(self, url, params=None, freshness=None):
+        # freshness: http_cache.candle_freshness(...) do pedido; o TTL é calculado pela cache na leitura
+        with span("http.get", path=urlsplit(url).path) as s:
+            if self.cache is None:
+                r = self._get(url, params)
+            else:
+                r = self._cached_get(url, params, freshness, s)
+            s.set(status=r.status_code if r is not None else None,
+                  bytes=len(r.content) if r is not None else 0)
+            return r
+
+    def _cached_get(self, url, params, freshness, s):
+        cached, conditional = self.cache.lookup(url, params)
+        if cached is not None:
+            self.stats.add(cache_hits=1)
+            s.set(cache="hit")
+            return cached
+        if self.cache.offline:
+            print(f"📴 Offline: sem resposta guardada para {url}")
+            s.set(cache="offline-miss")
+            return None
+        r = self._get(url, params, conditional)
+        if r is not None and r.status_code == 304:
+            self.stats.add(not_modified=1)
+            cached = self.cache.refresh(url, params, r, freshness)
+            if cached is not None:
+                s.set(cache="revalidated")
+                return cached
+            r = self._get(url, params)   # entrada removida (LRU) entretanto: pedido normal
+        if r is not None and r.status_code == 200:
+            self.cache.store(url, params, r, freshness)
+        s.set(cache="miss")
+        return r
+
+    def _get(self, url, params=None, headers=None):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                r = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.stats.add(requests=1)
+                if attempt == self.max_retries:
+                    print(f"Erro de ligação em {url}: {e}")
+                    self.stats.add(errors=1)
+                    return None
+                self.stats.add(retries=1)
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            self.stats.add(requests=1, bytes=len(r.content))
+            if r.status_code in RETRY_STATUS and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, r)
+                self.stats.add(retries=1)
+                if r.status_code == 429:
+                    # O balde fica em pausa e o acquire() seguinte faz a espera (uma só vez, para todos os workers)
+                    self.bucket.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+            if r.status_code not in (200, 304):
+                self.stats.add(errors=1)
+            elif self.record_dir:
+                self._record(url, params, r)
+            return r
+        return None
+
+    def _record(self, url, params, response):
+        os.makedirs(self.record_dir, exist_ok=True)
+        path = os.path.join(self.record_dir, fixture_name(url, params))
+        with open(path, "wb") as f:
+            f.write(response.content)
+
+    def get_json(self, url, params=None):
+        r = self.get(url, params=params)
+        if r is None or r.status_code != 200:
+            return None
+        return r.json()
+
+    def map(self, fn, items):
+        # Executa fn(item) em paralelo; devolve {item: resultado} (None em caso de exceção)
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(fn, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                except Exception as e:
+                    print(f"Erro ao processar {item}: {e}")
+                    self.stats.add(errors=1)
+                    results[item] = None
+                self.stats.add(items=1)
+        return results
+
+    def report(self):
+        return self.stats.report()
+
+    def close(self):
+        self.session.close()
+
+
+def engine_from_env(**overrides):
+    # Permite ajustar o motor sem editar os scripts (ex.: plano pago da API)
+    from http_cache import cache_from_env
+    settings = {
+        "max_workers": int(os.environ.get("FETCH_WORKERS", 8)),
+        "rate": float(os.environ.get("FETCH_RATE", 0.5)),
+        "burst": float(os.environ.get("FETCH_BURST", 3)),
+        "max_retries": int(os.environ.get("FETCH_RETRIES", 5)),
+        "record_dir": os.environ.get("FETCH_RECORD_DIR") or None,
+        "cache": cache_from_env(),
+    }
+    settings.update(overrides)
+    return FetchEngine(**settings)
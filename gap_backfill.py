@@ -0,0 +1,207 @@
+# gap_backfill.py
+# Version 1.0.1 - compact/reset do índice por pedido, antes do checkpoint (um --resume nunca deixa ativos por compactar)
+# 2026-10-18
+#
+# 1. scan:  encontra os buckets (dias ou intervalos intradiários) em falta em todos os ficheiros
+# 2. plan:  junta falhas próximas em intervalos → um pedido por intervalo
+# 3. run:   executa os pedidos, grava cada um com checkpoint; --resume continua de onde parou
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from coingecko import COINS, get_range_coingecko
+from dex_tracker import REGISTRY_FILE, load_registry
+from fetch_engine import engine_from_env
+from geckoterminal import PAGE_LIMIT, get_ohlcv_page, ohlcv_to_prices
+from price_store import DATA_DIR, list_assets, read_prices, append_prices, compact
+from resample import resample_close
+from rolling_index import reset_index
+
+CHECKPOINT_FILE = os.path.join(DATA_DIR, "backfill_checkpoint.json")
+
+MERGE_WITHIN_DAYS = 30     # falhas a menos de N dias entre si vão no mesmo pedido
+MAX_SPAN_DAYS = 365        # tamanho máximo de um pedido (limite do histórico do plano gratuito)
+
+
+# ──────────── 1. DETEÇÃO ────────────
+def scan_gaps(dates, bucket_seconds=86400):
+    # dates: datetime64 de um ativo. Devolve [(início, fim)] dos buckets em falta (intervalos fechados)
+    step = np.int64(bucket_seconds) * 10**9
+    buckets = np.unique(np.asarray(dates, dtype="datetime64[ns]").astype(np.int64) // step)
+    if len(buckets) < 2:
+        return []
+    diffs = np.diff(buckets)
+    holes = np.flatnonzero(diffs > 1)
+    starts = (buckets[holes] + 1) * step
+    ends = (buckets[holes + 1] - 1) * step
+    return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in zip(starts, ends)]
+
+
+def scan_all(data_dir=DATA_DIR, bucket_seconds=86400, assets=None):
+    gaps = {}
+    for asset in assets or list_assets(data_dir):
+        try:
+            dates = read_prices(asset, data_dir, columns=["date"])["date"].to_numpy()
+        except Exception as e:
+            print(f"Erro ao processar {asset}: {e}")
+            continue
+        found = scan_gaps(dates, bucket_seconds)
+        if found:
+            gaps[asset] = found
+    return gaps
+
+
+def missing_buckets(ranges, bucket_seconds=86400):
+    return sum(int((end - start).total_seconds() // bucket_seconds) + 1 for start, end in ranges)
+
+
+# ──────────── 2. PLANEAMENTO ────────────
+def source_for(asset, registry=REGISTRY_FILE):
+    if asset in COINS:
+        return {"source": "coingecko", "coin_id": COINS[asset]}
+    if os.path.exists(registry):
+        for entry in load_registry(registry):
+            if entry["symbol"] == asset:
+                return {"source": "geckoterminal", "pool": entry["pool"], "network": entry["network"]}
+    return None
+
+
+def merge_ranges(ranges, merge_within_days=MERGE_WITHIN_DAYS, max_span_days=MAX_SPAN_DAYS):
+    # Junta falhas adjacentes/próximas enquanto o intervalo total couber num pedido
+    merged = []
+    for start, end in sorted(ranges):
+        if merged:
+            cur_start, cur_end = merged[-1]
+            close_enough = (start - cur_end).days <= merge_within_days
+            fits = (end - cur_start).days + 1 <= max_span_days
+            if close_enough and fits:
+                merged[-1] = (cur_start, max(cur_end, end))
+                continue
+        # Falhas maiores que um pedido são partidas em blocos
+        while (end - start).days + 1 > max_span_days:
+            chunk_end = start + pd.Timedelta(days=max_span_days - 1)
+            merged.append((start, chunk_end))
+            start = chunk_end + pd.Timedelta(days=1)
+        merged.append((start, end))
+    return merged
+
+
+def plan_calls(gaps, merge_within_days=MERGE_WITHIN_DAYS, max_span_days=MAX_SPAN_DAYS, registry=REGISTRY_FILE):
+    calls = []
+    for asset, ranges in gaps.items():
+        source = source_for(asset, registry)
+        if source is None:
+            print(f"⚠️ {asset}: sem fonte conhecida para backfill")
+            continue
+        span_limit = max_span_days if source["source"] == "coingecko" else min(max_span_days, PAGE_LIMIT)
+        for start, end in merge_ranges(ranges, merge_within_days, span_limit):
+            calls.append({
+                "id": f"{asset}:{start.date()}:{end.date()}",
+                "asset": asset,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "missing": [[s.isoformat(), e.isoformat()] for s, e in ranges if s <= end and e >= start],
+                "done": False,
+                **source,
+            })
+    return calls
+
+
+# ──────────── 3. EXECUÇÃO COM CHECKPOINT ────────────
+def save_checkpoint(calls, path=CHECKPOINT_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"calls": calls}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    with open(path) as f:
+        return json.load(f)["calls"]
+
+
+def fetch_call(engine, call):
+    start, end = pd.Timestamp(call["start"]), pd.Timestamp(call["end"])
+    # Margem de um dia de cada lado para apanhar o ponto diário que cai perto da meia-noite
+    if call["source"] == "coingecko":
+        df = get_range_coingecko(call["coin_id"], start - pd.Timedelta(days=1), end + pd.Timedelta(days=2), engine)
+        return resample_close(df, "day") if df is not None else None
+    days = (end - start).days + 3
+    before = int((end + pd.Timedelta(days=2)).timestamp())
+    df = get_ohlcv_page(engine, call["pool"], call["network"], "day", 1, before, min(days, PAGE_LIMIT))
+    return ohlcv_to_prices(df) if df is not None else None
+
+
+def only_missing(df, missing):
+    # Guardar apenas linhas que caem nos buckets em falta (o resto já existe)
+    keep = np.zeros(len(df), dtype=bool)
+    for start, end in missing:
+        keep |= (df["date"] >= pd.Timestamp(start)) & (df["date"] < pd.Timestamp(end) + pd.Timedelta(days=1))
+    return df[keep]
+
+
+def run_backfill(calls, data_dir=DATA_DIR, checkpoint=CHECKPOINT_FILE):
+    pending = [c for c in calls if not c["done"]]
+    print(f"🧩 {len(pending)} pedido(s) pendente(s) de {len(calls)}")
+    engine = engine_from_env()
+    for call in pending:
+        df = fetch_call(engine, call)
+        if df is None:
+            print(f"❌ {call['id']}: falhou (fica pendente para --resume)")
+            continue
+        rows = append_prices(call["asset"], only_missing(df, call["missing"]), data_dir, only_newer=False)
+        # Linhas no meio do histórico: ordenar/deduplicar e reconstruir o índice de janelas antes de
+        # marcar o pedido como feito (interrompido aqui, o --resume repete o pedido e o compact)
+        compact(call["asset"], data_dir)
+        reset_index(call["asset"], data_dir)
+        call["done"] = True
+        call["rows"] = rows
+        save_checkpoint(calls, checkpoint)
+        print(f"✅ {call['id']}: {rows} linha(s)")
+
+    print(engine.report())
+    engine.close()
+    if all(c["done"] for c in calls) and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detetar e preencher falhas nos históricos de preços")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--bucket", type=int, default=86400, help="Tamanho do bucket em segundos (86400 = diário)")
+    parser.add_argument("--assets", nargs="*")
+    parser.add_argument("--merge-within", type=int, default=MERGE_WITHIN_DAYS)
+    parser.add_argument("--scan-only", action="store_true", help="Só mostrar as falhas e o plano")
+    parser.add_argument("--resume", action="store_true", help="Continuar o backfill interrompido")
+    args = parser.parse_args()
+    checkpoint = os.path.join(args.data_dir, os.path.basename(CHECKPOINT_FILE))
+
+    if args.resume:
+        if not os.path.exists(checkpoint):
+            print("⚠️ Nenhum backfill interrompido.")
+            sys.exit(0)
+        run_backfill(load_checkpoint(checkpoint), args.data_dir, checkpoint)
+        sys.exit(0)
+
+    gaps = scan_all(args.data_dir, args.bucket, args.assets)
+    if not gaps:
+        print("✅ Sem falhas.")
+        sys.exit(0)
+    for asset, ranges in gaps.items():
+        print(f"🕳️ {asset}: {missing_buckets(ranges, args.bucket)} bucket(s) em falta em {len(ranges)} falha(s)")
+    if args.bucket != 86400:
+        sys.exit(0)  # backfill automático só para séries diárias
+
+    calls = plan_calls(gaps, args.merge_within)
+    for call in calls:
+        print(f"   → {call['id']} ({call['source']})")
+    if args.scan_only or not calls:
+        sys.exit(0)
+    save_checkpoint(calls, checkpoint)
+    run_backfill(calls, args.data_dir, checkpoint)
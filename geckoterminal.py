@@ -0,0 +1,104 @@
+# geckoterminal.py
+# Version 1.2.2 - Páginas levam a vela e o fim da última vela (a cache calcula o TTL na leitura)
+# 2026-10-18
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from http_cache import candle_freshness
+from instrument import span
+from price_store import DATA_DIR
+
+# Permite apontar para um servidor local (testes / mirror)
+BASE = os.environ.get("GECKOTERMINAL_BASE", "https://api.geckoterminal.com/api/v2")
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+TIMEFRAMES = {"day": 86400, "hour": 3600, "minute": 60}
+PAGE_LIMIT = 1000  # máximo de velas por pedido na API
+
+# OHLCV intradiário guarda-se à parte de price_data/ (que só tem séries de preço diárias)
+OHLCV_DIR = os.path.join(DATA_DIR, "ohlcv")
+
+# Retenção por granularidade (dias); None = guardar tudo
+RETENTION_DAYS = {"day": None, "hour": 365, "minute": 30}
+
+
+def ohlcv_asset(symbol, timeframe, aggregate=1):
+    suffix = timeframe if aggregate == 1 else f"{timeframe}{aggregate}"
+    return f"{symbol}_{suffix}"
+
+
+def parse_ohlcv(payload):
+    # Resposta da API → DataFrame tipado: date + OHLC em float32 + volume em float64.
+    # float32 chega para preços (7 dígitos significativos, a escala é relativa) e reduz para metade o espaço.
+    data = (payload or {}).get("data") or {}
+    ohlcv = data.get("attributes", {}).get("ohlcv_list", [])
+    if not ohlcv:
+        return None
+    raw = np.asarray(ohlcv, dtype=np.float64)
+    df = pd.DataFrame({
+        # Correção: Manter como datetime completo, não converter para date
+        "date": pd.to_datetime(raw[:, 0].astype(np.int64), unit="s"),
+        "open": raw[:, 1].astype(np.float32),
+        "high": raw[:, 2].astype(np.float32),
+        "low": raw[:, 3].astype(np.float32),
+        "close": raw[:, 4].astype(np.float32),
+        "volume": raw[:, 5],
+    })
+    return df.sort_values("date").reset_index(drop=True)
+
+
+def ohlcv_to_prices(df, candle_seconds=TIMEFRAMES["day"]):
+    # Série de preço (fecho) no formato dos restantes ficheiros de price_data. As velas vêm etiquetadas
+    # pelo início; o fecho fica etiquetado no fim da vela (00:00 seguinte no diário), como resample_close
+    # faz com a CoinGecko, para que "último preço até à meia-noite" leia o mesmo dia em todas as fontes
+    return pd.DataFrame({"date": df["date"] + pd.Timedelta(seconds=candle_seconds),
+                         "price": df["close"].astype(np.float64)})
+
+
+def ohlcv_url(pool_address, network="solana", timeframe="day"):
+    return f"{BASE}/networks/{network}/pools/{pool_address}/ohlcv/{timeframe}"
+
+
+def get_ohlcv_page(engine, pool_address, network="solana", timeframe="day", aggregate=1,
+                   before_timestamp=None, limit=PAGE_LIMIT):
+    params = {"aggregate": aggregate, "limit": limit, "currency": "usd"}
+    if before_timestamp is not None:
+        params["before_timestamp"] = int(before_timestamp)
+    candle = TIMEFRAMES[timeframe] * aggregate
+    # Páginas antigas acabam na vela de before_timestamp; sem before_timestamp a página tem a vela atual
+    candle_end = int(before_timestamp) + candle if before_timestamp is not None else None
+    with span("geckoterminal.ohlcv_page", pool=pool_address, timeframe=timeframe):
+        r = engine.get(ohlcv_url(pool_address, network, timeframe), params=params,
+                       freshness=candle_freshness(candle, candle_end))
+    if r is None or r.status_code != 200:
+        print("Erro HTTP", r.status_code if r is not None else "sem resposta", ohlcv_url(pool_address, network, timeframe))
+        return None
+    with span("geckoterminal.parse") as s:
+        df = parse_ohlcv(r.json())
+        s.set(rows=len(df) if df is not None else 0)
+    return df
+
+
+def iter_ohlcv_pages(engine, pool_address, network="solana", timeframe="day", aggregate=1,
+                     since=None, max_pages=None, limit=PAGE_LIMIT):
+    # Percorre o histórico do mais recente para o mais antigo, uma página de cada vez,
+    # até chegar a "since" (exclusive), ao fim dos dados ou a max_pages.
+    since = pd.Timestamp(since) if since is not None else None
+    before = None
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        df = get_ohlcv_page(engine, pool_address, network, timeframe, aggregate, before, limit)
+        pages += 1
+        if df is None or df.empty:
+            return
+        if since is not None:
+            df = df[df["date"] > since]
+        if not df.empty:
+            yield df
+        oldest = df["date"].iloc[0] if not df.empty else None
+        if oldest is None or len(df) < limit:
+            return
+        before = oldest.value // 10**9
@@ -0,0 +1,227 @@
+# http_cache.py
+# Version 1.1.0 - TTL calculado na leitura (vela + fim da última vela gravados, não o TTL)
+# 2026-10-18
+#
+# Cada resposta 200 fica em dois ficheiros na pasta da cache: <chave>.body (bytes tal como vieram)
+# e <chave>.json (URL, cabeçalhos de validação, hora de gravação, duração da vela e fim da última
+# vela pedida). A chave é o SHA-1 do URL com os parâmetros ordenados.
+#   - o TTL é calculado em cada leitura a partir desses tempos e das constantes atuais
+#     (FETCH_CACHE_LIVE_TTL, HISTORICAL_TTL), por isso mudá-las aplica-se também às entradas já gravadas
+#   - dentro do TTL a resposta sai do disco sem pedido à API
+#   - depois do TTL o pedido leva If-None-Match/If-Modified-Since; um 304 renova a entrada
+#   - acima de FETCH_CACHE_MB apagam-se as entradas usadas há mais tempo (LRU pelo mtime do .json)
+#   - FETCH_OFFLINE=1 nunca vai à rede: cache (mesmo expirada) ou fixtures gravadas (FETCH_RECORD_DIR)
+# Ligada por omissão em price_data/http_cache; FETCH_CACHE=0 desliga.
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from fetch_engine import fixture_name
+from price_store import DATA_DIR
+
+CACHE_DIR = os.environ.get("FETCH_CACHE_DIR") or os.path.join(DATA_DIR, "http_cache")
+DEFAULT_BUDGET_MB = float(os.environ.get("FETCH_CACHE_MB", 64))
+DEFAULT_TTL = 60             # pedidos sem granularidade conhecida
+LIVE_TTL_CAP = int(os.environ.get("FETCH_CACHE_LIVE_TTL", 600))  # vela ainda aberta: no máximo 10 min
+HISTORICAL_TTL = 30 * 86400  # intervalo já fechado: os dados não voltam a mudar
+VALIDATORS = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+def candle_freshness(candle_seconds, candle_end=None):
+    # O que se grava com a resposta: duração da vela e fim (epoch, s) da última vela pedida
+    # (None = a última vela é a atual, ainda aberta)
+    return {"candle": int(candle_seconds), "candle_end": candle_end}
+
+
+def entry_ttl(meta):
+    # TTL de uma entrada com as constantes atuais. Velas já fechadas quando a resposta foi gravada não
+    # mudam; a vela aberta muda até fechar, por isso o TTL é uma vela (com teto). Sem vela: DEFAULT_TTL.
+    candle = meta.get("candle")
+    if candle is None:
+        return DEFAULT_TTL
+    end = meta.get("candle_end")
+    if end is not None and end <= meta["stored_at"]:
+        return HISTORICAL_TTL
+    return max(1, min(int(candle), LIVE_TTL_CAP))
+
+
+def cache_key(url, params=None):
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha1(f"{url}?{query}".encode()).hexdigest()
+
+
+def _response(url, status, headers, content):
+    # requests.Response montada a partir do disco (os chamadores só usam status_code/json/content)
+    r = requests.Response()
+    r.url = url
+    r.status_code = status
+    r.headers = CaseInsensitiveDict(headers)
+    r._content = content
+    r.encoding = "utf-8"
+    return r
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=None, offline=False, fixtures_dir=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else int(DEFAULT_BUDGET_MB * 1024 * 1024)
+        self.offline = offline
+        self.fixtures_dir = fixtures_dir   # respostas gravadas (FETCH_RECORD_DIR) para o modo offline
+        self.entries = OrderedDict()       # chave → bytes em disco, do menos para o mais recente
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _scan(self):
+        # Reconstruir a ordem LRU a partir do mtime dos metadados (tocados em cada hit)
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            meta_path, body_path = self._paths(key)
+            try:
+                size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                found.append((os.path.getmtime(meta_path), key, size))
+            except OSError:
+                continue
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.used_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self.used_bytes > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.used_bytes -= size
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _read(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def _touch(self, key):
+        meta_path, _ = self._paths(key)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+    def lookup(self, url, params=None):
+        # Devolve (resposta ou None, cabeçalhos condicionais para revalidar)
+        key = cache_key(url, params)
+        meta, body = self._read(key)
+        if meta is None:
+            with self.lock:
+                self.misses += 1
+            return self._fixture(url, params) if self.offline else None, {}
+        if self.offline or time.time() < meta["stored_at"] + entry_ttl(meta):
+            with self.lock:
+                self.hits += 1
+            self._touch(key)
+            return _response(url, 200, meta["headers"], body), {}
+        with self.lock:
+            self.misses += 1
+        conditional = {request: meta["headers"][header]
+                       for header, request in VALIDATORS.items() if header in meta["headers"]}
+        return None, conditional
+
+    def _fixture(self, url, params):
+        # Offline sem entrada na cache: a fixture gravada pelo FetchEngine (mesmo nome do stub_server)
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, fixture_name(url, params))
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return _response(url, 200, {"Content-Type": "application/json"}, f.read())
+
+    def store(self, url, params, response, freshness=None):
+        # freshness: candle_freshness(...) do pedido (None = sem vela conhecida, DEFAULT_TTL)
+        key = cache_key(url, params)
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "params": {k: str(v) for k, v in (params or {}).items()},
+            "headers": {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers},
+            "stored_at": time.time(),
+            **(freshness or {}),
+        }
+        # Corpo primeiro e metadados no fim (os.replace atómico): um .json válido tem sempre o seu .body
+        for path, data, mode in ((body_path, response.content, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+        size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+        with self.lock:
+            self.used_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self._evict()
+
+    def refresh(self, url, params, response, freshness=None):
+        # 304: o corpo guardado continua válido; renova a hora de gravação (e os validadores, se vieram)
+        key = cache_key(url, params)
+        meta, body = self._read(key)
+        if meta is None:
+            return None
+        headers = {**meta["headers"],
+                   **{h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}}
+        cached = _response(url, 200, headers, body)
+        self.store(url, params, cached, freshness)
+        with self.lock:
+            self.revalidated += 1
+        return cached
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            self.entries.clear()
+            self.used_bytes = 0
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.used_bytes, "hits": self.hits,
+                "misses": self.misses, "revalidated": self.revalidated}
+
+
+def cache_from_env():
+    # FETCH_CACHE=0 desliga a cache; FETCH_OFFLINE=1 serve só do disco (cache ou FETCH_RECORD_DIR)
+    offline = os.environ.get("FETCH_OFFLINE", "") not in ("", "0")
+    if os.environ.get("FETCH_CACHE", "1") == "0" and not offline:
+        return None
+    return ResponseCache(CACHE_DIR, offline=offline, fixtures_dir=os.environ.get("FETCH_RECORD_DIR") or None)
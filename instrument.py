@@ -0,0 +1,187 @@
+# instrument.py
+# Version 1.0.0 - Instrumentação opcional: spans de tempo (Chrome trace / JSON lines) e captura cProfile/tracemalloc
+# 2026-10-18
+#
+# Desligada por omissão (cada span custa uma verificação de uma variável global). Liga-se por env:
+#   PRICE_TRACE=trace.json     formato Chrome trace (abrir em chrome://tracing ou ui.perfetto.dev)
+#   PRICE_TRACE=trace.jsonl    uma linha JSON por span
+#   PRICE_PROFILE=cprofile     grava também <trace>.prof (pstats / snakeviz)
+#   PRICE_PROFILE=tracemalloc  grava também <trace>.tracemalloc.txt (maiores alocações)
+
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+
+_STATE = {"enabled": False}
+_LOCK = threading.Lock()
+
+
+class _NoSpan:
+    # Devolvido quando a instrumentação está desligada: não mede nem guarda nada
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _emit(self.name, self.start, end - self.start, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        # Atributos conhecidos só no fim (linhas lidas, bytes, estado HTTP...)
+        self.attrs.update(attrs)
+
+
+def enabled():
+    return _STATE["enabled"]
+
+
+def span(name, **attrs):
+    if not _STATE["enabled"]:
+        return NO_SPAN
+    return Span(name, attrs)
+
+
+def traced(name=None):
+    # Decorador: um span por chamada (nome por omissão = módulo.função)
+    def decorate(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _STATE["enabled"]:
+                return fn(*args, **kwargs)
+            with Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ──────────── SAÍDA ────────────
+def _emit(name, start_ns, dur_ns, attrs):
+    event = {
+        "name": name,
+        "ph": "X",
+        "ts": (start_ns - _STATE["origin"]) / 1000,   # µs desde o arranque (formato Chrome)
+        "dur": dur_ns / 1000,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": {k: _jsonable(v) for k, v in attrs.items()},
+    }
+    with _LOCK:
+        if _STATE["jsonl"]:
+            _STATE["file"].write(json.dumps(event) + "\n")
+        else:
+            _STATE["events"].append(event)
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "item"):       # escalares numpy
+        return value.item()
+    return str(value)
+
+
+def enable(path, profile=None):
+    if _STATE["enabled"]:
+        return
+    jsonl = path.endswith(".jsonl")
+    _STATE.update({
+        "enabled": True,
+        "path": path,
+        "jsonl": jsonl,
+        "file": open(path, "w", buffering=1) if jsonl else None,
+        "events": [],
+        "origin": time.perf_counter_ns(),
+        "profile": profile,
+        "profiler": None,
+    })
+    if profile == "cprofile":
+        import cProfile
+        _STATE["profiler"] = cProfile.Profile()
+        _STATE["profiler"].enable()
+    elif profile == "tracemalloc":
+        import tracemalloc
+        tracemalloc.start(25)
+    atexit.register(disable)
+
+
+def disable():
+    if not _STATE["enabled"]:
+        return
+    _STATE["enabled"] = False
+    path, profile = _STATE["path"], _STATE["profile"]
+    if profile == "cprofile":
+        _STATE["profiler"].disable()
+        _STATE["profiler"].dump_stats(path + ".prof")
+    elif profile == "tracemalloc":
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        with open(path + ".tracemalloc.txt", "w") as f:
+            f.write(f"peak: {peak / 1024 / 1024:.2f} MB\n")
+            for stat in snapshot.statistics("lineno")[:30]:
+                f.write(f"{stat}\n")
+    with _LOCK:
+        if _STATE["jsonl"]:
+            _STATE["file"].close()
+        else:
+            with open(path, "w") as f:
+                json.dump({"traceEvents": _STATE["events"], "displayTimeUnit": "ms"}, f)
+
+
+def summary(events):
+    # Tempo total e n.º de chamadas por nome de span (para imprimir no fim de um script)
+    totals = {}
+    for event in events:
+        total, count = totals.get(event["name"], (0.0, 0))
+        totals[event["name"]] = (total + event["dur"] / 1000, count + 1)
+    return sorted(totals.items(), key=lambda item: -item[1][0])
+
+
+def load_trace(path):
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)["traceEvents"]
+
+
+if os.environ.get("PRICE_TRACE") and __name__ != "__main__":
+    enable(os.environ["PRICE_TRACE"], os.environ.get("PRICE_PROFILE") or None)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("Uso: python instrument.py trace.json|trace.jsonl")
+        sys.exit(1)
+    events = load_trace(sys.argv[1])
+    print(f"{'Span':<34} | {'Total (ms)':>11} | {'Chamadas':>8} | {'Média (ms)':>10}")
+    print("-" * 74)
+    for name, (total, count) in summary(events):
+        print(f"{name:<34} | {total:>11.2f} | {count:>8} | {total / count:>10.2f}")
@@ -0,0 +1,40 @@
+# label_layout.py
+# Version 1.0.0 - Posicionamento das labels finais sem sobreposição (packing 1-D numa só passagem)
+# 2026-10-18
+
+import math
+
+MIN_SPACING = 2.5        # espaçamento mínimo entre labels (pontos percentuais do eixo Y)
+SPACING_FRACTION = 0.035 # ou esta fração da amplitude vertical do gráfico, se for maior
+
+
+def label_spacing(y_min, y_max, min_spacing=MIN_SPACING, fraction=SPACING_FRACTION):
+    return max(min_spacing, (y_max - y_min) * fraction)
+
+
+def layout_labels(final_values, spacing):
+    # final_values: {nome: valor final}. Devolve {nome: y da label}.
+    # Ordena uma vez e resolve sobreposições num só varrimento: labels que colidem formam um bloco
+    # com espaçamento fixo, centrado na média das posições desejadas (mínimos quadrados).
+    # O(k log k) pela ordenação + O(k) para o packing.
+    items = sorted(((value, name) for name, value in final_values.items()
+                    if value is not None and not math.isnan(value)))
+    blocks = []  # [soma de (desejado - i*spacing), nº de labels, nomes]
+    for value, name in items:
+        blocks.append([value, 1, [name]])
+        while len(blocks) > 1:
+            prev, cur = blocks[-2], blocks[-1]
+            prev_top = prev[0] / prev[1] + (prev[1] - 1) * spacing
+            cur_bottom = cur[0] / cur[1]
+            if cur_bottom - prev_top >= spacing:
+                break
+            # Juntar: cada label do bloco atual fica deslocada prev[1] posições acima do início
+            blocks[-2] = [prev[0] + cur[0] - cur[1] * prev[1] * spacing, prev[1] + cur[1], prev[2] + cur[2]]
+            blocks.pop()
+
+    placements = {}
+    for total, count, names in blocks:
+        start = total / count
+        for i, name in enumerate(names):
+            placements[name] = start + i * spacing
+    return placements
@@ -0,0 +1,93 @@
+# metrics_engine.py
+# Version 1.1.0 - Spans de instrumentação (alinhamento/ffill e métricas)
+# 2026-10-18
+
+import numpy as np
+import pandas as pd
+
+from instrument import traced
+
+ANNUALIZATION = 365  # dias por ano (crypto negoceia todos os dias)
+
+METRIC_COLUMNS = ["start_price", "end_price", "return_pct", "max_ret", "drawdown", "sharpe"]
+
+
+# ──────────── ALINHAMENTO ────────────
+@traced("metrics.align_ffill")
+def align_prices(series_by_name, start_date, end_date, freq="D"):
+    # Matriz (datas × ativos) numa grelha comum. Cada célula recebe o último preço conhecido
+    # até essa data (equivalente a reindex(..., method='ffill') por ativo).
+    grid = pd.date_range(start=start_date, end=end_date, freq=freq)
+    names = list(series_by_name)
+    matrix = np.full((len(grid), len(names)), np.nan, dtype=np.float64)
+    grid_ns = grid.values.astype("datetime64[ns]")
+
+    for j, name in enumerate(names):
+        series = series_by_name[name]
+        if series.empty:
+            continue
+        dates = series.index.values.astype("datetime64[ns]")
+        pos = np.searchsorted(dates, grid_ns, side="right") - 1
+        valid = pos >= 0
+        matrix[valid, j] = series.to_numpy(dtype=np.float64)[pos[valid]]
+
+    return pd.DataFrame(matrix, index=grid, columns=names)
+
+
+# ──────────── MÉTRICAS ────────────
+def _first_valid(values, mask):
+    idx = mask.argmax(axis=0)
+    return values[idx, np.arange(values.shape[1])]
+
+def _last_valid(values, mask):
+    idx = values.shape[0] - 1 - mask[::-1].argmax(axis=0)
+    return values[idx, np.arange(values.shape[1])]
+
+@traced("metrics.compute")
+def compute_metrics(prices, annualization=ANNUALIZATION):
+    # Uma única passagem sobre a matriz: retorno, retorno máximo, drawdown máximo e Sharpe por ativo.
+    # Ativos sem nenhum preço no período ficam de fora.
+    values = prices.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(values)
+    has_data = mask.any(axis=0)
+    values, mask = values[:, has_data], mask[:, has_data]
+    names = prices.columns[has_data]
+    if values.shape[1] == 0 or values.shape[0] == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS, index=pd.Index(names, name="name"))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        start = _first_valid(values, mask)
+        end = _last_valid(values, mask)
+        max_price = np.nanmax(values, axis=0)
+
+        # Drawdown: pico acumulado ignorando NaN iniciais
+        peak = np.fmax.accumulate(values, axis=0)
+        drawdown = np.nanmin((values - peak) / peak, axis=0) * 100
+
+        # Sharpe anualizado sobre retornos diários (pares de dias com preço, como pct_change().dropna())
+        daily = values[1:] / values[:-1] - 1
+        valid = ~np.isnan(daily)
+        count = valid.sum(axis=0)
+        filled = np.where(valid, daily, 0.0)
+        mean = filled.sum(axis=0) / count
+        var = np.where(valid, (daily - mean) ** 2, 0.0).sum(axis=0) / (count - 1)
+        std = np.sqrt(var)
+        sharpe = np.where(std == 0, 0.0, mean / std * np.sqrt(annualization))
+
+    return pd.DataFrame({
+        "start_price": start,
+        "end_price": end,
+        "return_pct": (end / start - 1) * 100,
+        "max_ret": (max_price / start - 1) * 100,
+        "drawdown": drawdown,
+        "sharpe": sharpe,
+    }, index=pd.Index(names, name="name"))
+
+def cumulative_returns(prices):
+    # Retorno acumulado (%) de cada ativo face ao primeiro preço disponível no período
+    values = prices.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(values)
+    start = _first_valid(values, mask) if len(values) else np.array([])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = (values / start - 1) * 100
+    return pd.DataFrame(returns, index=prices.index, columns=prices.columns)
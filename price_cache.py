@@ -0,0 +1,98 @@
+# price_cache.py
+# Version 1.0.0 - Cache em memória das séries de preços (invalidação por mtime/tamanho, LRU com limite de memória)
+# 2026-10-18
+
+import os
+import threading
+from collections import OrderedDict
+
+from price_store import DATA_DIR, list_assets, read_prices, source_stat
+
+DEFAULT_BUDGET_MB = float(os.environ.get("PRICE_CACHE_MB", 512))
+
+
+class PriceCache:
+    def __init__(self, data_dir=DATA_DIR, max_bytes=None):
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes if max_bytes is not None else int(DEFAULT_BUDGET_MB * 1024 * 1024)
+        self.entries = OrderedDict()   # asset → (assinatura, DataFrame indexado por data, bytes)
+        self.meta = {}                 # asset → (assinatura, primeira data, última data, linhas)
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def assets(self):
+        return list_assets(self.data_dir)
+
+    def _signature(self, asset):
+        try:
+            return source_stat(asset, self.data_dir)
+        except FileNotFoundError:
+            return None
+
+    def _evict(self):
+        while self.used_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, _, size) = self.entries.popitem(last=False)
+            self.used_bytes -= size
+
+    def get(self, asset):
+        # DataFrame indexado por "date"; partilhado entre chamadas, por isso não deve ser alterado in-place
+        with self.lock:
+            signature = self._signature(asset)
+            cached = self.entries.get(asset)
+            if cached is not None and cached[0] == signature:
+                self.entries.move_to_end(asset)
+                self.hits += 1
+                return cached[1]
+
+            self.misses += 1
+            if cached is not None:
+                self.used_bytes -= cached[2]
+                del self.entries[asset]
+
+            df = read_prices(asset, self.data_dir).set_index("date")
+            size = int(df.memory_usage(deep=True).sum())
+            self.entries[asset] = (signature, df, size)
+            self.used_bytes += size
+            if len(df):
+                self.meta[asset] = (signature, df.index[0], df.index[-1], len(df))
+            self._evict()
+            return df
+
+    def bounds(self, asset):
+        # (primeira data, última data) a partir dos metadados; só lê o ficheiro se mudou
+        with self.lock:
+            meta = self.meta.get(asset)
+            if meta is None or meta[0] != self._signature(asset):
+                self.get(asset)
+                meta = self.meta.get(asset)
+            return (meta[1], meta[2]) if meta else (None, None)
+
+    def _all_bounds(self):
+        # Ficheiros ilegíveis são ignorados, tal como no resto do programa
+        result = []
+        for asset in self.assets():
+            try:
+                result.append(self.bounds(asset))
+            except Exception:
+                continue
+        return result
+
+    def earliest_date(self):
+        dates = [first for first, _ in self._all_bounds() if first is not None]
+        return min(dates) if dates else None
+
+    def latest_date(self):
+        dates = [last for _, last in self._all_bounds() if last is not None]
+        return max(dates) if dates else None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.meta.clear()
+            self.used_bytes = 0
+
+    def stats(self):
+        return {"assets": len(self.entries), "bytes": self.used_bytes,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,209 @@
+# price_daemon.py
+# Version 1.0.0 - Processo contínuo com agendador interno (substitui as execuções por cron)
+# 2026-10-18
+#
+# Os imports, a sessão HTTP (ligações keep-alive) e o índice de janelas ficam carregados entre
+# atualizações; o último ponto de cada ativo fica em memória, por isso cada refresh é só o pedido
+# à API + um append. Cada fonte tem o seu intervalo (com jitter para não sincronizar pedidos).
+# Métricas por tarefa em price_data/daemon_status.json.
+
+import os
+import json
+import time
+import heapq
+import random
+import signal
+import argparse
+import threading
+
+import pandas as pd
+
+from coingecko import COINS, get_hist_coingecko, prepare_asset, days_to_fetch, store_update
+from dex_tracker import REGISTRY_FILE, load_registry, is_up_to_date, update_pool
+from fetch_engine import engine_from_env
+from price_store import DATA_DIR
+from rolling_index import RollingIndex
+
+STATUS_FILE = os.path.join(DATA_DIR, "daemon_status.json")
+
+# Intervalo por fonte (segundos)
+INTERVALS = {
+    "coingecko": 15 * 60,
+    "dex": 60 * 60,
+}
+JITTER = 0.1  # ±10% do intervalo
+
+
+# ──────────── TAREFAS ────────────
+class Job:
+    def __init__(self, name, source, interval, fn, jitter=JITTER):
+        self.name = name
+        self.source = source
+        self.interval = interval
+        self.fn = fn
+        self.jitter = jitter
+        self.next_run = 0.0
+        self.runs = 0
+        self.errors = 0
+        self.rows = 0
+        self.last_rows = 0
+        self.last_latency = None
+        self.last_run = None
+        self.last_error = None
+
+    def schedule(self, now):
+        self.next_run = now + self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run(self):
+        started = time.perf_counter()
+        self.last_run = pd.Timestamp.now(tz="UTC").isoformat()
+        try:
+            rows = self.fn() or 0
+            self.last_error = None
+        except Exception as e:
+            rows = 0
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+        self.last_latency = time.perf_counter() - started
+        self.runs += 1
+        self.rows += rows
+        self.last_rows = rows
+        return rows
+
+    def as_dict(self):
+        return {
+            "source": self.source,
+            "interval_s": self.interval,
+            "runs": self.runs,
+            "errors": self.errors,
+            "rows_appended": self.rows,
+            "last_rows": self.last_rows,
+            "last_latency_s": round(self.last_latency, 4) if self.last_latency is not None else None,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+
+# ──────────── DAEMON ────────────
+class PriceDaemon:
+    def __init__(self, intervals=None, jitter=JITTER, hourly=False, registry=REGISTRY_FILE,
+                 data_dir=DATA_DIR, status_file=STATUS_FILE):
+        self.intervals = {**INTERVALS, **(intervals or {})}
+        self.hourly = hourly
+        self.data_dir = data_dir
+        self.status_file = status_file
+        self.engine = engine_from_env()          # sessão partilhada: ligações reutilizadas
+        self.index = RollingIndex(data_dir)      # índice de janelas em memória
+        self.latest = {}                         # ativo → {"date", "price"}
+        self.started = time.time()
+        self.stop_event = threading.Event()
+
+        self.jobs = [Job(nome, "coingecko", self.intervals["coingecko"], self._coin_task(nome), jitter)
+                     for nome in COINS]
+        if os.path.exists(registry):
+            self.jobs += [Job(entry["symbol"], "dex", self.intervals["dex"], self._pool_task(entry), jitter)
+                          for entry in load_registry(registry)]
+
+    def _coin_task(self, nome):
+        def task():
+            state = self.latest.get(nome)
+            last_date = state["date"] if state else prepare_asset(nome, self.data_dir)
+            raw = get_hist_coingecko(COINS[nome], days_to_fetch(last_date), self.engine)
+            if raw is None:
+                raise RuntimeError("sem resposta da API")
+            result = store_update(nome, raw, last_date, self.hourly, self.data_dir, index=self.index)
+            if result["last"] is not None:
+                self.latest[nome] = {"date": result["last"][0], "price": result["last"][1]}
+            return result["rows"]
+        return task
+
+    def _pool_task(self, entry):
+        def task():
+            fresh, _ = is_up_to_date(entry)
+            if fresh:
+                return 0
+            result = update_pool(self.engine, entry)
+            if result["prices"]:
+                self.index.update(entry["symbol"], refresh_last=True)
+                index = self.index.assets[entry["symbol"]]
+                self.latest[entry["symbol"]] = {"date": index.last_obs, "price": index.last_price}
+            return result["candles"]
+        return task
+
+    def status(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "fetch": self.engine.stats.as_dict(),
+            "jobs": {job.name: job.as_dict() for job in self.jobs},
+            "latest": {name: {"date": state["date"].isoformat(), "price": state["price"]}
+                       for name, state in self.latest.items()},
+        }
+
+    def write_status(self):
+        tmp = self.status_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(tmp, self.status_file)
+
+    def run_job(self, job):
+        rows = job.run()
+        if job.last_error:
+            print(f"❌ {job.name}: {job.last_error} ({job.last_latency:.2f}s)")
+        else:
+            print(f"🔁 {job.name}: {rows} linha(s) em {job.last_latency:.2f}s")
+        self.write_status()
+
+    def run_once(self):
+        for job in self.jobs:
+            self.run_job(job)
+
+    def run_forever(self):
+        # Fila de prioridade por próxima execução; a primeira ronda corre já no arranque
+        now = time.monotonic()
+        queue = [(now, i) for i in range(len(self.jobs))]
+        heapq.heapify(queue)
+        while queue and not self.stop_event.is_set():
+            due, i = queue[0]
+            wait = due - time.monotonic()
+            if wait > 0 and self.stop_event.wait(wait):
+                break
+            heapq.heappop(queue)
+            job = self.jobs[i]
+            self.run_job(job)
+            job.schedule(time.monotonic())
+            heapq.heappush(queue, (job.next_run, i))
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+    def close(self):
+        self.engine.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualizar continuamente os preços (CoinGecko + pools DEX)")
+    parser.add_argument("--coingecko-interval", type=int, default=INTERVALS["coingecko"], help="Segundos")
+    parser.add_argument("--dex-interval", type=int, default=INTERVALS["dex"], help="Segundos")
+    parser.add_argument("--jitter", type=float, default=JITTER)
+    parser.add_argument("--hourly", action="store_true", help="Guardar também velas OHLC horárias da CoinGecko")
+    parser.add_argument("--registry", default=REGISTRY_FILE)
+    parser.add_argument("--once", action="store_true", help="Uma só ronda (compatível com cron)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(DATA_DIR):
+        os.makedirs(DATA_DIR)
+    daemon = PriceDaemon({"coingecko": args.coingecko_interval, "dex": args.dex_interval},
+                         args.jitter, args.hourly, args.registry)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+
+    print(f"🚀 Daemon com {len(daemon.jobs)} tarefa(s) (CoinGecko {args.coingecko_interval}s, "
+          f"DEX {args.dex_interval}s)")
+    try:
+        if args.once:
+            daemon.run_once()
+        else:
+            daemon.run_forever()
+    finally:
+        print(daemon.engine.report())
+        daemon.close()
@@ -0,0 +1,198 @@
+# price_panel.py
+# Version 1.0.0 - Painel compacto (datas × ativos): um array contíguo por campo, float32 opcional
+# 2026-10-18
+#
+# Em vez de uma Series float64 por ativo (mais colunas return/peak/drawdown e os dicionários
+# all_returns/all_prices com cópias dos mesmos dados), o painel guarda:
+#   - um único índice partilhado em segundos desde a epoch (int64)
+#   - um array 2-D por campo (ordem Fortran: cada ativo é um bloco contíguo, column() é uma view)
+# Retornos, picos e drawdown calculam-se a pedido e não ficam guardados. Cortes por data são views.
+#
+# PRICE_PANEL_DTYPE=float32 reduz a memória para metade (≈7 algarismos significativos, suficiente
+# para preços e retornos; as métricas são sempre acumuladas em float64).
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from instrument import traced
+from price_store import DATA_DIR, list_assets, read_prices
+
+PANEL_DTYPE = os.environ.get("PRICE_PANEL_DTYPE", "float64")
+FREQ_SECONDS = {"D": 86400, "h": 3600, "min": 60}
+METRICS_CHUNK = 128  # ativos por bloco ao calcular métricas (limita a cópia float64 temporária)
+
+
+def _epoch_seconds(dates):
+    return np.asarray(pd.DatetimeIndex(dates).values.astype("datetime64[s]").astype(np.int64))
+
+
+def _grid(start_date, end_date, freq):
+    step = FREQ_SECONDS[freq]
+    start = int(pd.Timestamp(start_date).value // 10**9)
+    end = int(pd.Timestamp(end_date).value // 10**9)
+    return np.arange(start, end + 1, step, dtype=np.int64)
+
+
+class PricePanel:
+    def __init__(self, epoch, names, fields):
+        self.epoch = epoch        # int64, segundos UTC, partilhado por todos os campos
+        self.names = list(names)
+        self.fields = fields      # campo → array (len(epoch) × len(names))
+        self._positions = {name: j for j, name in enumerate(self.names)}
+
+    # ──────────── CONSTRUÇÃO ────────────
+    @classmethod
+    def empty(cls, epoch, names, dtype=PANEL_DTYPE, fields=("price",)):
+        shape = (len(epoch), len(names))
+        return cls(epoch, names, {f: np.full(shape, np.nan, dtype=dtype, order="F") for f in fields})
+
+    def _fill(self, j, dates, values, field="price"):
+        # Último valor conhecido até cada ponto da grelha (o mesmo ffill do align_prices)
+        if len(dates) == 0:
+            return
+        pos = np.searchsorted(_epoch_seconds(dates), self.epoch, side="right") - 1
+        valid = pos >= 0
+        self.fields[field][valid, j] = np.asarray(values, dtype=np.float64)[pos[valid]]
+
+    @classmethod
+    @traced("panel.from_series")
+    def from_series(cls, series_by_name, start_date, end_date, freq="D", dtype=PANEL_DTYPE):
+        panel = cls.empty(_grid(start_date, end_date, freq), series_by_name, dtype)
+        for j, series in enumerate(series_by_name.values()):
+            panel._fill(j, series.index, series.to_numpy())
+        return panel
+
+    @classmethod
+    @traced("panel.from_store")
+    def from_store(cls, start_date, end_date, assets=None, data_dir=DATA_DIR, freq="D", dtype=PANEL_DTYPE):
+        # Lê um ativo de cada vez e descarta o DataFrame: o pico é o painel + um ativo
+        assets = assets or list_assets(data_dir)
+        panel = cls.empty(_grid(start_date, end_date, freq), assets, dtype)
+        for j, asset in enumerate(assets):
+            df = read_prices(asset, data_dir, columns=["date", "price"])
+            panel._fill(j, df["date"], df["price"].to_numpy())
+        return panel
+
+    # ──────────── ACESSO (views) ────────────
+    @property
+    def prices(self):
+        return self.fields["price"]
+
+    @property
+    def dates(self):
+        return pd.DatetimeIndex(self.epoch.astype("datetime64[s]"))
+
+    @property
+    def nbytes(self):
+        return self.epoch.nbytes + sum(a.nbytes for a in self.fields.values())
+
+    def column(self, name, field="price"):
+        return self.fields[field][:, self._positions[name]]
+
+    def slice(self, start_date, end_date):
+        # Corte por datas (inclusivo) sem copiar: os arrays do novo painel são views destes
+        lo = np.searchsorted(self.epoch, int(pd.Timestamp(start_date).value // 10**9), side="left")
+        hi = np.searchsorted(self.epoch, int(pd.Timestamp(end_date).value // 10**9), side="right")
+        return PricePanel(self.epoch[lo:hi], self.names, {f: a[lo:hi] for f, a in self.fields.items()})
+
+    def to_frame(self, field="price", names=None):
+        # DataFrame sobre o mesmo buffer (sem cópia); os nomes podem ser trocados para apresentação
+        return pd.DataFrame(self.fields[field], index=self.dates, columns=names or self.names, copy=False)
+
+    # ──────────── DERIVADOS (a pedido, não guardados) ────────────
+    def returns(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.prices[1:] / self.prices[:-1] - 1
+
+    def drawdown(self):
+        peak = np.fmax.accumulate(self.prices, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.prices - peak) / peak * 100
+
+    def cumulative_returns(self):
+        mask = ~np.isnan(self.prices)
+        first = self.prices[mask.argmax(axis=0), np.arange(len(self.names))]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.prices / first - 1) * 100
+
+    def metrics(self, chunk=METRICS_CHUNK, names=None):
+        # compute_metrics por blocos de ativos: a conversão para float64 nunca copia o painel inteiro
+        from metrics_engine import compute_metrics
+        frame = self.to_frame(names=names)
+        blocks = [compute_metrics(frame.iloc[:, i:i + chunk]) for i in range(0, frame.shape[1], chunk)]
+        return pd.concat(blocks) if blocks else compute_metrics(frame)
+
+
+# ──────────── RELATÓRIO DE MEMÓRIA ────────────
+def _legacy_pipeline(series_by_name, start_date, end_date):
+    # O pipeline original do compare_returns/check_tedency_and_drawdown: DataFrame por ativo com
+    # colunas derivadas + dicionários com cópias + DataFrame de retornos para o gráfico
+    all_returns, all_prices, frames = {}, {}, {}
+    full_range = pd.date_range(start=start_date, end=end_date, freq="D")
+    for name, series in series_by_name.items():
+        df = series.to_frame("price").reindex(full_range, method="ffill")
+        df["return"] = (df["price"] / df["price"].iloc[0] - 1) * 100
+        df["peak"] = df["price"].cummax()
+        df["drawdown"] = (df["price"] - df["peak"]) / df["peak"] * 100
+        all_returns[name] = df["return"]
+        all_prices[name] = df["price"]
+        frames[name] = df
+    return frames, all_returns, all_prices, pd.DataFrame(all_returns)
+
+
+def _current_pipeline(series_by_name, start_date, end_date):
+    from metrics_engine import align_prices, compute_metrics, cumulative_returns
+    prices = align_prices(series_by_name, start_date, end_date)
+    return prices, compute_metrics(prices), cumulative_returns(prices)
+
+
+def _panel_pipeline(series_by_name, start_date, end_date, dtype):
+    panel = PricePanel.from_series(series_by_name, start_date, end_date, dtype=dtype)
+    panel.metrics()
+    panel.cumulative_returns()   # calculado para o gráfico e descartado
+    return panel
+
+
+def _measure(fn):
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained / 1024 / 1024, peak / 1024 / 1024
+
+
+def memory_report(n_assets=1000, n_days=1825, seed=0):
+    # Mesmo input (uma Series float64 por ativo, como devolve o PriceCache) para os quatro pipelines
+    from bench_suite import synthetic_gbm
+    dates, matrix = synthetic_gbm(n_assets, n_days, "day", seed)
+    series_by_name = {f"gbm{j:05d}": pd.Series(matrix[:, j], index=dates) for j in range(n_assets)}
+    start_date, end_date = dates[0], dates[-1]
+    pipelines = {
+        "original (Series por ativo)": lambda: _legacy_pipeline(series_by_name, start_date, end_date),
+        "align_prices (atual)": lambda: _current_pipeline(series_by_name, start_date, end_date),
+        "PricePanel float64": lambda: _panel_pipeline(series_by_name, start_date, end_date, "float64"),
+        "PricePanel float32": lambda: _panel_pipeline(series_by_name, start_date, end_date, "float32"),
+    }
+    return {name: _measure(fn) for name, fn in pipelines.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memória do painel compacto vs. pipeline atual")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=1825)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raw_mb = args.assets * args.days * 8 / 1024 / 1024
+    print(f"📦 {args.assets} ativos × {args.days} dias (preços float64 em bruto: {raw_mb:.1f} MB)")
+    print(f"{'Pipeline':<30} | {'Retido (MB)':>11} | {'Pico (MB)':>10}")
+    print("-" * 58)
+    for name, (retained, peak) in memory_report(args.assets, args.days, args.seed).items():
+        print(f"{name:<30} | {retained:>11.1f} | {peak:>10.1f}")
@@ -0,0 +1,413 @@
+# price_server.py
+# Version 1.1.0 - Snapshot imutável (painel, nomes, versão) trocado de uma vez; cache pelo pedido tal como chegou
+# 2026-10-18
+#
+# Carrega price_data/ uma vez (PriceCache + PricePanel), verifica periodicamente se os ficheiros
+# mudaram (mtime/tamanho) e reconstrói o painel numa thread sem parar de responder. As respostas
+# ficam em cache (LRU) por (endpoint, ativos, intervalo) já serializadas; um novo painel invalida-as.
+#
+#   GET /assets                                   ativos e primeira/última data
+#   GET /metrics?assets=bitcoin,solana&start=2025-01-01&end=2025-06-30
+#   GET /drawdown?asset=ethereum&start=...&end=...
+#   GET /status                                   estatísticas do servidor (+ daemon_status.json)
+
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from metrics_engine import compute_metrics
+from price_cache import PriceCache
+from price_panel import PricePanel
+from price_store import DATA_DIR, source_stat
+
+HOST = "127.0.0.1"
+PORT = 8787
+WATCH_SECONDS = 5.0
+CACHE_ENTRIES = 1024
+LATENCY_SAMPLES = 10_000
+STATUS_FILE = "daemon_status.json"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def display_name(asset):
+    # Os mesmos nomes da tabela de resumo do compare_returns
+    return "Quantum Flow" if asset.lower() == "qflow" else asset.capitalize()
+
+
+def _json_value(value):
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def percentile(samples, q):
+    return float(np.percentile(np.fromiter(samples, dtype=np.float64), q)) if samples else None
+
+
+# ──────────── ESTADO EM MEMÓRIA ────────────
+class Snapshot:
+    # Painel + nomes + versão de uma mesma leitura. Nunca é alterado depois de criado: o refresh
+    # (numa thread) troca-o inteiro com uma única atribuição, por isso um pedido vê sempre um conjunto coerente.
+    __slots__ = ("version", "signature", "panel", "assets")
+
+    def __init__(self, version=0, signature=None, panel=None, assets=None):
+        self.version = version
+        self.signature = signature
+        self.panel = panel
+        self.assets = assets or {}          # nome em minúsculas (ficheiro ou apresentação) → coluna
+
+
+class PriceState:
+    def __init__(self, data_dir=DATA_DIR, cache_entries=CACHE_ENTRIES):
+        self.data_dir = data_dir
+        self.cache = PriceCache(data_dir)
+        self.results = OrderedDict()        # (endpoint, ...) → bytes JSON da versão results_version
+        self.results_version = 0
+        self.cache_entries = cache_entries
+        self.snapshot = Snapshot()
+        self.hits = 0
+        self.misses = 0
+
+    def _signature(self):
+        # Muda quando um ficheiro muda ou quando o dia muda (a grelha vai até hoje)
+        stats = []
+        for asset in self.cache.assets():
+            try:
+                stats.append(source_stat(asset, self.data_dir))
+            except FileNotFoundError:
+                continue
+        return pd.Timestamp.now().normalize(), tuple(stats)
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def panel(self):
+        return self.snapshot.panel
+
+    def refresh(self):
+        # Chamado numa thread: constrói o painel novo e troca o snapshot de uma vez
+        current = self.snapshot
+        signature = self._signature()
+        if signature == current.signature:
+            return False
+        series_by_name, assets = {}, {}
+        for asset in self.cache.assets():
+            try:
+                name = display_name(asset)
+                series_by_name[name] = self.cache.get(asset)["price"]
+            except Exception as e:
+                print(f"Erro ao processar {asset}: {e}")
+                continue
+            assets[asset.lower()] = assets[name.lower()] = name
+        earliest = self.cache.earliest_date()
+        if earliest is not None:
+            panel = PricePanel.from_series(series_by_name, earliest.normalize(), signature[0])
+        else:
+            panel = None
+        self.snapshot = Snapshot(current.version + 1, signature, panel, assets)
+        return True
+
+    # ──────────── CONSULTAS ────────────
+    def _names(self, snap, raw):
+        if not raw:
+            return list(snap.panel.names)
+        names = []
+        for item in raw.split(","):
+            name = snap.assets.get(item.strip().lower())
+            if name is None:
+                raise HTTPError(404, f"Ativo desconhecido: {item.strip()}")
+            names.append(name)
+        return names
+
+    def _range(self, snap, params):
+        try:
+            start = pd.Timestamp(params["start"]) if "start" in params else snap.panel.dates[0]
+            end = pd.Timestamp(params["end"]) if "end" in params else snap.panel.dates[-1]
+        except ValueError as e:
+            raise HTTPError(400, f"Data inválida: {e}")
+        if start > end:
+            raise HTTPError(400, "start depois de end")
+        return start.normalize(), end.normalize()
+
+    def _cached(self, snap, key, compute):
+        # Só corre no event loop; um snapshot novo invalida as respostas da versão anterior
+        if snap.version != self.results_version:
+            self.results.clear()
+            self.results_version = snap.version
+        body = self.results.get(key)
+        if body is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return body
+        self.misses += 1
+        body = json.dumps(compute()).encode()
+        self.results[key] = body
+        if len(self.results) > self.cache_entries:
+            self.results.popitem(last=False)
+        return body
+
+    def get(self, target):
+        # Atalho pelo pedido tal como chegou (path + query): uma resposta já servida não volta a
+        # passar pelo parse dos parâmetros e das datas (pandas), que era quase todo o custo de um hit
+        snap = self.snapshot
+        key = ("target", target)
+        if snap.version == self.results_version:
+            body = self.results.get(key)
+            if body is not None:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return body
+        url = urlsplit(target)
+        body = self.query(url.path, {k: v[-1] for k, v in parse_qs(url.query).items()}, snap)
+        if snap.version == self.results_version:
+            self.results[key] = body
+            if len(self.results) > self.cache_entries:
+                self.results.popitem(last=False)
+        return body
+
+    def query(self, path, params, snap=None):
+        snap = snap or self.snapshot   # uma única leitura: painel, nomes e versão do mesmo refresh
+        if snap.panel is None and path != "/status":
+            raise HTTPError(503, "Sem dados em " + self.data_dir)
+        if path == "/assets":
+            return self._cached(snap, ("assets",), lambda: self.list_assets(snap.panel))
+        if path == "/metrics":
+            names = self._names(snap, params.get("assets"))
+            start, end = self._range(snap, params)
+            return self._cached(snap, ("metrics", tuple(names), start, end),
+                                lambda: self.metrics(snap.panel, names, start, end))
+        if path == "/drawdown":
+            if "asset" not in params:
+                raise HTTPError(400, "Falta o parâmetro asset")
+            name = self._names(snap, params["asset"])[0]
+            start, end = self._range(snap, params)
+            return self._cached(snap, ("drawdown", name, start, end),
+                                lambda: self.drawdown(snap.panel, name, start, end))
+        raise HTTPError(404, f"Endpoint desconhecido: {path}")
+
+    def list_assets(self, panel):
+        result = []
+        for name in panel.names:
+            column = panel.column(name)
+            valid = np.flatnonzero(~np.isnan(column))
+            first, last = (panel.dates[valid[0]], panel.dates[valid[-1]]) if len(valid) else (None, None)
+            result.append({"name": name, "first": first and str(first.date()), "last": last and str(last.date())})
+        return {"assets": result}
+
+    def metrics(self, panel, names, start, end):
+        frame = panel.slice(start, end).to_frame()[names]
+        table = compute_metrics(frame)
+        return {
+            "start": str(start.date()),
+            "end": str(end.date()),
+            "assets": [{"name": name, **{k: _json_value(v) for k, v in row.items()}}
+                       for name, row in table.to_dict("index").items()],
+        }
+
+    def drawdown(self, panel, name, start, end):
+        window = panel.slice(start, end)
+        prices = window.column(name).astype(np.float64)
+        valid = ~np.isnan(prices)
+        peak = np.fmax.accumulate(prices)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            drawdown = (prices - peak) / peak * 100
+        dates = window.dates[valid].strftime("%Y-%m-%d")
+        return {
+            "asset": name,
+            "start": str(start.date()),
+            "end": str(end.date()),
+            "max_drawdown": _json_value(np.nanmin(drawdown)) if valid.any() else None,
+            "series": [{"date": d, "price": float(p), "drawdown": float(dd)}
+                       for d, p, dd in zip(dates, prices[valid], drawdown[valid])],
+        }
+
+
+# ──────────── SERVIDOR ────────────
+class PriceServer:
+    def __init__(self, state, host=HOST, port=PORT, watch=WATCH_SECONDS):
+        self.state = state
+        self.host = host
+        self.port = port
+        self.watch = watch
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)   # ms das últimas respostas
+        self.started = time.time()
+
+    def status(self):
+        snap = self.state.snapshot
+        result = {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": {"p50": percentile(self.latencies, 50), "p99": percentile(self.latencies, 99)},
+            "panel_version": snap.version,
+            "assets": len(snap.panel.names) if snap.panel is not None else 0,
+            "result_cache": {"entries": len(self.state.results), "hits": self.state.hits,
+                             "misses": self.state.misses},
+            "price_cache": self.state.cache.stats(),
+        }
+        daemon_file = os.path.join(self.state.data_dir, STATUS_FILE)
+        if os.path.exists(daemon_file):
+            with open(daemon_file) as f:
+                result["daemon"] = json.load(f)
+        return result
+
+    def respond(self, target):
+        if urlsplit(target).path == "/status":
+            return 200, json.dumps(self.status()).encode()
+        return 200, self.state.get(target)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip().lower()
+
+                started = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    method, target, version = None, None, "HTTP/1.0"   # responde e fecha a ligação
+                try:
+                    if method is None:
+                        raise HTTPError(400, "Pedido HTTP inválido")
+                    if method != "GET":
+                        raise HTTPError(405, "Só GET")
+                    status, body = self.respond(target)
+                except HTTPError as e:
+                    status, body = e.status, json.dumps({"error": str(e)}).encode()
+                except Exception as e:
+                    status, body = 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+
+                keep_alive = method == "GET" and version == "HTTP/1.1" and headers.get("connection") != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                self.requests += 1
+                self.errors += status != 200
+                self.latencies.append((time.perf_counter() - started) * 1000)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch_files(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.watch)
+            try:
+                if await loop.run_in_executor(None, self.state.refresh):
+                    print(f"🔄 Painel recarregado (versão {self.state.version})")
+            except Exception as e:
+                print(f"❌ Erro ao recarregar: {type(e).__name__}: {e}")
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.state.refresh)
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"🚀 API em http://{self.host}:{self.port} "
+              f"({len(self.state.panel.names) if self.state.panel else 0} ativos, verificação a cada {self.watch}s)")
+        watcher = asyncio.create_task(self.watch_files())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+# ──────────── TESTE DE CARGA ────────────
+async def load_test(host, port, paths, total=2000, concurrency=32):
+    # N clientes keep-alive em paralelo; devolve as latências (ms) vistas pelo cliente
+    latencies = []
+    counter = iter(range(total))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        for i in counter:
+            path = paths[i % len(paths)]
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append((time.perf_counter() - started) * 1000)
+        writer.close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+LOAD_TEST_PATHS = [
+    "/metrics",
+    "/metrics?assets=bitcoin,ethereum&start=2025-06-01",
+    "/drawdown?asset=solana",
+    "/drawdown?asset=bitcoin&start=2025-09-01",
+    "/assets",
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API local com métricas a partir do painel em memória")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--watch", type=float, default=WATCH_SECONDS, help="Segundos entre verificações dos ficheiros")
+    parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES)
+    parser.add_argument("--load-test", type=int, metavar="N",
+                        help="Não arranca o servidor: envia N pedidos a um servidor já a correr")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.load_test:
+        t0 = time.perf_counter()
+        latencies = asyncio.run(load_test(args.host, args.port, LOAD_TEST_PATHS, args.load_test, args.concurrency))
+        seconds = time.perf_counter() - t0
+        print(f"📊 {len(latencies)} pedidos, {args.concurrency} clientes: {len(latencies) / seconds:,.0f} pedidos/s | "
+              f"p50 {percentile(latencies, 50):.2f} ms | p99 {percentile(latencies, 99):.2f} ms | "
+              f"máx {max(latencies):.2f} ms")
+    else:
+        if not os.path.isdir(args.data_dir):
+            print(f"❌ Pasta {args.data_dir} não encontrada.")
+            raise SystemExit(1)
+        server = PriceServer(PriceState(args.data_dir, args.cache_entries), args.host, args.port, args.watch)
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            print("\n👋 Servidor parado")
@@ -0,0 +1,423 @@
+# price_store.py
+# Version 1.3.1 - iter_price_chunks por ordem de data e sem repetidos (parts só com datas de fronteira em comum, senão read_prices)
+# 2026-10-18
+#
+# Layout em DATA_DIR:
+#   <ativo>_price_history.csv        formato antigo (texto), continua a ser lido
+#   <ativo>_price_history/part-*.parquet   formato colunar: date=timestamp[ns], price=float64
+#   <ativo>_price_history.index.json       índice lateral com a última data escrita
+#
+# Cada escrita incremental cria um novo "part" (ou acrescenta linhas ao CSV) sem reler o histórico;
+# a deduplicação/ordenação completa só é feita em compact().
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from instrument import enabled, span, traced
+
+DATA_DIR = "price_data"
+SUFFIX = "_price_history"
+
+# Formato usado nas escritas: parquet (se pyarrow estiver instalado) ou csv
+STORE_FORMAT = os.environ.get("PRICE_STORE_FORMAT", "parquet" if HAS_PYARROW else "csv")
+
+
+# ──────────── CAMINHOS ────────────
+def csv_path(asset, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{asset}{SUFFIX}.csv")
+
+def parquet_dir(asset, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{asset}{SUFFIX}")
+
+def parquet_parts(asset, data_dir=DATA_DIR):
+    return sorted(glob.glob(os.path.join(parquet_dir(asset, data_dir), "part-*.parquet")))
+
+def has_asset(asset, data_dir=DATA_DIR):
+    return bool(parquet_parts(asset, data_dir)) or os.path.exists(csv_path(asset, data_dir))
+
+def list_assets(data_dir=DATA_DIR):
+    assets = set()
+    if not os.path.isdir(data_dir):
+        return []
+    for entry in os.listdir(data_dir):
+        if entry.endswith(f"{SUFFIX}.csv"):
+            assets.add(entry[:-len(f"{SUFFIX}.csv")])
+        elif entry.endswith(SUFFIX) and os.path.isdir(os.path.join(data_dir, entry)):
+            if parquet_parts(entry[:-len(SUFFIX)], data_dir):
+                assets.add(entry[:-len(SUFFIX)])
+    return sorted(assets)
+
+def index_path(asset, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{asset}{SUFFIX}.index.json")
+
+def source_stat(asset, data_dir=DATA_DIR):
+    # (caminho, mtime_ns, tamanho) de cada ficheiro lido para o ativo: muda sempre que os dados mudam
+    parts = parquet_parts(asset, data_dir)
+    paths = parts if parts else [csv_path(asset, data_dir)]
+    stats = []
+    for path in paths:
+        st = os.stat(path)
+        stats.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(stats)
+
+def asset_source(asset, data_dir=DATA_DIR):
+    # Caminho efetivamente lido (o parquet tem prioridade sobre o CSV antigo)
+    if parquet_parts(asset, data_dir):
+        return parquet_dir(asset, data_dir)
+    return csv_path(asset, data_dir)
+
+
+# ──────────── TIPOS ────────────
+def _normalize(df):
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"]).astype("datetime64[ns]")
+    for col in df.columns:
+        # float32 é mantido de propósito (layout compacto); o resto passa a float64
+        if col != "date" and df[col].dtype != np.float32:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+def _arrow_table(df):
+    fields = [pa.field("date", pa.timestamp("ns"))]
+    fields += [pa.field(col, pa.float32() if df[col].dtype == np.float32 else pa.float64())
+               for col in df.columns if col != "date"]
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+# ──────────── ÍNDICE DA ÚLTIMA DATA ────────────
+def _source_signature(asset, data_dir):
+    # Identifica o estado dos ficheiros para detetar índices desatualizados (ex.: CSV editado à mão)
+    parts = parquet_parts(asset, data_dir)
+    if parts:
+        return {"parts": len(parts), "last_part": os.path.basename(parts[-1])}
+    path = csv_path(asset, data_dir)
+    return {"csv_size": os.path.getsize(path)} if os.path.exists(path) else {}
+
+def _save_index(asset, data_dir, last_date):
+    path = index_path(asset, data_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"last_date": pd.Timestamp(last_date).isoformat(),
+                   **_source_signature(asset, data_dir)}, f)
+    os.replace(tmp, path)
+
+def _csv_tail_date(path, block=4096):
+    # Lê apenas o fim do ficheiro até encontrar a última linha completa
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos, data = end, b""
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            lines = [l for l in data.splitlines() if l.strip()]
+            if len(lines) >= 2 or pos == 0:
+                break
+    for line in reversed(lines):
+        field = line.split(b",", 1)[0].decode()
+        if field != "date":
+            return pd.Timestamp(field)
+    return None
+
+def _parquet_max_date(parts):
+    # Usa as estatísticas dos row groups: não lê nenhum dado
+    best = None
+    for part in parts:
+        meta = pq.ParquetFile(part).metadata
+        col = meta.schema.names.index("date")
+        for i in range(meta.num_row_groups):
+            stats = meta.row_group(i).column(col).statistics
+            if stats is None or not stats.has_min_max:
+                return read_prices_from_parts(parts, ["date"])["date"].max()
+            value = pd.Timestamp(stats.max)
+            best = value if best is None or value > best else best
+    return best
+
+def last_timestamp(asset, data_dir=DATA_DIR):
+    # Última data guardada sem ler o histórico (índice lateral → metadados/tail → None)
+    if not has_asset(asset, data_dir):
+        return None
+    try:
+        with open(index_path(asset, data_dir)) as f:
+            index = json.load(f)
+        if {k: v for k, v in index.items() if k != "last_date"} == _source_signature(asset, data_dir):
+            return pd.Timestamp(index["last_date"])
+    except (OSError, ValueError, KeyError):
+        pass
+    parts = parquet_parts(asset, data_dir)
+    last = _parquet_max_date(parts) if parts else _csv_tail_date(csv_path(asset, data_dir))
+    if last is not None:
+        _save_index(asset, data_dir, last)
+    return last
+
+
+# ──────────── LEITURA ────────────
+def read_prices_from_parts(parts, columns=None):
+    return pq.read_table(parts, columns=columns).to_pandas()
+
+def read_prices(asset, data_dir=DATA_DIR, columns=None):
+    # Devolve DataFrame com "date" (datetime64[ns]) e colunas float64, ordenado e sem datas repetidas
+    parts = parquet_parts(asset, data_dir)
+    with span("store.read", asset=asset, format="parquet" if parts else "csv") as s:
+        if parts:
+            df = read_prices_from_parts(parts, columns)
+        elif os.path.exists(csv_path(asset, data_dir)):
+            df = pd.read_csv(csv_path(asset, data_dir), parse_dates=["date"], usecols=columns)
+            df = _normalize(df)
+        else:
+            raise FileNotFoundError(f"Sem dados para {asset} em {data_dir}")
+        if len(parts) > 1 or not parts:
+            df = df.drop_duplicates(subset="date", keep="last").sort_values("date")
+        if enabled():
+            s.set(rows=len(df), bytes=sum(os.path.getsize(p) for p in parts or [csv_path(asset, data_dir)]))
+    return df.reset_index(drop=True)
+
+def _part_bounds(part):
+    # (min, max) da coluna date pelas estatísticas dos row groups; () = part vazio, None = sem estatísticas
+    meta = pq.ParquetFile(part).metadata
+    col = meta.schema.names.index("date")
+    lo = hi = None
+    for i in range(meta.num_row_groups):
+        stats = meta.row_group(i).column(col).statistics
+        if stats is None or not stats.has_min_max:
+            return None
+        lo = stats.min if lo is None else min(lo, stats.min)
+        hi = stats.max if hi is None else max(hi, stats.max)
+    return () if lo is None else (pd.Timestamp(lo), pd.Timestamp(hi))
+
+def _stream_plan(parts):
+    # Cada part já está ordenado e sem duplicados. Ordenados pela data mínima, podem ser lidos em
+    # sequência se só partilharem datas de fronteira (ex.: o dia em curso regravado): nessa data fica
+    # o part escrito por último e os outros saltam-na. Devolve [(part, datas a saltar)] ou None
+    # se houver sobreposição real (é preciso ordenar tudo).
+    bounded = []
+    for order, part in enumerate(parts):
+        bounds = _part_bounds(part)
+        if bounds is None:
+            return None
+        if bounds:
+            bounded.append((*bounds, order, part))
+    bounded.sort()
+    running_hi = None
+    holders = {}   # data de fronteira → [(ordem de escrita, posição no plano)]
+    for i, (lo, hi, order, _) in enumerate(bounded):
+        if running_hi is not None and lo < running_hi:
+            return None
+        running_hi = hi if running_hi is None else max(running_hi, hi)
+        for date in {lo, hi}:
+            holders.setdefault(date, []).append((order, i))
+    plan = [(part, set()) for *_, part in bounded]
+    for date, owners in holders.items():
+        for _, i in sorted(owners)[:-1]:
+            plan[i][1].add(date.to_datetime64())
+    return plan
+
+def _csv_is_sorted(path, chunksize):
+    # Passagem só pela coluna date: datas estritamente crescentes (sem linhas fora de ordem nem repetidas)
+    previous = None
+    for chunk in pd.read_csv(path, usecols=["date"], parse_dates=["date"], chunksize=chunksize):
+        dates = chunk["date"].to_numpy()
+        if len(dates) == 0:
+            continue
+        if (previous is not None and dates[0] <= previous) or (dates[1:] <= dates[:-1]).any():
+            return False
+        previous = dates[-1]
+    return True
+
+def iter_price_chunks(asset, data_dir=DATA_DIR, chunksize=100_000, columns=("date", "price")):
+    # Lê o histórico em blocos por ordem de data e sem datas repetidas, sem o carregar todo em memória.
+    # Um store por compactar com blocos sobrepostos (backfill, appends fora de ordem) é lido de uma
+    # vez com read_prices (ordenado/deduplicado) e devolvido em blocos.
+    columns = list(columns)
+    parts = parquet_parts(asset, data_dir)
+    if parts:
+        plan = _stream_plan(parts)
+        if plan is not None:
+            for part, skip in plan:
+                for batch in pq.ParquetFile(part).iter_batches(batch_size=chunksize, columns=columns):
+                    df = batch.to_pandas()
+                    if skip:
+                        df = df[~df["date"].isin(skip)].reset_index(drop=True)
+                    yield df
+            return
+    elif os.path.exists(csv_path(asset, data_dir)):
+        path = csv_path(asset, data_dir)
+        if _csv_is_sorted(path, chunksize):
+            for chunk in pd.read_csv(path, usecols=columns, parse_dates=["date"], chunksize=chunksize):
+                yield _normalize(chunk)
+            return
+    else:
+        raise FileNotFoundError(f"Sem dados para {asset} em {data_dir}")
+    df = read_prices(asset, data_dir, columns=columns)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize].reset_index(drop=True)
+
+def read_prices_since(asset, since, data_dir=DATA_DIR, inclusive=False):
+    # Só as linhas posteriores a "since"; no parquet os parts/row groups antigos nem são lidos.
+    # inclusive=True inclui "since" (para apanhar o intervalo em curso regravado com a mesma data)
+    parts = parquet_parts(asset, data_dir)
+    since = pd.Timestamp(since)
+    op = ">=" if inclusive else ">"
+    if parts:
+        df = pq.read_table(parts, filters=[("date", op, since.to_datetime64())]).to_pandas()
+        df = df.drop_duplicates(subset="date", keep="last").sort_values("date")
+        return df.reset_index(drop=True)
+    df = read_prices(asset, data_dir)
+    keep = df["date"] >= since if inclusive else df["date"] > since
+    return df[keep].reset_index(drop=True)
+
+
+# ──────────── ESCRITA ────────────
+def _write_part(asset, df, data_dir):
+    folder = parquet_dir(asset, data_dir)
+    os.makedirs(folder, exist_ok=True)
+    # Nome ordenável pelo tempo de escrita; tmp + rename garante que nunca se lê um part incompleto
+    name = f"part-{time.time_ns():020d}.parquet"
+    tmp = os.path.join(folder, f".{name}.tmp")
+    pq.write_table(_arrow_table(df), tmp, compression="zstd")
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(folder, name))
+
+@traced("store.write")
+def write_prices(asset, df, data_dir=DATA_DIR, fmt=None):
+    # Reescrita completa (histórico inicial ou migração)
+    fmt = fmt or STORE_FORMAT
+    df = _normalize(df).drop_duplicates(subset="date", keep="last").sort_values("date")
+    if fmt == "parquet":
+        old_parts = parquet_parts(asset, data_dir)
+        _write_part(asset, df, data_dir)
+        for part in old_parts:
+            os.remove(part)
+    else:
+        os.makedirs(data_dir, exist_ok=True)
+        path = csv_path(asset, data_dir)
+        tmp = path + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    if not df.empty:
+        _save_index(asset, data_dir, df["date"].iloc[-1])
+
+def _append_csv(path, df):
+    # Append com fsync: as linhas novas ficam em disco antes de o índice ser atualizado.
+    # Se a escrita falhar a meio, o ficheiro é truncado de volta ao tamanho original.
+    header = not os.path.exists(path) or os.path.getsize(path) == 0
+    text = df.to_csv(index=False, header=header)
+    with open(path, "ab+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size > 0:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                text = "\n" + text
+        try:
+            f.write(text.encode())
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(size)
+            raise
+
+@traced("store.append")
+def append_prices(asset, df, data_dir=DATA_DIR, fmt=None, only_newer=True):
+    # Acrescenta apenas as linhas posteriores à última data guardada, sem reler nem reescrever o histórico.
+    # only_newer=False aceita blocos mais antigos (backfill por páginas); a leitura/compactação deduplica.
+    if df.empty:
+        return 0
+    fmt = fmt or STORE_FORMAT
+    if fmt == "parquet" and not parquet_parts(asset, data_dir) and os.path.exists(csv_path(asset, data_dir)):
+        # Primeiro append em parquet de um ativo ainda em CSV: migrar antes
+        migrate_asset(asset, data_dir)
+    df = _normalize(df).drop_duplicates(subset="date", keep="last").sort_values("date")
+    last = last_timestamp(asset, data_dir)
+    if last is not None and only_newer:
+        df = df[df["date"] > last]
+    if df.empty:
+        return 0
+    if fmt == "parquet":
+        _write_part(asset, df, data_dir)
+    else:
+        _append_csv(csv_path(asset, data_dir), df)
+    newest = df["date"].iloc[-1]
+    _save_index(asset, data_dir, newest if last is None else max(last, newest))
+    return len(df)
+
+
+# ──────────── COMPACTAÇÃO (A PEDIDO) ────────────
+def compact(asset, data_dir=DATA_DIR, keep_after=None):
+    # Junta todos os parts (ou reescreve o CSV) num único ficheiro ordenado e sem duplicados.
+    # keep_after: descarta linhas anteriores a essa data (retenção para dados intradiários)
+    parts = parquet_parts(asset, data_dir)
+    fmt = "parquet" if parts else "csv"
+    if fmt == "parquet" and len(parts) == 1 and keep_after is None:
+        return len(parts), len(parts)
+    df = read_prices(asset, data_dir)
+    if keep_after is not None:
+        df = df[df["date"] >= pd.Timestamp(keep_after)]
+    write_prices(asset, df, data_dir, fmt=fmt)
+    return len(parts) if parts else 1, len(parquet_parts(asset, data_dir)) or 1
+
+def compact_all(data_dir=DATA_DIR):
+    return {asset: compact(asset, data_dir) for asset in list_assets(data_dir)}
+
+
+# ──────────── MIGRAÇÃO CSV → PARQUET ────────────
+def migrate_asset(asset, data_dir=DATA_DIR, remove_csv=False):
+    df = pd.read_csv(csv_path(asset, data_dir), parse_dates=["date"])
+    write_prices(asset, df, data_dir, fmt="parquet")
+    if remove_csv:
+        os.remove(csv_path(asset, data_dir))
+    return len(df)
+
+def migrate_csvs(data_dir=DATA_DIR, remove_csv=False):
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow não está instalado (pip install pyarrow)")
+    migrated = {}
+    for asset in list_assets(data_dir):
+        if os.path.exists(csv_path(asset, data_dir)):
+            migrated[asset] = migrate_asset(asset, data_dir, remove_csv)
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestão do armazenamento de preços")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="Converter os CSV de price_data para Parquet")
+    m.add_argument("--data-dir", default=DATA_DIR)
+    m.add_argument("--remove-csv", action="store_true", help="Apagar os CSV depois de migrar")
+    c = sub.add_parser("compact", help="Ordenar, remover duplicados e juntar os parts de cada ativo")
+    c.add_argument("--data-dir", default=DATA_DIR)
+    c.add_argument("assets", nargs="*", help="Ativos a compactar (por omissão todos)")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        for asset in args.assets or list_assets(args.data_dir):
+            before, after = compact(asset, args.data_dir)
+            print(f"🧹 {asset}: {before} → {after} ficheiro(s)")
+
+    if args.command == "migrate":
+        try:
+            migrated = migrate_csvs(args.data_dir, args.remove_csv)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        for asset, rows in migrated.items():
+            print(f"✅ {asset}: {rows} linhas → {parquet_dir(asset, args.data_dir)}")
+        if not migrated:
+            print("⚠️ Nenhum CSV para migrar.")
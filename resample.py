@@ -0,0 +1,111 @@
+# resample.py
+# Version 1.1.0 - Fecho etiquetado no fim do intervalo (a mesma convenção dos pontos diários da CoinGecko)
+# 2026-10-18
+#
+# A CoinGecko devolve pontos horários para "days" pequenos e diários para "days" grandes, por isso
+# as atualizações incrementais misturavam granularidades no mesmo ficheiro. Antes de gravar, cada
+# série de fecho passa a ter uma linha por intervalo:
+#   - etiqueta = fim do intervalo (ex.: 2025-08-25 00:00 UTC para o dia 24)
+#   - valor    = última observação no intervalo ]início, fim] (fecho, ou seja, o preço à meia-noite)
+# É o significado dos pontos diários antigos da CoinGecko (o ponto das 00:00 é o fecho do dia anterior)
+# e o de quem lê o store (align_prices, PricePanel, rolling_index: último preço até à meia-noite), por
+# isso o histórico antigo e os dias novos encaixam sem desfasamento. O intervalo em curso fica com a
+# etiqueta do seu fim (amanhã 00:00) e é regravado até fechar; a leitura fica com a última versão.
+# As velas OHLC (resample_ohlc) mantêm a convenção das velas: etiqueta = início do intervalo.
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from price_store import DATA_DIR, list_assets, parquet_parts, read_prices, write_prices
+from rolling_index import reset_index
+
+FREQS = {"day": "D", "hour": "h"}
+
+
+def _step(freq):
+    return pd.Timedelta(1, unit=FREQS.get(freq, freq)).value
+
+
+def _sorted_values(df, column):
+    df = df.dropna(subset=[column])
+    dates = df["date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    order = np.argsort(dates, kind="stable")
+    return dates[order], df[column].to_numpy(dtype=np.float64)[order]
+
+
+def bucket_floor(dates, freq="day"):
+    # Início (UTC, ns) do intervalo de cada timestamp
+    step = _step(freq)
+    return np.asarray(dates, dtype="datetime64[ns]").astype(np.int64) // step * step
+
+
+def bucket_ceil(dates, freq="day"):
+    # Fim (UTC, ns) do intervalo ]início, fim] de cada timestamp; um ponto exatamente no limite fica nele
+    step = _step(freq)
+    return -(-np.asarray(dates, dtype="datetime64[ns]").astype(np.int64) // step) * step
+
+
+def resample_close(df, freq="day", column="price"):
+    # Uma linha por intervalo com a última observação, etiquetada no fim do intervalo (vetorizado: sem groupby)
+    if df.empty:
+        return df[["date", column]].copy()
+    dates, values = _sorted_values(df, column)
+    keys = bucket_ceil(dates, freq)
+    last = np.append(keys[1:] != keys[:-1], True)
+    return pd.DataFrame({"date": keys[last].astype("datetime64[ns]"), column: values[last]})
+
+
+def resample_ohlc(df, freq="hour", column="price"):
+    # Velas OHLC por intervalo a partir de uma série de preços (float32, como o OHLCV do GeckoTerminal)
+    if df.empty:
+        return pd.DataFrame(columns=["date", "open", "high", "low", "close"])
+    dates, values = _sorted_values(df, column)
+    keys = bucket_floor(dates, freq)
+    starts = np.flatnonzero(np.insert(keys[1:] != keys[:-1], 0, True))
+    ends = np.append(starts[1:], len(keys)) - 1
+    return pd.DataFrame({
+        "date": keys[starts].astype("datetime64[ns]"),
+        "open": values[starts].astype(np.float32),
+        "high": np.maximum.reduceat(values, starts).astype(np.float32),
+        "low": np.minimum.reduceat(values, starts).astype(np.float32),
+        "close": values[ends].astype(np.float32),
+    })
+
+
+def is_canonical(dates, freq="day"):
+    # Todas as datas no início de um intervalo e no máximo uma por intervalo
+    ns = np.asarray(dates, dtype="datetime64[ns]").astype(np.int64)
+    return bool(np.all(ns % _step(freq) == 0) and len(np.unique(ns)) == len(ns))
+
+
+def normalize_asset(asset, data_dir=DATA_DIR, freq="day"):
+    # Converte um histórico antigo (mistura de pontos diários e horários) para o formato canónico
+    df = read_prices(asset, data_dir)
+    if is_canonical(df["date"], freq):
+        return len(df), len(df)
+    out = resample_close(df, freq)
+    write_prices(asset, out, data_dir, fmt="parquet" if parquet_parts(asset, data_dir) else "csv")
+    reset_index(asset, data_dir)
+    return len(df), len(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalizar os históricos para um ponto por intervalo UTC")
+    parser.add_argument("assets", nargs="*", help="Ativos (por omissão todos)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--freq", choices=list(FREQS), default="day")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_dir):
+        print(f"❌ Pasta {args.data_dir} não encontrada.")
+        sys.exit(1)
+    for asset in args.assets or list_assets(args.data_dir):
+        before, after = normalize_asset(asset, args.data_dir, args.freq)
+        if before == after:
+            print(f"✅ {asset}: já normalizado ({after} linhas)")
+        else:
+            print(f"🧹 {asset}: {before} → {after} linhas")
@@ -0,0 +1,319 @@
+# rolling_index.py
+# Version 1.1.0 - Drawdown máximo por janela (sobre a grelha diária guardada); usado pelo menu do compare_returns
+# 2026-10-18
+#
+# Para cada ativo guarda-se a série diária (último preço conhecido à meia-noite, igual ao
+# reindex(..., method='ffill') do compare_returns.py) e, sobre ela:
+#   - log-retorno acumulado           → retorno de qualquer período em O(1)
+#   - somas prefixas de r e r²        → média/desvio padrão/Sharpe em O(1)
+#   - sparse tables de máximo/mínimo  → retorno máximo em O(1)
+#   - drawdown máximo: uma passagem vetorizada pela grelha do período (sem ler o ficheiro)
+# Quando os downloaders acrescentam dias, as estruturas são estendidas sem recalcular o resto.
+# A última observação fica sempre fora da grelha (só em last_price): o intervalo em curso pode
+# ser regravado com a mesma data e o índice atualiza-se sem reconstrução.
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from price_store import DATA_DIR, SUFFIX, list_assets, read_prices, read_prices_since, last_timestamp
+from metrics_engine import ANNUALIZATION
+
+# Janelas do menu de períodos (dias)
+STANDARD_WINDOWS = {
+    "1 Day": 1,
+    "1 Week": 7,
+    "15 Days": 15,
+    "1 Month": 30,
+    "3 Months": 90,
+    "6 Months": 180,
+    "1 Year": 365,
+}
+
+DAY = np.timedelta64(1, "D")
+LAYOUT = 2  # versão do formato .npz (índices antigos são reconstruídos)
+
+
+def index_file(asset, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{asset}{SUFFIX}.rolling.npz")
+
+
+# ──────────── SPARSE TABLE (máximo/mínimo de intervalo) ────────────
+class SparseTable:
+    def __init__(self, values, op):
+        self.op = op
+        self.levels = [np.asarray(values, dtype=np.float64)]
+        self._grow()
+
+    def _grow(self):
+        # Cria os níveis/entradas em falta (todos no arranque, só os novos depois de um extend)
+        base = self.levels[0]
+        n = len(base)
+        j = 1
+        while (1 << j) <= n:
+            half = 1 << (j - 1)
+            size = n - (1 << j) + 1
+            prev = self.levels[j - 1]
+            if j < len(self.levels):
+                level = self.levels[j]
+                start = len(level)
+                new = self.op(prev[start:size], prev[start + half:size + half])
+                self.levels[j] = np.concatenate([level, new])
+            else:
+                self.levels.append(self.op(prev[:size], prev[half:size + half]))
+            j += 1
+
+    def extend(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+        self._grow()
+
+    def query(self, left, right):
+        # Intervalo fechado [left, right]
+        j = (right - left + 1).bit_length() - 1
+        return self.op(self.levels[j][left], self.levels[j][right - (1 << j) + 1])
+
+
+# ──────────── ÍNDICE DE UM ATIVO ────────────
+class AssetIndex:
+    def __init__(self, first_day, prices, last_obs, last_price):
+        self.first_day = pd.Timestamp(first_day)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.last_obs = pd.Timestamp(last_obs)
+        self.last_price = float(last_price)
+        self._build()
+
+    @staticmethod
+    def _daily_grid(dates, values, first_day, last_day):
+        # Preço à meia-noite de cada dia = última observação até esse instante
+        grid = np.arange(first_day.to_datetime64(), last_day.to_datetime64() + DAY, DAY).astype("datetime64[ns]")
+        pos = np.searchsorted(dates, grid, side="right") - 1
+        return values[pos]
+
+    @staticmethod
+    def _grid_end(last_obs):
+        # Último dia da grelha: a meia-noite estritamente anterior à última observação
+        return (pd.Timestamp(last_obs) - pd.Timedelta(1, "ns")).floor("D")
+
+    @classmethod
+    def from_series(cls, series):
+        series = series.dropna()
+        if series.empty:
+            raise ValueError("série vazia")
+        dates = series.index.values.astype("datetime64[ns]")
+        values = series.to_numpy(dtype=np.float64)
+        first_day = pd.Timestamp(dates[0]).ceil("D")
+        last_day = cls._grid_end(dates[-1])
+        if last_day < first_day:
+            prices = np.array([], dtype=np.float64)
+        else:
+            prices = cls._daily_grid(dates, values, first_day, last_day)
+        return cls(first_day, prices, dates[-1], values[-1])
+
+    def _build(self):
+        p = self.prices
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.cum_log = np.log(p / p[0]) if len(p) else np.array([])
+            r = p[1:] / p[:-1] - 1
+        self.s1 = np.concatenate([[0.0], np.cumsum(r)])
+        self.s2 = np.concatenate([[0.0], np.cumsum(r * r)])
+        self.max_table = SparseTable(p, np.fmax)
+        self.min_table = SparseTable(p, np.fmin)
+
+    def extend(self, series):
+        # Acrescenta observações a partir de last_obs (estruturas atualizadas em O(k log n)).
+        # Uma observação com a mesma data que last_obs substitui last_price (intervalo em curso).
+        series = series.dropna()
+        series = series[series.index >= self.last_obs]
+        if series.empty:
+            return 0
+        if series.index[0] != self.last_obs:
+            series = pd.concat([pd.Series([self.last_price], index=[self.last_obs]), series])
+        dates = series.index.values.astype("datetime64[ns]")
+        values = series.to_numpy(dtype=np.float64)
+        last_day = self._grid_end(dates[-1])
+        if len(self.prices):
+            next_day = self.last_day + pd.Timedelta(days=1)
+        else:
+            next_day = self.first_day
+        self.last_obs = pd.Timestamp(dates[-1])
+        self.last_price = float(values[-1])
+        if last_day < next_day:
+            return 0
+        new = self._daily_grid(dates, values, next_day, last_day)
+        if not len(self.prices):
+            self.prices = new
+            self._build()
+            return len(new)
+
+        prev = np.concatenate([self.prices[-1:], new[:-1]])
+        r = new / prev - 1
+        self.cum_log = np.concatenate([self.cum_log, np.log(new / self.prices[0])])
+        self.s1 = np.concatenate([self.s1, self.s1[-1] + np.cumsum(r)])
+        self.s2 = np.concatenate([self.s2, self.s2[-1] + np.cumsum(r * r)])
+        self.prices = np.concatenate([self.prices, new])
+        self.max_table.extend(new)
+        self.min_table.extend(new)
+        return len(new)
+
+    @property
+    def last_day(self):
+        return self.first_day + pd.Timedelta(days=len(self.prices) - 1)
+
+    def window(self, start_date, end_date, annualization=ANNUALIZATION):
+        # Mesmas métricas que o compare_returns.py para o intervalo [start_date, end_date] (dias inteiros)
+        n_days = len(self.prices)
+        a = (pd.Timestamp(start_date).normalize() - self.first_day).days
+        b = (pd.Timestamp(end_date).normalize() - self.first_day).days
+        if b < 0 or b < a or n_days == 0:
+            return None
+
+        a = max(a, 0)
+        tail = max(0, b - (n_days - 1))      # dias depois do último dia completo: preço = last_price
+        if a > n_days - 1:
+            start_price = end_price = max_price = min_price = self.last_price
+            count, s1, s2 = b - a, 0.0, 0.0
+            drawdown = 0.0
+        else:
+            inner_b = min(b, n_days - 1)
+            start_price = self.prices[a]
+            end_price = self.last_price if tail else self.prices[inner_b]
+            max_price = self.max_table.query(a, inner_b)
+            min_price = self.min_table.query(a, inner_b)
+            count = inner_b - a
+            s1 = self.s1[inner_b] - self.s1[a]
+            s2 = self.s2[inner_b] - self.s2[a]
+            segment = self.prices[a:inner_b + 1]
+            if tail:
+                segment = np.append(segment, self.last_price)
+            peak = np.maximum.accumulate(segment)
+            drawdown = ((segment - peak) / peak).min() * 100
+            if tail:
+                max_price = max(max_price, self.last_price)
+                min_price = min(min_price, self.last_price)
+                jump = self.last_price / self.prices[inner_b] - 1
+                count += tail              # o primeiro dia extra tem retorno "jump", os restantes 0
+                s1 += jump
+                s2 += jump * jump
+
+        if count >= 2:
+            mean = s1 / count
+            var = max(0.0, (s2 - count * mean * mean) / (count - 1))
+            std = np.sqrt(var)
+            sharpe = 0.0 if std == 0 else mean / std * np.sqrt(annualization)
+        else:
+            sharpe = np.nan
+        return {
+            "start_price": start_price,
+            "end_price": end_price,
+            "return_pct": (end_price / start_price - 1) * 100,
+            "max_ret": (max_price / start_price - 1) * 100,
+            "min_ret": (min_price / start_price - 1) * 100,
+            "drawdown": drawdown,
+            "sharpe": sharpe,
+        }
+
+    def log_return(self, start_date, end_date):
+        a = (pd.Timestamp(start_date).normalize() - self.first_day).days
+        b = (pd.Timestamp(end_date).normalize() - self.first_day).days
+        a, b = max(a, 0), min(b, len(self.prices) - 1)
+        return self.cum_log[b] - self.cum_log[a]
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, first_day=self.first_day.to_datetime64(), prices=self.prices,
+                 last_obs=self.last_obs.to_datetime64(), last_price=self.last_price, layout=LAYOUT)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if "layout" not in data.files or int(data["layout"]) != LAYOUT:
+                raise ValueError(f"formato antigo: {path}")
+            return cls(data["first_day"][()], data["prices"], data["last_obs"][()], data["last_price"][()])
+
+
+# ──────────── ÍNDICE DE TODOS OS ATIVOS ────────────
+class RollingIndex:
+    def __init__(self, data_dir=DATA_DIR, persist=True):
+        self.data_dir = data_dir
+        self.persist = persist
+        self.assets = {}
+
+    def _series(self, df):
+        return df.set_index("date")["price"]
+
+    def _load(self, asset):
+        index = self.assets.get(asset)
+        if index is not None:
+            return index
+        path = index_file(asset, self.data_dir)
+        if self.persist and os.path.exists(path):
+            try:
+                index = AssetIndex.load(path)
+            except (OSError, ValueError, KeyError):
+                index = None
+        if index is None:
+            index = AssetIndex.from_series(self._series(read_prices(asset, self.data_dir)))
+            self._save(asset, index)
+        self.assets[asset] = index
+        return index
+
+    def get(self, asset):
+        self.update(asset)
+        return self.assets[asset]
+
+    def update(self, asset, refresh_last=False):
+        # Estende o índice com os dias acrescentados desde a última atualização.
+        # refresh_last=True relê também a última linha (regravada pelos downloaders no intervalo em curso)
+        index = self._load(asset)
+        last = last_timestamp(asset, self.data_dir)
+        if last is None or last < index.last_obs or (last == index.last_obs and not refresh_last):
+            return 0
+        since = read_prices_since(asset, index.last_obs, self.data_dir, inclusive=True)
+        added = index.extend(self._series(since))
+        self._save(asset, index)
+        return added
+
+    def _save(self, asset, index):
+        if self.persist:
+            index.save(index_file(asset, self.data_dir))
+
+    def standard_table(self, end_date=None, windows=STANDARD_WINDOWS):
+        # Métricas de todas as janelas standard para todos os ativos (uma linha por ativo × janela)
+        end_date = pd.Timestamp(end_date or pd.Timestamp.now().normalize())
+        rows = []
+        for asset in list_assets(self.data_dir):
+            index = self.get(asset)
+            for name, days in windows.items():
+                metrics = index.window(end_date - pd.Timedelta(days=days), end_date)
+                if metrics is not None:
+                    rows.append({"asset": asset, "period": name, **metrics})
+        return pd.DataFrame(rows)
+
+
+def reset_index(asset, data_dir=DATA_DIR):
+    # Depois de preencher falhas no meio do histórico o índice tem de ser reconstruído
+    path = index_file(asset, data_dir)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def update_index(asset, data_dir=DATA_DIR):
+    # Chamado pelos downloaders depois de acrescentarem dados
+    return RollingIndex(data_dir).update(asset, refresh_last=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Métricas das janelas standard a partir do índice pré-calculado")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD), por omissão hoje")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_dir):
+        print(f"❌ Pasta {args.data_dir} não encontrada.")
+        sys.exit(1)
+    table = RollingIndex(args.data_dir).standard_table(args.end)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
@@ -0,0 +1,86 @@
+# stub_server.py
+# Version 1.1.0 - ETag em cada fixture e 304 com If-None-Match (testar a revalidação da http_cache)
+# 2026-10-18
+#
+# Gravar:     FETCH_RECORD_DIR=fixtures python dex_tracker.py
+# Reproduzir: python stub_server.py fixtures --port 8765
+#             GECKOTERMINAL_BASE=http://127.0.0.1:8765/api/v2 python dex_tracker.py
+
+import os
+import sys
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+from fetch_engine import fixture_name
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, como a API real
+    fixtures_dir = "fixtures"
+    fail_every = 0                  # devolver 429 a cada N pedidos (testar rate limit/retries)
+    counter = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.lock:
+            type(self).counter += 1
+            count = self.counter
+        if self.fail_every and count % self.fail_every == 0:
+            self._send(429, b'{"error": "rate limited"}', {"Retry-After": "1"})
+            return
+
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        # 1º: caminho + parâmetros exatos; 2º: só o caminho
+        for name in (fixture_name(parts.path, params), fixture_name(parts.path)):
+            path = os.path.join(self.fixtures_dir, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    body = f.read()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", {"ETag": etag})
+                else:
+                    self._send(200, body, {"ETag": etag})
+                return
+        self._send(404, b'{"error": "fixture not found"}')
+
+
+def serve(fixtures_dir, host="127.0.0.1", port=8765, fail_every=0):
+    handler = type("Handler", (FixtureHandler,), {"fixtures_dir": fixtures_dir, "fail_every": fail_every})
+    server = ThreadingHTTPServer((host, port), handler)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduzir fixtures JSON gravadas")
+    parser.add_argument("fixtures_dir")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="Responder 429 a cada N pedidos")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.fixtures_dir):
+        print(f"❌ Pasta {args.fixtures_dir} não encontrada.")
+        sys.exit(1)
+    server = serve(args.fixtures_dir, args.host, args.port, args.fail_every)
+    print(f"🧪 A servir {args.fixtures_dir} em http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
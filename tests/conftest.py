@@ -0,0 +1,5 @@
+# Os módulos do projeto vivem na raiz (sem pacote): torná-los importáveis a partir de tests/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
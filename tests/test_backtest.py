@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from backtest import backtest
+from metrics_engine import compute_metrics
+
+
+def _prices(days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=days)
+    returns = rng.normal(0.001, 0.03, (days, 2))
+    return pd.DataFrame(np.cumprod(1 + returns, axis=0) * [100, 20], index=dates, columns=["a", "b"])
+
+
+def test_sharpe_ignores_initial_capital_baseline():
+    prices = _prices()
+    weights = [[1, 0], [0, 1], [0.5, 0.5]]
+    no_fee = backtest(prices, weights, "none", fee_bps=0)
+    with_fee = backtest(prices, weights, "none", fee_bps=10)
+    # Sem rebalanceamento a comissão inicial só escala os valores: o Sharpe não muda
+    np.testing.assert_allclose(no_fee["sharpe"], with_fee["sharpe"])
+    np.testing.assert_allclose(no_fee["sharpe"].iloc[:2], compute_metrics(prices)["sharpe"])
+    # ... mas o retorno é medido face ao capital 1.0, com a comissão incluída
+    np.testing.assert_allclose(with_fee["final_value"], no_fee["final_value"] * 0.999)
+
+
+def test_flat_prices_lose_only_the_fee():
+    prices = pd.DataFrame({"a": np.ones(30)}, index=pd.date_range("2025-01-01", periods=30))
+    report = backtest(prices, [[1.0]], "monthly", fee_bps=10)
+    assert np.isclose(report["return_pct"].iloc[0], -0.1)
+    assert np.isclose(report["drawdown"].iloc[0], -0.1)
+    assert report["max_ret"].iloc[0] == 0
+    assert report["sharpe"].iloc[0] == 0
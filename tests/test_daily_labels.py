@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import dex_tracker
+from geckoterminal import OHLCV_DIR, ohlcv_asset, ohlcv_to_prices, parse_ohlcv
+from price_store import append_prices, read_prices, write_prices
+from resample import resample_close
+
+
+def _payload(starts, closes):
+    rows = [[int(pd.Timestamp(t).timestamp()), c, c, c, c, 1.0] for t, c in zip(starts, closes)]
+    return {"data": {"attributes": {"ohlcv_list": rows}}}
+
+
+def test_one_utc_day_gets_the_same_label_from_each_source():
+    # CoinGecko: pontos horários do dia 24 (o das 00:00 do dia 25 é o fecho desse dia)
+    hourly = pd.DataFrame({"date": pd.date_range("2025-08-24 01:00", "2025-08-25 00:00", freq="h"),
+                           "price": np.arange(24.0)})
+    coingecko = resample_close(hourly, "day")
+    # GeckoTerminal: a vela diária do dia 24 vem etiquetada com o início (24 00:00)
+    geckoterminal = ohlcv_to_prices(parse_ohlcv(_payload(["2025-08-24"], [23.0])))
+    assert list(coingecko["date"]) == list(geckoterminal["date"]) == [pd.Timestamp("2025-08-25")]
+    assert coingecko["price"].iloc[0] == geckoterminal["price"].iloc[0]
+
+
+def test_start_labelled_history_is_relabelled_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    starts = pd.date_range("2025-08-01", periods=12)
+    closes = np.linspace(1.0, 2.0, 12)
+    candles = ohlcv_asset("qflow", "day")
+    append_prices(candles, parse_ohlcv(_payload(starts, closes)), OHLCV_DIR, only_newer=False)
+    # Histórico antigo: fecho de cada dia na data de início da vela
+    write_prices("qflow", pd.DataFrame({"date": starts, "price": closes}), fmt="csv")
+    assert dex_tracker.close_labels("qflow", candles) == "start"
+
+    dex_tracker.relabel_closes("qflow")
+    assert dex_tracker.close_labels("qflow", candles) == "end"
+    assert read_prices("qflow")["date"].iloc[0] == pd.Timestamp("2025-08-02")
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from fetch_engine import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(time, "sleep", fake.sleep)
+    return fake
+
+
+def test_overlapping_pauses_give_one_pause(clock):
+    bucket = TokenBucket(rate=10, capacity=1)
+    bucket.acquire()
+    # Dois workers recebem um 429 com Retry-After: 5 ao mesmo tempo
+    bucket.pause(5)
+    clock.now += 0.01
+    bucket.pause(5)
+    start = clock.now
+    bucket.acquire()
+    # Uma só pausa de 5 s contada a partir do último 429 (e não 10 s), mais o token seguinte
+    assert clock.now - start == pytest.approx(5 + 1 / bucket.rate)
+
+
+def test_tokens_do_not_refill_during_pause(clock):
+    bucket = TokenBucket(rate=1, capacity=3)
+    bucket.pause(10)
+    clock.now += 10
+    bucket.acquire()
+    # O balde recomeça vazio no fim da pausa: a rajada não fica disponível logo a seguir
+    assert clock.now == pytest.approx(1011.0)
@@ -0,0 +1,46 @@
+import time
+
+import requests
+
+import http_cache
+from http_cache import ResponseCache, candle_freshness
+
+URL = "https://api.example/ohlcv"
+
+
+def _response(body=b'{"ok": true}'):
+    r = requests.Response()
+    r.status_code = 200
+    r._content = body
+    return r
+
+
+def test_live_ttl_follows_current_setting(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+    cache.store(URL, {"page": 1}, _response(), candle_freshness(3600))
+    assert cache.lookup(URL, {"page": 1})[0] is not None
+
+    # Teto mais baixo depois de gravar: a entrada (gravada há 2 minutos) já expirou
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    monkeypatch.setattr(http_cache, "LIVE_TTL_CAP", 60)
+    assert cache.lookup(URL, {"page": 1})[0] is None
+
+
+def test_closed_candles_use_current_historical_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+    past = int(time.time()) - 86400
+    cache.store(URL, {"page": 2}, _response(), candle_freshness(86400, past))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3 * 86400)
+    assert cache.lookup(URL, {"page": 2})[0] is not None
+    monkeypatch.setattr(http_cache, "HISTORICAL_TTL", 86400)
+    assert cache.lookup(URL, {"page": 2})[0] is None
+
+
+def test_no_ttl_is_written_to_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store(URL, None, _response(), candle_freshness(300))
+    meta, _ = cache._read(http_cache.cache_key(URL))
+    assert "ttl" not in meta
+    assert meta["candle"] == 300 and meta["candle_end"] is None